@@ -0,0 +1,76 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark of deduplicating a batch by fingerprint rather than by raw string
+
+Run with `python -m benchmarks.bench_canonical`.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+
+from calct.canonical import fingerprint
+from calct.parser import compute
+
+EXPRESSIONS = 100_000
+COMPUTATIONS = 2_000
+
+
+def main() -> None:
+    rng = random.Random(50)
+
+    def spell(minutes: int) -> str:
+        return rng.choice([f"{minutes // 60}h{minutes % 60:02}", f"{minutes}m", f"{minutes // 60}:{minutes % 60:02}"])
+
+    def write(terms: list[int], factor: int) -> str:
+        terms = rng.sample(terms, len(terms))
+        spellings = [f"({spell(term)})" if rng.random() < 0.2 else spell(term) for term in terms]
+        spaced = rng.choice([" + ", "+", "  +  "]).join(spellings)
+        return rng.choice([f"({spaced}) * {factor}", f"{factor} * ({spaced})"])
+
+    computations = [
+        ([rng.randrange(1, 600) for _ in range(rng.randrange(2, 5))], rng.randrange(1, 4)) for _ in range(COMPUTATIONS)
+    ]
+    exprs = [write(*rng.choice(computations)) for _ in range(EXPRESSIONS)]
+
+    start = time.perf_counter()
+    results = [compute(expr) for expr in exprs]
+    compute_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    by_string = {expr: compute(expr) for expr in dict.fromkeys(exprs)}
+    string_seconds = time.perf_counter() - start
+    assert [by_string[expr] for expr in exprs] == results
+
+    start = time.perf_counter()
+    keys = [fingerprint(expr) for expr in exprs]
+    by_fingerprint = {}
+    for key, expr in zip(keys, exprs):
+        if key not in by_fingerprint:
+            by_fingerprint[key] = compute(expr)
+    fingerprint_seconds = time.perf_counter() - start
+    assert [by_fingerprint[key] for key in keys] == results
+
+    print(f"{EXPRESSIONS:,} expressions of {COMPUTATIONS:,} computations")
+    print(f"         compute all: {compute_seconds:.3f} s")
+    print(f"     dedup by string: {string_seconds:.3f} s, {len(by_string):7,} computed")
+    print(f"dedup by fingerprint: {fingerprint_seconds:.3f} s, {len(by_fingerprint):7,} computed")
+
+
+if __name__ == "__main__":
+    main()
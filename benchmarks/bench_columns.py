@@ -0,0 +1,57 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark of evaluating an expression over columns against building and computing a string per row
+
+Run with `python -m benchmarks.bench_columns`.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+
+from calct.compiler import Expression
+from calct.duration import Duration
+from calct.parser import compute
+
+ROWS = 1_000_000
+STRING_ROWS = 20_000
+
+
+def main() -> None:
+    rng = random.Random(40)
+    starts = [rng.randrange(6 * 60, 10 * 60) for _ in range(ROWS)]
+    ends = [start + rng.randrange(4 * 60, 10 * 60) for start in starts]
+    breaks = [rng.choice([0, 30, 45, 60]) for _ in range(ROWS)]
+
+    start = time.perf_counter()
+    for index in range(STRING_ROWS):
+        compute(f"{starts[index]}m @ {ends[index]}m - {breaks[index]}m")
+    per_row = (time.perf_counter() - start) / STRING_ROWS
+    print(f"   strings: {1 / per_row:>12,.0f} rows/s")
+
+    expression = Expression("start @ end - brk")
+    start = time.perf_counter()
+    results = expression.evaluate({"start": starts, "end": ends, "brk": breaks})
+    seconds = time.perf_counter() - start
+    print(f"   columns: {ROWS / seconds:>12,.0f} rows/s ({per_row * ROWS / seconds:,.0f}x)")
+
+    assert Duration(minutes=results[0]) == compute(f"{starts[0]}m @ {ends[0]}m - {breaks[0]}m")
+
+
+if __name__ == "__main__":
+    main()
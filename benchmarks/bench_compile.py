@@ -0,0 +1,55 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark of compiled expressions against interpreted evaluation and hand-written integer arithmetic
+
+Run with `python -m benchmarks.bench_compile`.
+"""
+
+from __future__ import annotations
+
+import timeit
+
+from calct.compiler import compile  # pylint: disable=redefined-builtin
+from calct.duration import Duration
+from calct.parser import compute, evaluate_rpn, lex, parse
+
+EXPRESSION = "3h23 @ 5h24 + 2 * (1h - 30m)"
+NUMBER = 100_000
+
+
+def hand_written() -> Duration:
+    return Duration.from_milliseconds(((324 - 203) + (60 - 30) * 2) * 60_000)
+
+
+def main() -> None:
+    rpn = parse(lex(EXPRESSION))
+    compiled = compile(EXPRESSION)
+    assert compiled() == compute(EXPRESSION) == evaluate_rpn(rpn) == hand_written()
+
+    candidates = [
+        ("compute", lambda: compute(EXPRESSION)),
+        ("evaluate_rpn", lambda: evaluate_rpn(rpn)),
+        ("compiled", compiled),
+        ("hand-written", hand_written),
+    ]
+    for name, function in candidates:
+        seconds = min(timeit.repeat(function, number=NUMBER, repeat=3)) / NUMBER
+        print(f"{name:>12}: {seconds * 1e6:8.2f} us per call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark of chained Duration arithmetic
+
+Run with `python -m benchmarks.bench_duration_arithmetic`.
+"""
+
+from __future__ import annotations
+
+import timeit
+from functools import partial
+
+from calct.duration import Duration
+
+OPERATIONS = 1_000_000
+
+
+def chained_arithmetic(operations: int) -> Duration:
+    """Apply `operations` operations, cycling through +, -, * and /"""
+    total = Duration()
+    step = Duration(minutes=7)
+    for _ in range(operations // 4):
+        total = total + step
+        total = total * 3
+        total = total / 3
+        total = total - step
+    return total
+
+
+def chained_int_arithmetic(operations: int) -> int:
+    """Same computation on plain integer minutes, as a lower bound"""
+    total = 0
+    step = 7
+    for _ in range(operations // 4):
+        total = total + step
+        total = int(total * 3)
+        total = int(total / 3)
+        total = total - step
+    return total
+
+
+def main() -> None:
+    for name, function in [("Duration", chained_arithmetic), ("int", chained_int_arithmetic)]:
+        seconds = min(timeit.repeat(partial(function, OPERATIONS), number=1, repeat=3))
+        print(f"{name:>8}: {OPERATIONS:,} operations in {seconds:.3f} s ({OPERATIONS / seconds:,.0f} ops/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark of exact rational evaluation against the default float evaluation
+
+Run with `python -m benchmarks.bench_exact`.
+"""
+
+from __future__ import annotations
+
+import timeit
+from functools import partial
+from typing import Callable
+
+from calct.exact import compute_exact
+from calct.parser import compute_chunks
+
+EXPRESSIONS = [
+    "3h23 @ 5h24 + 2 * (1h - 30m)",
+    "1.1h * 3 + 2.05h / 7",
+    "8h30 + 7h45 + 9h + 8h15 + 6h50",
+    "(17h30 @ 9h - 45m) * 5",
+]
+REPEAT = 2_000
+
+
+def compute_all(function: Callable[[str], object]) -> None:
+    for expr in EXPRESSIONS:
+        function(expr)
+
+
+def main() -> None:
+    timings = {}
+    for name, function in [("float", compute_chunks), ("exact", compute_exact)]:
+        seconds = min(timeit.repeat(partial(compute_all, function), number=REPEAT, repeat=3))
+        timings[name] = seconds
+        evaluations = REPEAT * len(EXPRESSIONS)
+        print(f"{name:>6}: {evaluations:,} evaluations in {seconds:.3f} s ({evaluations / seconds:,.0f} expr/s)")
+    print(f" ratio: exact is {timings['exact'] / timings['float']:.2f}x the float path")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark of `TypedProgram` against `evaluate_rpn` on a bound expression
+
+Run with `python -m benchmarks.bench_inference`.
+"""
+
+from __future__ import annotations
+
+import time
+
+from calct._common import OPS_STR
+from calct.duration import Duration
+from calct.inference import Kind, TypedProgram, literal
+from calct.parser import evaluate_rpn, lex, parse
+
+EXPRESSION = "(end @ start - brk) * rate + 1h30 * 2 - 15m / 3"
+KINDS = {"start": Kind.DURATION, "end": Kind.DURATION, "brk": Kind.DURATION, "rate": Kind.NUMBER}
+EVALUATIONS = 100_000
+
+
+def main() -> None:
+    bindings = {"start": Duration(8, 15), "end": Duration(17, 40), "brk": Duration(0, 45), "rate": 1.5}
+    rpn = parse(lex(EXPRESSION))
+    literals = [token if token in OPS_STR or literal(token) is None else literal(token) for token in rpn]
+    program = TypedProgram(rpn, KINDS)
+    expected = evaluate_rpn(rpn, bindings)
+    assert program.evaluate(bindings) == expected == evaluate_rpn(literals, bindings)
+
+    timings = {}
+    for name, run in [
+        ("evaluate_rpn", lambda: evaluate_rpn(rpn, bindings)),
+        ("evaluate_rpn, literals", lambda: evaluate_rpn(literals, bindings)),
+        ("TypedProgram", lambda: program.evaluate(bindings)),
+    ]:
+        start = time.perf_counter()
+        for _ in range(EVALUATIONS):
+            run()
+        timings[name] = time.perf_counter() - start
+
+    print(f"{EXPRESSION} = {expected}, {EVALUATIONS:,} evaluations")
+    for name, seconds in timings.items():
+        print(
+            f"{name:>22}: {seconds * 1e6 / EVALUATIONS:6.1f} µs/evaluation"
+            f" ({timings['evaluate_rpn'] / seconds:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
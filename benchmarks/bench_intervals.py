@@ -0,0 +1,58 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark of overlap detection with an interval tree against pairwise checks
+
+Run with `python -m benchmarks.bench_intervals`.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+
+from calct.duration import Duration
+from calct.intervals import IntervalTree, TimeRange
+
+SHIFTS = 3_000
+
+
+def main() -> None:
+    rng = random.Random(41)
+    shifts = []
+    for _ in range(SHIFTS):
+        start = rng.randrange(0, 7 * 24 * 60)
+        shifts.append(TimeRange(Duration(minutes=start), Duration(minutes=start + rng.randrange(60, 9 * 60))))
+
+    start = time.perf_counter()
+    pairwise = sum(
+        1 for index, shift in enumerate(shifts, start=1) for other in shifts[index:] if shift.overlaps(other)
+    )
+    pairwise_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tree = IntervalTree(shifts)
+    indexed = (sum(len(tree.overlap(shift)) - 1 for shift in shifts)) // 2
+    tree_seconds = time.perf_counter() - start
+
+    assert indexed == pairwise
+    print(f"{SHIFTS:,} shifts, {pairwise:,} overlapping pairs")
+    print(f"  pairwise: {pairwise_seconds:.3f} s")
+    print(f"      tree: {tree_seconds:.3f} s ({pairwise_seconds / tree_seconds:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
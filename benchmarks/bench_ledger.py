@@ -0,0 +1,62 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark of range sums over a `DurationLedger` against naive summation of durations
+
+Run with `python -m benchmarks.bench_ledger`.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+
+from calct.duration import Duration
+from calct.ledger import DurationLedger
+
+ROWS = 100_000
+QUERIES = 200
+
+
+def main() -> None:
+    rng = random.Random(43)
+    time_strs = [f"{rng.randrange(12)}h{rng.randrange(60):02}" for _ in range(ROWS)]
+    queries = [sorted((rng.randrange(ROWS + 1), rng.randrange(ROWS + 1))) for _ in range(QUERIES)]
+
+    start = time.perf_counter()
+    durations = [Duration.parse(time_str) for time_str in time_strs]
+    parse_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ledger = DurationLedger(durations)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    naive = [sum(durations[first:last], Duration()) for first, last in queries]
+    naive_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [ledger.range_sum(first, last) for first, last in queries]
+    ledger_seconds = time.perf_counter() - start
+
+    assert naive == indexed
+    print(f"{ROWS:,} rows parsed in {parse_seconds:.3f} s, ledger built in {build_seconds:.3f} s")
+    print(f"  naive: {naive_seconds / QUERIES * 1e6:10.1f} us per range sum")
+    print(f" ledger: {ledger_seconds / QUERIES * 1e6:10.1f} us per range sum ({naive_seconds / ledger_seconds:,.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark of a single long sum of durations computed sequentially and with `compute_parallel`
+
+Run with `python -m benchmarks.bench_parallel_sum`.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import time
+
+from calct.bulk import compute_parallel
+from calct.parser import compute_chunks
+
+TERMS = 500_000
+
+
+def main() -> None:
+    rng = random.Random(47)
+    terms = [f"{rng.randrange(10)}h{rng.randrange(60):02}" for _ in range(TERMS)]
+    expr = terms[0] + "".join(f" {rng.choice('+-')} {term}" for term in terms[1:])
+    jobs = os.cpu_count() or 1
+
+    start = time.perf_counter()
+    sequential = compute_chunks((expr,))
+    sequential_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel = compute_parallel(expr, jobs=max(jobs, 2))
+    parallel_seconds = time.perf_counter() - start
+
+    assert parallel == sequential
+    print(f"{TERMS:,} terms, {len(expr):,} characters, {jobs} CPUs: {sequential}")
+    print(f"sequential: {sequential_seconds:.3f} s")
+    print(f"  parallel: {parallel_seconds:.3f} s ({sequential_seconds / parallel_seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
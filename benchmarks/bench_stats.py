@@ -0,0 +1,83 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark of percentiles from a `DurationSketch` against sorting a list of durations
+
+Run with `python -m benchmarks.bench_stats`.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+import time
+import tracemalloc
+from typing import Callable
+
+from calct.duration import Duration
+from calct.stats import DurationSketch
+
+ROWS = 1_000_000
+PERCENTS = (50, 95, 99)
+
+
+def sorted_percentiles(minutes: list[int]) -> list[Duration]:
+    durations = sorted(Duration(minutes=value) for value in minutes)
+    return [durations[max(math.ceil(percent / 100 * len(durations)) - 1, 0)] for percent in PERCENTS]
+
+
+def sketch_percentiles(minutes: list[int], max_bins: int) -> list[Duration]:
+    sketch = DurationSketch(max_bins=max_bins)
+    for value in minutes:
+        sketch.add(Duration(minutes=value))
+    return [sketch.percentile(percent) for percent in PERCENTS]
+
+
+def measure(function: Callable[[], list[Duration]]) -> tuple[float, int, list[Duration]]:
+    """Returns the duration of a run, then the peak memory of another, traced, run"""
+    start = time.perf_counter()
+    results = function()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, results
+
+
+def main() -> None:
+    rng = random.Random(45)
+    minutes = [int(rng.lognormvariate(4, 1)) for _ in range(ROWS)]
+
+    runs = {
+        "sorted": lambda: sorted_percentiles(minutes),
+        "exact": lambda: sketch_percentiles(minutes, 10_080),
+        "t-digest": lambda: sketch_percentiles(minutes, 0),
+    }
+    expected = None
+    for label, function in runs.items():
+        seconds, peak, results = measure(function)
+        expected = results if expected is None else expected
+        if label == "exact":
+            assert results == expected
+        print(
+            f"{label:>8}: {seconds:.3f} s, peak {peak / 2**20:6.2f} MiB,",
+            ", ".join(f"p{percent} {result}" for percent, result in zip(PERCENTS, results)),
+        )
+
+
+if __name__ == "__main__":
+    main()
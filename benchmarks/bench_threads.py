@@ -0,0 +1,51 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark of the throughput of `compute_many` against the number of threads
+
+On a build with the GIL, the throughput stays flat; on a free-threaded build, it scales with the number of cores.
+
+Run with `python -m benchmarks.bench_threads`.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+
+from calct.bulk import compute_many
+
+EXPRESSIONS = [f"{i % 24}h{i % 60:02} @ 17h30 + 2 * ({i % 9}h - 30m) / 3" for i in range(20_000)]
+THREAD_COUNTS = [1, 2, 4, 8]
+
+
+def main() -> None:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if is_gil_enabled else 'disabled'}, {os.cpu_count()} CPUs")
+
+    baseline = None
+    for threads in THREAD_COUNTS:
+        start = time.perf_counter()
+        compute_many(EXPRESSIONS, max_workers=threads)
+        seconds = time.perf_counter() - start
+        throughput = len(EXPRESSIONS) / seconds
+        baseline = throughput if baseline is None else baseline
+        print(f"{threads:>2} threads: {throughput:>10,.0f} expr/s ({throughput / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
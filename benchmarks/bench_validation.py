@@ -0,0 +1,65 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark of `validate_many` against computing each expression
+
+Run with `python -m benchmarks.bench_validation`.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+
+from calct.parser import compute_chunks
+from calct.validation import validate_many
+
+EXPRESSIONS = 100_000
+
+
+def main() -> None:
+    rng = random.Random(48)
+
+    def term() -> str:
+        return rng.choice(
+            [f"{rng.randrange(10)}h{rng.randrange(60):02}", f"{rng.randrange(1, 90)}m", f"({rng.randrange(9)}h + 30m)"]
+        )
+
+    exprs = [
+        " + ".join(term() for _ in range(rng.randrange(1, 6))) + rng.choice(["", " * 2", " / 3"])
+        for _ in range(EXPRESSIONS)
+    ]
+
+    start = time.perf_counter()
+    for expr in exprs:
+        compute_chunks((expr,))
+    compute_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    diagnostics = validate_many(exprs)
+    validate_seconds = time.perf_counter() - start
+
+    assert diagnostics.count(None) == EXPRESSIONS
+    print(f"{EXPRESSIONS:,} expressions")
+    print(f" compute: {compute_seconds:.3f} s, {EXPRESSIONS / compute_seconds:10,.0f} expressions/s")
+    print(
+        f"validate: {validate_seconds:.3f} s, {EXPRESSIONS / validate_seconds:10,.0f} expressions/s"
+        f" ({compute_seconds / validate_seconds:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
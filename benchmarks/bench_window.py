@@ -0,0 +1,65 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark of rolling 7-day sums and maxima with the window kernels against re-summing the window of each row
+
+Run with `python -m benchmarks.bench_window`.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from bisect import bisect_right
+
+from calct.window import rolling_max_minutes, rolling_sum_minutes
+
+ROWS = 100_000
+WIDTH = 7 * 24 * 60
+
+
+def naive(times: list[int], values: list[int]) -> tuple[list[int], list[int]]:
+    sums, maxima = [], []
+    for row, now in enumerate(times):
+        first, end = bisect_right(times, now - WIDTH, 0, row), row + 1
+        window = values[first:end]
+        sums.append(sum(window))
+        maxima.append(max(window))
+    return sums, maxima
+
+
+def main() -> None:
+    rng = random.Random(46)
+    # A team logging a shift every 10 minutes on average
+    times = sorted(rng.randrange(ROWS * 10) for _ in range(ROWS))
+    values = [rng.randrange(30, 12 * 60) for _ in range(ROWS)]
+
+    start = time.perf_counter()
+    expected = naive(times, values)
+    naive_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = rolling_sum_minutes(times, values, WIDTH), rolling_max_minutes(times, values, WIDTH)
+    kernel_seconds = time.perf_counter() - start
+
+    assert result == expected
+    print(f"{ROWS:,} rows, {len(times) * WIDTH / times[-1]:.0f} rows per window on average")
+    print(f"  naive: {naive_seconds:.3f} s")
+    print(f" kernel: {kernel_seconds:.3f} s ({naive_seconds / kernel_seconds:,.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
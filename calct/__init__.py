@@ -16,16 +16,74 @@
 
 
 from calct.__version__ import __version__
-from calct.duration import Duration
+from calct.bulk import compute_file, compute_many, compute_parallel
+from calct.bytes_parser import compute_bytes
+from calct.canonical import canonicalize, fingerprint
+from calct.compiler import Expression, compile  # pylint: disable=redefined-builtin
+from calct.duration import Duration, Resolution, Settings, use_settings
+from calct.exact import Rounding, compute_exact
+from calct.index import DurationIndex
+from calct.inference import Kind, TypedProgram, infer
+from calct.intervals import IntervalTree, TimeRange
+from calct.ledger import DurationLedger
 from calct.main import __author__, __license__, __year__, run_loop, run_once
-from calct.parser import compute, evaluate_rpn, lex, parse
+from calct.parser import (
+    ParseMethod,
+    compute,
+    compute_stream,
+    evaluate_ast,
+    evaluate_pratt,
+    evaluate_rpn,
+    lex,
+    lex_stream,
+    lower_ast,
+    parse,
+    parse_ast,
+)
+from calct.stats import DurationSketch
+from calct.validation import Diagnostic, ErrorCode, validate, validate_many
+from calct.window import Window, rolling
 
 __all__ = [
     "Duration",
+    "Resolution",
+    "TimeRange",
+    "IntervalTree",
+    "DurationLedger",
+    "DurationIndex",
+    "DurationSketch",
+    "Window",
+    "rolling",
+    "Settings",
+    "use_settings",
     "evaluate_rpn",
+    "evaluate_pratt",
     "lex",
+    "lex_stream",
     "parse",
+    "parse_ast",
+    "evaluate_ast",
+    "lower_ast",
     "compute",
+    "ParseMethod",
+    "compute_stream",
+    "compute_bytes",
+    "compute_file",
+    "compute_many",
+    "compute_parallel",
+    "validate",
+    "validate_many",
+    "Diagnostic",
+    "ErrorCode",
+    "compute_exact",
+    "compile",
+    "Expression",
+    "TypedProgram",
+    "Kind",
+    "infer",
+    "canonicalize",
+    "fingerprint",
+    "Rounding",
     "__version__",
     "__year__",
     "__author__",
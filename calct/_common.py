@@ -18,7 +18,9 @@
 from __future__ import annotations
 
 import string
-from typing import Union
+from enum import Enum
+from functools import lru_cache
+from typing import Iterable, Iterator, Union
 
 Number = Union[int, float]
 
@@ -33,8 +35,65 @@ DIGITS_STR = string.digits
 FLOAT_EXPONENT_STR = "eE"
 FLOAT_SEPARATOR_EXPONENT_STR = "." + FLOAT_EXPONENT_STR
 FLOAT_CHARS_STR = DIGITS_STR + FLOAT_SEPARATOR_EXPONENT_STR
+NUMBER_START_STR = DIGITS_STR + "."
+
+LAST_RESULT_STR = "_"
+REFERENCE_PREFIX_STR = "$"
+REFERENCE_CHARS_STR = LAST_RESULT_STR + REFERENCE_PREFIX_STR
+
+IDENTIFIER_STR = string.ascii_letters
 
 DEFAULT_HOUR_SEPARATOR = "h:"
 DEFAULT_MINUTE_SEPARATOR = "m"
+DEFAULT_SECOND_SEPARATOR = "s"
+
+CANT_BE_CUSTOM_SEPARATOR = OPS_PAREN_STR + FLOAT_CHARS_STR + REFERENCE_CHARS_STR + WHITESPACE_STR
+
+
+class CharClass(Enum):
+    """Class of a character of an expression, as seen by the lexer"""
+
+    OPERATOR = 1
+    WHITESPACE = 2
+    NUMBER = 3
+    REFERENCE = 4
+    HOUR_SEPARATOR = 5
+    UNIT = 6
+    IDENTIFIER = 7
+
+
+@lru_cache(maxsize=None)
+def char_classes(hour_sep: str) -> dict[str, CharClass]:
+    """Return the class of each valid character of an expression, given the custom hour separator
+
+    Characters that are missing from the table are invalid. The table is only built once per separator.
+    """
+    classes = dict.fromkeys(IDENTIFIER_STR, CharClass.IDENTIFIER)
+    classes.update(dict.fromkeys(DEFAULT_HOUR_SEPARATOR + hour_sep, CharClass.HOUR_SEPARATOR))
+    classes.update(dict.fromkeys(DEFAULT_MINUTE_SEPARATOR + DEFAULT_SECOND_SEPARATOR, CharClass.UNIT))
+    classes.update(dict.fromkeys(REFERENCE_CHARS_STR, CharClass.REFERENCE))
+    classes.update(dict.fromkeys(FLOAT_CHARS_STR, CharClass.NUMBER))
+    classes.update(dict.fromkeys(WHITESPACE_STR, CharClass.WHITESPACE))
+    classes.update(dict.fromkeys(OPS_PAREN_STR, CharClass.OPERATOR))
+    return classes
+
+
+def as_text(token: Union[str, bytes]) -> str:
+    """Return a token as a string, to show it in a message whether it was lexed from a string or from bytes"""
+    return token.decode(errors="replace") if isinstance(token, bytes) else token
+
+
+def parse_number(token: Union[str, bytes]) -> Number:
+    """Parse an integer, or a float if the token isn't an integer"""
+    try:
+        return int(token)
+    except ValueError:
+        try:
+            return float(token)
+        except ValueError as ex:
+            raise ValueError(f"`{as_text(token)}` is not a valid number") from ex
+
 
-CANT_BE_CUSTOM_SEPARATOR = OPS_PAREN_STR + FLOAT_CHARS_STR + WHITESPACE_STR
+def non_blank_lines(lines: Iterable[str]) -> Iterator[tuple[int, str]]:
+    """Return the lines that aren't blank, with their line numbers starting at 1, lazily"""
+    return ((line_number, line) for line_number, line in enumerate(lines, start=1) if line.strip() != "")
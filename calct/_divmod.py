@@ -44,3 +44,11 @@ def duration_friendly_divmod(numerator: int, denominator: int) -> Tuple[Sign, in
     """
 
     return (sign(numerator * denominator), *divmod(abs(numerator), abs(denominator)))
+
+
+def truncated_div(numerator: int, denominator: int) -> int:
+    """Integer division rounding toward zero, like `int(numerator / denominator)` without going through floats."""
+    quotient = numerator // denominator
+    if quotient < 0 and quotient * denominator != numerator:
+        return quotient + 1
+    return quotient
@@ -17,12 +17,12 @@
 from __future__ import annotations
 
 import re
-from typing import NamedTuple
+from typing import AnyStr, Iterable, NamedTuple, Union
 
-from calct._common import Number
+from calct._common import Number, as_text
 
 
-def _parse_hours(time_str: str) -> Number:
+def _parse_hours(time_str: Union[str, bytes]) -> Number:
     try:
         hours_int = int(time_str)
         return hours_int
@@ -31,39 +31,85 @@ def _parse_hours(time_str: str) -> Number:
             hours_float = float(time_str)
             return hours_float
         except ValueError as ex:
-            raise ValueError(f"Invalid hours: {time_str}") from ex
+            raise ValueError(f"Invalid hours: {as_text(time_str)}") from ex
 
 
-def _parse_minutes(time_str: str) -> int:
+def _parse_minutes(time_str: Union[str, bytes]) -> int:
     try:
         minutes_int = int(time_str)
         return minutes_int
     except ValueError as ex:
-        raise ValueError(f"Invalid minutes: {time_str}") from ex
+        raise ValueError(f"Invalid minutes: {as_text(time_str)}") from ex
+
+
+def _parse_seconds(time_str: Union[str, bytes]) -> Number:
+    try:
+        return _parse_hours(time_str)
+    except ValueError as ex:
+        raise ValueError(f"Invalid seconds: {as_text(time_str)}") from ex
 
 
 class Time(NamedTuple):
-    """A tuple of hours and minutes."""
+    """A tuple of hours, minutes and seconds."""
 
     hours: Number
     minutes: int
+    seconds: Number = 0
 
 
 DurationMatcher = re.Pattern[str]
+BytesDurationMatcher = re.Pattern[bytes]
 
 
 def compile_matcher(matcher: str) -> DurationMatcher:
     float_pattern = r"(?:(?:\d*\.\d+)|(?:\d+\.?))(?:[Ee][+-]?\d+)?"
     int_pattern = r"\d+"
-    matcher_re = (
-        "^" + matcher.replace("%H", rf"(?P<hours>{float_pattern})").replace("%M", rf"(?P<minutes>{int_pattern})") + "$"
+    groups_re = (
+        matcher.replace("%H", rf"(?P<hours>{float_pattern})")
+        .replace("%M", rf"(?P<minutes>{int_pattern})")
+        .replace("%S", rf"(?P<seconds>{float_pattern})")
     )
+    matcher_re = "^" + groups_re + "$"
     return re.compile(matcher_re, re.VERBOSE)
 
 
-def parse_duration(time_str: str, pattern: DurationMatcher) -> Time:
+def compile_bytes_matcher(pattern: DurationMatcher) -> BytesDurationMatcher:
+    return re.compile(pattern.pattern.encode(), re.VERBOSE)
+
+
+def _parts(matches: re.Match[AnyStr]) -> dict[str, Union[str, AnyStr]]:
+    return {"hours": "0", "minutes": "0", "seconds": "0"} | matches.groupdict()
+
+
+def match_duration(time_str: AnyStr, pattern: re.Pattern[AnyStr]) -> dict[str, Union[str, AnyStr]]:
+    """Return the hours, minutes and seconds of a duration as unparsed strings, defaulting to `0`."""
     matches = pattern.match(time_str)
     if matches is None:
-        raise ValueError(f"Invalid duration: {time_str}")
-    matches_dict = {"hours": "0", "minutes": "0"} | matches.groupdict()
-    return Time(hours=_parse_hours(matches_dict["hours"]), minutes=_parse_minutes(matches_dict["minutes"]))
+        raise ValueError(f"Invalid duration: {as_text(time_str)}")
+    return _parts(matches)
+
+
+def match_any_duration(time_str: AnyStr, patterns: Iterable[re.Pattern[AnyStr]]) -> dict[str, Union[str, AnyStr]]:
+    """Return the parts of a duration like `match_duration`, with the first of the patterns that matches it."""
+    for pattern in patterns:
+        matches = pattern.match(time_str)
+        if matches is not None:
+            return _parts(matches)
+    raise ValueError(f"Invalid time: {as_text(time_str)}")
+
+
+def _time(matches_dict: dict[str, Union[str, AnyStr]]) -> Time:
+    return Time(
+        hours=_parse_hours(matches_dict["hours"]),
+        minutes=_parse_minutes(matches_dict["minutes"]),
+        seconds=_parse_seconds(matches_dict["seconds"]),
+    )
+
+
+def parse_duration(time_str: AnyStr, pattern: re.Pattern[AnyStr]) -> Time:
+    return _time(match_duration(time_str, pattern))
+
+
+def parse_any_duration(time_str: AnyStr, patterns: Iterable[re.Pattern[AnyStr]]) -> Time:
+    """Parse a duration with the first of the patterns that matches it."""
+    return _time(match_any_duration(time_str, patterns))
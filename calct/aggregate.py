@@ -0,0 +1,158 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import csv
+from enum import Enum
+from typing import Iterable, Optional, Sequence, TextIO, Union
+
+from calct._common import Number
+from calct.duration import Duration
+from calct.parser import compute_chunks
+
+Column = Union[int, str]
+GroupKey = tuple[str, ...]
+
+
+class Aggregation(Enum):
+    """Enum for the aggregations computed on each group"""
+
+    SUM = "sum"
+    MIN = "min"
+    MAX = "max"
+    MEAN = "mean"
+    COUNT = "count"
+
+
+class Group:
+    """Running aggregates over the durations of a group, kept as integer minutes"""
+
+    __slots__ = ("count", "total", "minimum", "maximum")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0
+        self.minimum = 0
+        self.maximum = 0
+
+    def add(self, minutes: int, weight: int = 1) -> None:
+        """Adds `weight` durations, in minutes, to the group"""
+        if self.count == 0:
+            self.minimum = self.maximum = minutes
+        elif minutes < self.minimum:
+            self.minimum = minutes
+        elif minutes > self.maximum:
+            self.maximum = minutes
+        self.count += weight
+        self.total += minutes * weight
+
+    def merge(self, other: Group) -> None:
+        """Adds all the durations of another group to this one"""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.minimum, self.maximum = other.minimum, other.maximum
+        else:
+            self.minimum = min(self.minimum, other.minimum)
+            self.maximum = max(self.maximum, other.maximum)
+        self.count += other.count
+        self.total += other.total
+
+    def value(self, aggregation: Aggregation) -> Union[int, Duration]:
+        """Returns an aggregate of the group, as a Duration or, for the count, as an int"""
+        if aggregation is Aggregation.COUNT:
+            return self.count
+        if aggregation is Aggregation.SUM:
+            return Duration(minutes=self.total)
+        if aggregation is Aggregation.MIN:
+            return Duration(minutes=self.minimum)
+        if aggregation is Aggregation.MAX:
+            return Duration(minutes=self.maximum)
+        if aggregation is Aggregation.MEAN:
+            return Duration(minutes=self.total) / self.count if self.count > 0 else Duration()
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Group(count={self.count}, total={self.total}, minimum={self.minimum}, maximum={self.maximum})"
+
+
+def evaluate_duration(expr: str) -> Duration:
+    """Computes a duration expression, rejecting expressions that evaluate to a number"""
+    value: Union[Number, Duration] = compute_chunks([expr])
+    if not isinstance(value, Duration):
+        raise ValueError(f"`{expr}` is not a duration")
+    return value
+
+
+def aggregate(rows: Iterable[Sequence[str]], key_columns: Sequence[int], value_column: int) -> dict[GroupKey, Group]:
+    """Groups rows by their key columns and aggregates the duration expressions of their value column
+
+    Rows are consumed one at a time and only the running aggregates are kept, so memory grows with the number of
+    groups rather than with the number of rows.
+    """
+    groups: dict[GroupKey, Group] = {}
+    width = max([*key_columns, value_column]) + 1
+
+    for row_number, row in enumerate(rows, start=1):
+        if len(row) == 0:
+            continue
+        if len(row) < width:
+            raise ValueError(f"Invalid row {row_number}: expected at least {width} columns, got {len(row)}")
+        key = tuple(row[column] for column in key_columns)
+        try:
+            minutes = evaluate_duration(row[value_column]).total_minutes
+        except (ValueError, TypeError) as ex:
+            raise type(ex)(f"Invalid duration on row {row_number}: {ex}") from ex
+
+        if (group := groups.get(key)) is None:
+            group = groups[key] = Group()
+        group.add(minutes)
+
+    return groups
+
+
+def column_index(column: Column, header: Optional[Sequence[str]]) -> int:
+    """Returns the index of a column, given by index or by its name in the header"""
+    if isinstance(column, int):
+        return column
+    if header is None:
+        raise ValueError(f"Column `{column}` can only be given by name when the input has a header")
+    try:
+        return list(header).index(column)
+    except ValueError as ex:
+        raise ValueError(f"Unknown column `{column}`, expected one of {', '.join(header)}") from ex
+
+
+def aggregate_csv(
+    stream: TextIO,
+    key_columns: Sequence[Column],
+    value_column: Column,
+    delimiter: str = ",",
+    has_header: bool = True,
+) -> tuple[list[str], dict[GroupKey, Group]]:
+    """Aggregates a CSV or TSV stream, with columns given by index or by header name
+
+    Returns the names of the key columns and the groups.
+    """
+    reader = csv.reader(stream, delimiter=delimiter)
+    header = next(reader, None) if has_header else None
+
+    key_indices = [column_index(column, header) for column in key_columns]
+    value_index = column_index(value_column, header)
+    key_names = [header[index] if header is not None else str(index) for index in key_indices]
+
+    return key_names, aggregate(reader, key_indices, value_index)
@@ -0,0 +1,259 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import mmap
+import os
+import re
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import chain, islice, repeat
+from typing import Iterable, Iterator, Optional, TextIO, Union, cast
+
+from calct._common import OPS_STR, Number
+from calct.bytes_parser import Buffer, compute_bytes
+from calct.duration import Duration, Resolution, Settings, get_settings, use_settings
+from calct.parser import (
+    Token,
+    compute_chunks,
+    evaluate_rpn,
+    iter_lex,
+    iter_parse,
+    split_sum,
+)
+
+_NON_BLANK_LINE = re.compile(rb"[^\n]*\S[^\n]*")
+_NEWLINE = re.compile(rb"\n")
+
+EVALUATION_ERRORS = (ArithmeticError, IndexError, TypeError, ValueError)
+
+RANGES_PER_JOB = 4
+
+RANGE_SIZE = 1024 * 1024
+
+PENDING_RANGES_PER_JOB = 2
+
+DEFAULT_BATCH_SIZE = 256
+
+PARALLEL_MIN_LENGTH = 256 * 1024
+
+
+def iter_line_spans(data: Buffer, start: int = 0, end: Optional[int] = None) -> Iterator[tuple[int, int]]:
+    """Yields the `(start, end)` byte offsets of the non-blank lines of a buffer"""
+    end = len(data) if end is None else end
+    for match in _NON_BLANK_LINE.finditer(data, start, end):
+        yield match.span()
+
+
+def compute_lines(data: Buffer, start: int = 0, end: Optional[int] = None) -> Iterator[Union[Number, Duration]]:
+    """Computes the value of each non-blank line of a buffer, in order"""
+    for line_start, line_end in iter_line_spans(data, start, end):
+        try:
+            yield compute_bytes(data, line_start, line_end)
+        except (ValueError, TypeError) as ex:
+            raise type(ex)(f"Invalid expression on the line at byte offset {line_start}: {ex}") from ex
+
+
+def compute_file(path: Union[str, os.PathLike[str]]) -> Iterator[Union[Number, Duration]]:
+    """Computes the value of each non-blank line of a file, memory-mapping it instead of reading it"""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield from compute_lines(data)
+
+
+def split_line_ranges(data: Buffer, parts: int) -> list[tuple[int, int]]:
+    """Splits a buffer into at most `parts` contiguous byte ranges, each ending on a line boundary"""
+    size = len(data)
+    ranges: list[tuple[int, int]] = []
+    start = 0
+
+    for part in range(1, parts + 1):
+        if start >= size:
+            break
+        target = max(start, size * part // parts)
+        newline = _NEWLINE.search(data, target) if part < parts else None
+        end = size if newline is None else newline.end()
+        ranges.append((start, end))
+        start = end
+
+    return ranges
+
+
+def iter_line_ranges(data: Buffer, range_size: int = RANGE_SIZE) -> Iterator[tuple[int, int]]:
+    """Yields contiguous byte ranges of about `range_size` bytes covering a buffer, each ending on a line boundary"""
+    size = len(data)
+    start = 0
+
+    while start < size:
+        target = start + range_size
+        newline = _NEWLINE.search(data, target) if target < size else None
+        end = size if newline is None else newline.end()
+        yield start, end
+        start = end
+
+
+def render_lines(data: Buffer, start: int = 0, end: Optional[int] = None) -> tuple[list[str], list[str]]:
+    """Computes and renders each non-blank line of a buffer
+
+    Returns the rendered results, with an empty string for each invalid line, and the error messages.
+    """
+    lines: list[str] = []
+    errors: list[str] = []
+
+    for line_start, line_end in iter_line_spans(data, start, end):
+        try:
+            lines.append(str(compute_bytes(data, line_start, line_end)))
+        except EVALUATION_ERRORS as ex:
+            lines.append("")
+            errors.append(f"Invalid expression on the line at byte offset {line_start}: {ex!r}")
+
+    return lines, errors
+
+
+def _init_worker(separator: str, resolution: Resolution) -> None:
+    Duration.set_string_hour_minute_separator(separator)
+    Duration.set_resolution(resolution)
+
+
+def _render_mapped_range(path: str, start: int, end: int) -> tuple[list[str], list[str]]:
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return render_lines(data, start, end)
+
+
+def evaluate_file(
+    path: Union[str, os.PathLike[str]], output: TextIO, jobs: Optional[int] = None, range_size: int = RANGE_SIZE
+) -> list[str]:
+    """Computes each non-blank line of a file, writing one result per line to `output`, in input order
+
+    The file is memory-mapped and evaluated in line-aligned byte ranges of about `range_size` bytes, each written out
+    before moving on, so memory use doesn't grow with the size of the file. With more than one job, each range is
+    evaluated by a worker process that maps the file itself, so only the rendered results go through pipes, and at
+    most `PENDING_RANGES_PER_JOB` ranges per job are in flight. Returns the error messages of the invalid lines.
+    """
+    path = os.fspath(path)
+    jobs = (os.cpu_count() or 1) if jobs is None else jobs
+    errors: list[str] = []
+
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return errors
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if jobs <= 1:
+                for start, end in iter_line_ranges(data, range_size):
+                    _write_rendered(output, render_lines(data, start, end), errors)
+                return errors
+
+            with ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=_init_worker,
+                initargs=(Duration.get_string_hour_minute_separator(), Duration.get_resolution()),
+            ) as executor:
+                pending: deque[Future[tuple[list[str], list[str]]]] = deque()
+                for start, end in iter_line_ranges(data, range_size):
+                    if len(pending) >= jobs * PENDING_RANGES_PER_JOB:
+                        _write_rendered(output, pending.popleft().result(), errors)
+                    pending.append(executor.submit(_render_mapped_range, path, start, end))
+                while len(pending) > 0:
+                    _write_rendered(output, pending.popleft().result(), errors)
+
+    return errors
+
+
+def _write_rendered(output: TextIO, rendered: tuple[list[str], list[str]], errors: list[str]) -> None:
+    lines, range_errors = rendered
+    _write_lines(output, lines)
+    errors.extend(range_errors)
+
+
+def _write_lines(output: TextIO, lines: list[str]) -> None:
+    if len(lines) > 0:
+        output.write("\n".join(lines))
+        output.write("\n")
+
+
+def _compute_batch(settings: Settings, exprs: list[str]) -> list[Union[Number, Duration]]:
+    with use_settings(settings):
+        return [compute_chunks((expr,)) for expr in exprs]
+
+
+def compute_many(
+    exprs: Iterable[str], max_workers: Optional[int] = None, batch_size: int = DEFAULT_BATCH_SIZE
+) -> list[Union[Number, Duration]]:
+    """Computes the value of each expression on a pool of threads, returning the results in input order
+
+    The expressions are evaluated in batches of `batch_size`, each with the settings of the calling context. The
+    threads only run in parallel on a free-threaded (no-GIL) build of Python. The first invalid expression raises.
+    """
+    settings = get_settings()
+    remaining = iter(exprs)
+    batches = list(iter(lambda: list(islice(remaining, batch_size)), []))
+
+    if max_workers == 1 or len(batches) <= 1:
+        return list(chain.from_iterable(_compute_batch(settings, batch) for batch in batches))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(chain.from_iterable(executor.map(_compute_batch, repeat(settings), batches)))
+
+
+def _sum_piece(settings: Settings, piece: str, first: bool) -> Union[Number, Duration]:
+    with use_settings(settings):
+        tokens: Iterable[Token] = iter_lex((piece,))
+        # The pieces after the first start with their `+` or `-`, applied to a zero duration
+        rpn = list(iter_parse(tokens if first else chain((Duration(),), tokens)))
+        # A piece leaving several values, like `2h 3h`, would not add up to the sequential result
+        if sum(-1 if isinstance(element, str) and element in OPS_STR else 1 for element in rpn) != 1:
+            raise ValueError("The piece does not reduce to a single value")
+        return evaluate_rpn(rpn)
+
+
+def _tree_sum(durations: list[Duration]) -> Duration:
+    while len(durations) > 1:
+        pairs = [first + second for first, second in zip(durations[::2], durations[1::2])]
+        if len(durations) % 2 == 1:
+            pairs.append(durations[-1])
+        durations = pairs
+    return durations[0]
+
+
+def compute_parallel(
+    expr: str, jobs: Optional[int] = None, min_length: int = PARALLEL_MIN_LENGTH
+) -> Union[Number, Duration]:
+    """Computes an expression, summing the pieces of a long top-level chain of `+` and `-` in worker processes
+
+    The expression is split before top-level `+` and `-` into pieces summed by `jobs` worker processes, and their
+    partial sums are added pairwise. Durations being integers of the resolution, this is exactly the sequential
+    result. Expressions shorter than `min_length` characters, expressions with a piece that is not a duration, such
+    as sums of floats, or that does not reduce to a single value, and invalid expressions, to raise the same error,
+    are computed sequentially instead.
+    """
+    jobs = (os.cpu_count() or 1) if jobs is None else jobs
+    pieces = split_sum(expr, jobs * RANGES_PER_JOB) if jobs > 1 and len(expr) >= min_length else [expr]
+    if len(pieces) <= 1:
+        return compute_chunks((expr,))
+
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            firsts = chain((True,), repeat(False))
+            partials = list(executor.map(_sum_piece, repeat(get_settings()), pieces, firsts))
+    except EVALUATION_ERRORS:
+        return compute_chunks((expr,))
+
+    if not all(isinstance(partial, Duration) for partial in partials):
+        return compute_chunks((expr,))
+    return _tree_sum(cast(list[Duration], partials))
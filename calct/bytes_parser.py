@@ -0,0 +1,138 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import mmap
+import re
+from functools import lru_cache
+from typing import Iterator, Optional, Union
+
+from calct._common import (
+    FLOAT_CHARS_STR,
+    FLOAT_EXPONENT_STR,
+    NUMBER_START_STR,
+    OPS_PAREN_STR,
+    SIGN_STR,
+    CharClass,
+    Number,
+    as_text,
+    char_classes,
+    parse_number,
+)
+from calct._duration_parser import (
+    BytesDurationMatcher,
+    compile_bytes_matcher,
+    parse_any_duration,
+)
+from calct.duration import Duration, duration_matchers
+from calct.parser import Token, evaluate_rpn, evaluate_token, iter_parse
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+_OPS_PAREN_BYTES = OPS_PAREN_STR.encode()
+_FLOAT_CHARS_BYTES = FLOAT_CHARS_STR.encode() + SIGN_STR.encode()
+_NUMBER_START_BYTES = NUMBER_START_STR.encode()
+
+_NOT_WORD = (CharClass.WHITESPACE, CharClass.OPERATOR)
+
+
+def _any_char(chars: str) -> bytes:
+    """Matches one of the characters encoded in UTF-8, where a custom separator can take several bytes"""
+    ascii_chars = "".join(char for char in chars if char.isascii())
+    others = [re.escape(char.encode()) for char in chars if not char.isascii()]
+    return b"(?:" + b"|".join([b"[" + re.escape(ascii_chars.encode()) + b"]", *others]) + b")"
+
+
+@lru_cache(maxsize=None)
+def _token_pattern(hour_sep: str) -> re.Pattern[bytes]:
+    """Matches the whitespace, operators and words that `iter_lex` splits an expression into, for a separator"""
+    word = _any_char("".join(char for char, cls in char_classes(hour_sep).items() if cls not in _NOT_WORD))
+    number_start, signs = re.escape(_NUMBER_START_BYTES), re.escape(SIGN_STR.encode())
+    exponent = re.escape(FLOAT_EXPONENT_STR.encode())
+    # In a word starting like a number, a sign right after an exponent is part of the word, as in `1e-3`
+    number = b"[" + number_start + b"]" + word + b"*(?:(?<=[" + exponent + b"])[" + signs + b"]" + word + b"*)*"
+    return re.compile(
+        rb"(?P<whitespace>\s+)"
+        rb"|(?P<operator>[" + re.escape(_OPS_PAREN_BYTES) + rb"])"
+        rb"|(?P<literal>" + number + b"|" + word + b"+)"
+    )
+
+
+@lru_cache(maxsize=None)
+def _duration_patterns(hour_sep: str) -> tuple[BytesDurationMatcher, ...]:
+    return tuple(compile_bytes_matcher(pattern) for pattern in duration_matchers(hour_sep))
+
+
+def decode_duration(token: bytes) -> Duration:
+    """Decodes a duration token, like `Duration.parse` does for strings"""
+    time = parse_any_duration(token, _duration_patterns(Duration.get_string_hour_minute_separator()))
+    return Duration(hours=time.hours, minutes=time.minutes, seconds=time.seconds)
+
+
+def decode_literal(token: bytes) -> Union[Number, Duration]:
+    """Decodes a duration or number token, like `calct.parser.evaluate_token` does for strings"""
+    if len(token.translate(None, _FLOAT_CHARS_BYTES)) == 0:
+        return parse_number(token)
+    try:
+        return decode_duration(token)
+    except ValueError:
+        # Names can't be evaluated without bindings: they, and the other rare tokens, get the errors of the text path
+        return evaluate_token(as_text(token))
+
+
+def iter_lex_bytes(data: Buffer, start: int = 0, end: Optional[int] = None) -> Iterator[Token]:
+    """Lexes a bytes-like object into tokens, lazily
+
+    Operators and parentheses are produced as strings, while literals are decoded directly into numbers and
+    durations. Only the bytes between `start` and `end` are read, and the input is never copied or decoded as a
+    whole, so `data` can be a `memoryview` or an `mmap`.
+    """
+    pattern = _token_pattern(Duration.get_string_hour_minute_separator())
+    end = len(data) if end is None else end
+    pos = start
+
+    while pos < end:
+        match = pattern.match(data, pos, end)
+        if match is None:
+            raise ValueError(f"Invalid character at byte offset {pos}: {bytes(data[pos:pos + 1])!r}")
+
+        kind = match.lastgroup
+        if kind == "operator":
+            yield match.group().decode()
+        elif kind == "literal":
+            literal = match.group()
+            if (
+                literal[-1:] in (b"e", b"E")
+                and literal[0] in _NUMBER_START_BYTES
+                and match.end() < end
+                and data[match.end()] in _OPS_PAREN_BYTES
+            ):
+                raise ValueError(
+                    f"`{chr(data[match.end()])}` is following `{FLOAT_EXPONENT_STR}` and is not a digit or a sign"
+                )
+            yield decode_literal(literal)
+        pos = match.end()
+
+
+def lex_bytes(data: Buffer, start: int = 0, end: Optional[int] = None) -> list[Token]:
+    """Lexes a bytes-like object into a list of tokens"""
+    return list(iter_lex_bytes(data, start, end))
+
+
+def compute_bytes(data: Buffer, start: int = 0, end: Optional[int] = None) -> Union[Number, Duration]:
+    """Computes the value of an expression stored as ASCII or UTF-8 bytes, without decoding it to a string"""
+    return evaluate_rpn(iter_parse(iter_lex_bytes(data, start, end)))
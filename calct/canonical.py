@@ -0,0 +1,181 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from __future__ import annotations
+
+import math
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Iterable, Mapping, NamedTuple, Optional
+
+from calct._common import OPS_STR
+from calct.duration import (
+    MILLISECONDS_PER_SECOND,
+    Duration,
+    Resolution,
+    Settings,
+    get_settings,
+)
+from calct.inference import (
+    Kind,
+    literal,
+    literal_kind,
+    result_kind,
+    unsupported_operation,
+)
+from calct.parser import Associativity, Operation, Token, lex, parse
+
+FINGERPRINT_BYTES = 8
+LITERAL_CACHE_SIZE = 64 * 1024
+
+_ATOM = 5
+_OPERATIONS = {operation.value: operation for operation in Operation}
+
+
+class _Form(NamedTuple):
+    """Canonical text of a subexpression, with what is needed to combine it further"""
+
+    text: str
+    kind: Kind
+    precedence: int = _ATOM
+    # Signed terms of a flattened chain of `+` and `-`, or of `*`, empty otherwise
+    terms: tuple[tuple[str, str], ...] = ()
+    chain: str = ""
+
+
+def _duration_text(duration: Duration, resolution: Resolution) -> str:
+    """Writes a duration as a whole number of resolution units"""
+    milliseconds = duration.total_milliseconds
+    if resolution is Resolution.MINUTE:
+        return f"{duration.total_minutes}m"
+    if resolution is Resolution.SECOND:
+        return f"{milliseconds // MILLISECONDS_PER_SECOND}s"
+    seconds, milliseconds = divmod(milliseconds, MILLISECONDS_PER_SECOND)
+    return f"{seconds}.{milliseconds:03}s" if milliseconds != 0 else f"{seconds}s"
+
+
+def _literal_form(token: Token, resolution: Resolution) -> Optional[_Form]:
+    """Returns the canonical form of a literal token, or None for a variable or a result reference"""
+    value = literal(token)
+    if value is None:
+        return None
+    if isinstance(value, Duration):
+        return _Form(_duration_text(value, resolution), Kind.DURATION)
+    if isinstance(value, float) and not math.isfinite(value):
+        return _Form(str(token), Kind.NUMBER)
+    return _Form(repr(value), literal_kind(value))
+
+
+@lru_cache(maxsize=LITERAL_CACHE_SIZE)
+def _cached_literal_form(
+    token: str, hour_sep: str, resolution: Resolution  # pylint: disable=unused-argument
+) -> Optional[_Form]:
+    """Same as `_literal_form`, for the same tokens coming back across expressions
+
+    The hour separator is only part of the key, as it changes how the token is parsed.
+    """
+    return _literal_form(token, resolution)
+
+
+def _leaf(token: Token, kinds: Mapping[str, Kind], settings: Settings) -> _Form:
+    if isinstance(token, str):
+        form = _cached_literal_form(token, settings.hour_sep, settings.resolution)
+    else:
+        form = _literal_form(token, settings.resolution)
+    return form if form is not None else _Form(str(token), kinds.get(str(token), Kind.ANY))
+
+
+def _operand(form: _Form, operation: Operation, right: bool) -> str:
+    """Writes an operand, in parentheses only if the precedence of the operation requires it"""
+    if form.precedence > operation.precedence:
+        return form.text
+    if form.precedence == operation.precedence and (operation.associativity is Associativity.LEFT) != right:
+        return form.text
+    return f"({form.text})"
+
+
+def _chain_terms(form: _Form, operation: Operation, chain: str) -> tuple[tuple[str, str], ...]:
+    """Returns the terms of an operand of a chain, which is a single term unless it is a chain of the same kind"""
+    if form.chain == chain:
+        return form.terms
+    return ((chain, _operand(form, operation, False)),)
+
+
+def _combine(operator: str, left: _Form, right: _Form) -> _Form:
+    kind = result_kind(operator, left.kind, right.kind)
+    if kind is None:
+        raise unsupported_operation(operator, left.kind, right.kind)
+    operation = _OPERATIONS[operator]
+
+    # Integers and durations (as integer counts of units) are exact, so sums and products of them are reordered
+    # freely; floats and the truncation of scaled durations are not, so only the two operands of `+` and `*` swap.
+    if (operator in "+-" and kind in (Kind.DURATION, Kind.INTEGER)) or (operator == "*" and kind is Kind.INTEGER):
+        chain = "+" if operator in "+-" else "*"
+        right_terms = _chain_terms(right, operation, chain)
+        if operator == "-":
+            right_terms = tuple(("-" if sign == "+" else "+", text) for sign, text in right_terms)
+        terms = tuple(
+            sorted(_chain_terms(left, operation, chain) + right_terms, key=lambda term: (term[0] == "-", term[1]))
+        )
+        text = terms[0][1] + "".join(f" {sign} {text}" for sign, text in terms[1:])
+        return _Form(text, kind, operation.precedence, terms, chain)
+
+    if operator in "+*" and right.text < left.text:
+        left, right = right, left
+    text = f"{_operand(left, operation, False)} {operator} {_operand(right, operation, True)}"
+    return _Form(text, kind, operation.precedence)
+
+
+def canonical_form(rpn: Iterable[Token], kinds: Optional[Mapping[str, Kind]] = None) -> str:
+    """Returns the canonical text of an expression given as a Reverse Polish Notation (RPN) stack
+
+    Equivalent spellings share the same canonical text: literals are written as whole numbers of the resolution
+    unit, operands of commutative operations are sorted, and spaces and parentheses are normalized. Variables are
+    assumed to be of an unknown kind unless given in `kinds`, which allows reordering more of the expression.
+    Raises a TypeError if the kinds don't support an operation, and a ValueError if the expression is invalid.
+    """
+    if kinds is None:
+        kinds = {}
+    settings = get_settings()
+
+    stack: list[_Form] = []
+    for token in rpn:
+        if isinstance(token, str) and token in OPS_STR:
+            if len(stack) < 2:
+                raise ValueError(f"Invalid expression: missing operand for `{token}`")
+            right = stack.pop()
+            stack.append(_combine(token, stack.pop(), right))
+        else:
+            stack.append(_leaf(token, kinds, settings))
+
+    if len(stack) != 1:
+        raise ValueError("Invalid expression: expected exactly one value")
+    return stack[0].text
+
+
+def canonicalize(expr: str, kinds: Optional[Mapping[str, Kind]] = None) -> str:
+    """Returns the canonical text of an expression, see `canonical_form`"""
+    return canonical_form(parse(lex(expr)), kinds)
+
+
+def fingerprint(expr: str, kinds: Optional[Mapping[str, Kind]] = None) -> int:
+    """Returns a stable 64-bit fingerprint of an expression, equal for all the spellings of the same computation
+
+    The resolution is part of the fingerprint, as it changes the result of scaling durations.
+    """
+    key = f"{get_settings().resolution.name}\n{canonicalize(expr, kinds)}"
+    return int.from_bytes(blake2b(key.encode(), digest_size=FINGERPRINT_BYTES).digest(), "little")
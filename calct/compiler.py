@@ -0,0 +1,253 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import builtins
+import math
+from typing import Any, Callable, Iterable, Mapping, Optional, Sequence, Union
+
+from calct._common import OPS_STR, Number
+from calct._divmod import truncated_div
+from calct.duration import Duration, Settings, get_settings
+from calct.inference import (
+    Kind,
+    literal,
+    literal_kind,
+    result_kind,
+    unsupported_operation,
+)
+from calct.parser import Token, lex, parse
+
+CompiledExpression = Callable[..., Union[Number, Duration]]
+Binding = Union[Sequence[int], Number, Duration]
+# Source of a value in a generated kernel, its kind, and whether it is the same for every row
+_Operand = tuple[str, Kind, bool]
+
+
+def _lookup(bindings: Optional[Mapping[str, Union[Number, Duration]]], token: str) -> Union[Number, Duration]:
+    if bindings is None or token not in bindings:
+        raise ValueError(f"`{token}` is not a bound variable or a known result reference")
+    return bindings[token]
+
+
+def _constant(value: Any, namespace: dict[str, Any]) -> str:
+    if isinstance(value, int) or (isinstance(value, float) and math.isfinite(value)):
+        return repr(value)
+    name = f"_k{len(namespace)}"
+    namespace[name] = value
+    return name
+
+
+def _literal_operand(element: Token, unit: int, namespace: dict[str, Any]) -> _Operand:
+    """Operand of a literal, as a duration in integer units or as a number, which doesn't change between rows"""
+    value = literal(element)
+    if value is None:
+        raise ValueError(f"`{element}` is not a bound variable")
+    if isinstance(value, Duration):
+        return _constant(truncated_div(value.total_milliseconds, unit), namespace), Kind.DURATION, True
+    return _constant(value, namespace), literal_kind(value), True
+
+
+def _operation(element: str, left: tuple[str, Kind], right: tuple[str, Kind]) -> tuple[str, Optional[Kind]]:
+    """Source of an operation, and its kind, or None as the kind if it can't be done on integer units and numbers
+
+    The `to` operator is rewritten as a subtraction.
+    """
+    (left_source, left_kind), (right_source, right_kind) = left, right
+    kind = result_kind(element, left_kind, right_kind)
+    if element == "@":
+        left_source, right_source, element = right_source, left_source, "-"
+    infix = f"{left_source} {element} {right_source}"
+
+    if kind is None or kind is Kind.ANY:
+        return infix, None
+    if kind is not Kind.DURATION or element in "+-":
+        return infix, kind
+    if element == "*" and (left_kind is Kind.INTEGER or right_kind is Kind.INTEGER):
+        return infix, kind
+    return f"int({infix})", kind
+
+
+def compile_source(rpn: Iterable[Token]) -> tuple[str, dict[str, Any]]:
+    """Generates the source of a Python function evaluating a Reverse Polish Notation (RPN) stack
+
+    Returns the source of `compiled(bindings=None)` and the namespace it needs. Duration literals are parsed once,
+    with the current settings, and kept as integer counts of the resolution unit (minutes by default), so sums,
+    differences and products of literals are plain integer arithmetic. Variables and result references like `_` or
+    `$1` are looked up in `bindings` on each call, and whatever they touch falls back to the operators of `Duration`.
+    """
+    unit = Duration.get_resolution().value
+    namespace: dict[str, Any] = {"_from_milliseconds": Duration.from_milliseconds, "_lookup": _lookup}
+    lines = ["def compiled(bindings=None):"]
+    stack: list[tuple[str, Kind]] = []
+
+    def as_object(source: str, kind: Kind) -> str:
+        return f"_from_milliseconds({source} * {unit})" if kind is Kind.DURATION else source
+
+    for element in rpn:
+        if isinstance(element, str) and element in OPS_STR:
+            right = stack.pop()
+            left = stack.pop()
+            expression, kind = _operation(element, left, right)
+            if kind is None:
+                if left[1] is not Kind.ANY and right[1] is not Kind.ANY:
+                    raise unsupported_operation(element, left[1], right[1])
+                expression, _ = _operation(element, (as_object(*left), Kind.ANY), (as_object(*right), Kind.ANY))
+                kind = Kind.ANY
+            name = f"t{len(lines)}"
+            lines.append(f"    {name} = {expression}")
+            stack.append((name, kind))
+        elif (value := literal(element)) is None:
+            stack.append((f"_lookup(bindings, {element!r})", Kind.ANY))
+        elif isinstance(value, Duration):
+            stack.append((_constant(truncated_div(value.total_milliseconds, unit), namespace), Kind.DURATION))
+        else:
+            stack.append((_constant(value, namespace), literal_kind(value)))
+
+    if len(stack) == 0:
+        raise ValueError("Invalid expression: the expression is empty")
+    lines.append(f"    return {as_object(*stack[-1])}")
+    return "\n".join(lines) + "\n", namespace
+
+
+def _build(source: str, namespace: dict[str, Any], name: str, expr: str) -> Callable[..., Any]:
+    exec(builtins.compile(source, f"<calct {expr!r}>", "exec"), namespace)  # pylint: disable=exec-used
+    function = namespace[name]
+    function.__doc__ = expr
+    return function
+
+
+def compile(expr: str) -> CompiledExpression:  # pylint: disable=redefined-builtin
+    """Compiles an expression to a Python function, taking the bindings of its variables and result references
+
+    The literals are parsed once, with the settings of the calling context: calling the function only does the
+    arithmetic. See `compile_source`.
+    """
+    source, namespace = compile_source(parse(lex(expr)))
+    return _build(source, namespace, "compiled", expr)
+
+
+class Expression:  # pylint: disable=too-few-public-methods
+    """Expression parsed once, then evaluated over whole columns of values bound to its variables
+
+    A variable is bound either to a column, which is a sequence of integer counts of the resolution unit (minutes by
+    default) used as durations, or to a single duration or number used for every row. For each set of settings and
+    kinds of bindings, a loop specialized for integer arithmetic is generated once and reused.
+    """
+
+    def __init__(self, expr: str) -> None:
+        self.expr = expr
+        self.rpn: list[Token] = list(parse(lex(expr)))
+        self.variables: tuple[str, ...] = tuple(
+            dict.fromkeys(
+                element
+                for element in self.rpn
+                if isinstance(element, str) and element not in OPS_STR and literal(element) is None
+            )
+        )
+        self._kernels: dict[tuple[Settings, tuple[Optional[Kind], ...]], Callable[..., list[Number]]] = {}
+
+    def evaluate(self, bindings: Mapping[str, Binding]) -> list[Number]:
+        """Evaluates the expression for each row of the bound columns
+
+        Duration results are returned as integer counts of the resolution unit, like the columns.
+        """
+        unit = Duration.get_resolution().value
+        signature: list[Optional[Kind]] = []
+        arguments: list[Any] = []
+        length = None
+
+        for name in self.variables:
+            try:
+                value = bindings[name]
+            except KeyError:
+                raise ValueError(f"`{name}` is not a bound variable") from None
+            if isinstance(value, Duration):
+                signature.append(Kind.DURATION)
+                arguments.append(truncated_div(value.total_milliseconds, unit))
+            elif isinstance(value, (int, float)):
+                signature.append(literal_kind(value))
+                arguments.append(value)
+            else:
+                if length is not None and len(value) != length:
+                    raise ValueError(f"Column `{name}` has {len(value)} rows instead of {length}")
+                length = len(value)
+                signature.append(None)
+                arguments.append(value)
+
+        if length is None:
+            raise ValueError("At least one variable must be bound to a column")
+
+        key = (get_settings(), tuple(signature))
+        if (kernel := self._kernels.get(key)) is None:
+            kernel = self._kernels[key] = self._compile_kernel(key[1])
+        return kernel(*arguments)
+
+    def _compile_kernel(self, signature: tuple[Optional[Kind], ...]) -> Callable[..., list[Number]]:
+        namespace: dict[str, Any] = {}
+        columns = [f"v{index}" for index, kind in enumerate(signature) if kind is None]
+        prelude, body, (result, _, invariant) = self._statements(signature, namespace)
+
+        lines = [f"def kernel({', '.join(f'v{index}' for index in range(len(signature)))}):"]
+        lines += [f"    {line}" for line in prelude]
+        if invariant:
+            lines.append(f"    return [{result}] * len({columns[0]})")
+        else:
+            names = ", ".join(f"c{name[1:]}" for name in columns)
+            lines.append("    out = []")
+            lines.append("    append = out.append")
+            lines.append(f"    for {names}{',' if len(columns) == 1 else ''} in zip({', '.join(columns)}):")
+            lines += [f"        {line}" for line in body]
+            lines.append(f"        append({result})")
+            lines.append("    return out")
+        return _build("\n".join(lines) + "\n", namespace, "kernel", self.expr)
+
+    def _statements(
+        self, signature: tuple[Optional[Kind], ...], namespace: dict[str, Any]
+    ) -> tuple[list[str], list[str], _Operand]:
+        """Statements computing the expression, split into those run once and those run for each row
+
+        Returns the statements run once, the statements run for each row, and the operand holding the result.
+        """
+        unit = Duration.get_resolution().value
+        operands: dict[str, _Operand] = {
+            name: (f"c{index}", Kind.DURATION, False) if kind is None else (f"v{index}", kind, True)
+            for index, (name, kind) in enumerate(zip(self.variables, signature))
+        }
+        prelude: list[str] = []
+        body: list[str] = []
+        stack: list[_Operand] = []
+
+        for element in self.rpn:
+            if isinstance(element, str) and element in OPS_STR:
+                right = stack.pop()
+                left = stack.pop()
+                expression, kind = _operation(element, (left[0], left[1]), (right[0], right[1]))
+                if kind is None:
+                    raise unsupported_operation(element, left[1], right[1])
+                invariant = left[2] and right[2]
+                name = f"t{len(prelude) + len(body)}"
+                (prelude if invariant else body).append(f"{name} = {expression}")
+                stack.append((name, kind, invariant))
+            elif isinstance(element, str) and element in operands:
+                stack.append(operands[element])
+            else:
+                stack.append(_literal_operand(element, unit, namespace))
+
+        if len(stack) == 0:
+            raise ValueError("Invalid expression: the expression is empty")
+        return prelude, body, stack[-1]
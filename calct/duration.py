@@ -16,52 +16,150 @@
 
 from __future__ import annotations
 
+import struct
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
 from datetime import timedelta
-from functools import total_ordering
-from itertools import chain
+from enum import IntEnum
+from functools import lru_cache, total_ordering
+from itertools import chain, product
+from typing import Callable, Iterator, Optional
 
 from calct._common import (
     CANT_BE_CUSTOM_SEPARATOR,
     DEFAULT_HOUR_SEPARATOR,
     DEFAULT_MINUTE_SEPARATOR,
+    DEFAULT_SECOND_SEPARATOR,
+    CharClass,
     Number,
+    char_classes,
 )
-from calct._divmod import duration_friendly_divmod
-from calct._duration_parser import compile_matcher, parse_duration
+from calct._divmod import duration_friendly_divmod, truncated_div
+from calct._duration_parser import DurationMatcher, compile_matcher, parse_any_duration
 
+_INT64 = struct.Struct("<q")
 
+MILLISECONDS_PER_SECOND = 1_000
+MILLISECONDS_PER_MINUTE = 60 * MILLISECONDS_PER_SECOND
+MILLISECONDS_PER_HOUR = 60 * MILLISECONDS_PER_MINUTE
+
+
+class Resolution(IntEnum):
+    """Smallest unit kept by durations, as a number of milliseconds."""
+
+    MINUTE = MILLISECONDS_PER_MINUTE
+    SECOND = MILLISECONDS_PER_SECOND
+    MILLISECOND = 1
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Settings used to parse and display durations
+
+    Settings are immutable and scoped to the current context (see `contextvars`), so each thread, or each task
+    run in a copied context, sees its own settings: changing them never affects a computation running elsewhere.
+    """
+
+    hour_sep: str = DEFAULT_HOUR_SEPARATOR[0]
+    resolution: Resolution = Resolution.MINUTE
+
+
+_settings: ContextVar[Settings] = ContextVar("calct_settings", default=Settings())
+
+
+def get_settings() -> Settings:
+    """Return the settings of the current context."""
+    return _settings.get()
+
+
+@contextmanager
+def use_settings(settings: Settings) -> Iterator[Settings]:
+    """Use `settings` in the current context until the end of the `with` block."""
+    token = _settings.set(settings)
+    try:
+        yield settings
+    finally:
+        _settings.reset(token)
+
+
+# The public methods include the accessors of the separator and resolution settings, kept on the class for
+# compatibility, on top of the conversions and the constructors for each unit
 @total_ordering
-class Duration:
-    """Representation of a duration as hours and minutes."""
+class Duration:  # pylint: disable=too-many-public-methods
+    """Representation of a duration as hours, minutes and, depending on the resolution, seconds."""
 
-    str_hour_sep: str = DEFAULT_HOUR_SEPARATOR[0]
     str_minute_sep = DEFAULT_MINUTE_SEPARATOR[0]
+    str_second_sep = DEFAULT_SECOND_SEPARATOR[0]
 
     @classmethod
     def get_string_hour_minute_separator(cls) -> str:
         """Return the character used to separate hours and minutes."""
-        return cls.str_hour_sep
+        return _settings.get().hour_sep
 
     @classmethod
     def set_string_hour_minute_separator(cls, sep: str) -> None:
         """Set the character used to separate hours and minutes."""
         if not isinstance(sep, str) or not len(sep) == 1:  # type:ignore
             raise TypeError("Separator needs to be a one-character string")
-        if set(sep) & set(CANT_BE_CUSTOM_SEPARATOR + DEFAULT_MINUTE_SEPARATOR) != set():
+        sep_class = char_classes(DEFAULT_HOUR_SEPARATOR[0]).get(sep, CharClass.HOUR_SEPARATOR)
+        if sep_class is not CharClass.HOUR_SEPARATOR and sep_class is not CharClass.IDENTIFIER:
+            reserved = set(CANT_BE_CUSTOM_SEPARATOR + DEFAULT_MINUTE_SEPARATOR + DEFAULT_SECOND_SEPARATOR)
             raise ValueError(
                 "Separator can't contain a character from "
-                f"`{''.join(set(CANT_BE_CUSTOM_SEPARATOR + DEFAULT_MINUTE_SEPARATOR))}`"
+                f"`{''.join(reserved)}`"
                 "or it would break the parser"
             )
-        cls.str_hour_sep = sep
+        _settings.set(replace(_settings.get(), hour_sep=sep))
 
     @classmethod
     def del_string_hour_minute_separator(cls) -> None:
         """Restore the default separator for hours and minutes."""
-        cls.str_hour_sep = DEFAULT_HOUR_SEPARATOR[0]
+        _settings.set(replace(_settings.get(), hour_sep=DEFAULT_HOUR_SEPARATOR[0]))
+
+    @classmethod
+    def get_resolution(cls) -> Resolution:
+        """Return the smallest unit kept by durations."""
+        return _settings.get().resolution
+
+    @classmethod
+    def set_resolution(cls, resolution: Resolution) -> None:
+        """Set the smallest unit kept by new durations, and used in display."""
+        if not isinstance(resolution, Resolution):  # type:ignore
+            raise TypeError("Resolution needs to be a `Resolution`")
+        _settings.set(replace(_settings.get(), resolution=resolution))
+
+    @classmethod
+    def del_resolution(cls) -> None:
+        """Restore the default resolution of minutes."""
+        _settings.set(replace(_settings.get(), resolution=Resolution.MINUTE))
 
-    def __init__(self, hours: Number = 0, minutes: int = 0) -> None:
-        self.total_minutes: int = int(hours * 60) + minutes
+    __slots__ = ("total_milliseconds",)
+
+    def __init__(self, hours: Number = 0, minutes: int = 0, seconds: Number = 0) -> None:
+        unit = _settings.get().resolution
+        units = (
+            int(hours * (MILLISECONDS_PER_HOUR // unit))
+            + int(minutes * (MILLISECONDS_PER_MINUTE // unit))
+            + truncated_div(int(round(seconds * MILLISECONDS_PER_SECOND, 6)), unit)
+        )
+        self.total_milliseconds: int = units * unit
+
+    @staticmethod
+    def from_milliseconds(total_milliseconds: int) -> Duration:
+        """Create a Duration from an integer number of milliseconds, exactly, whatever the resolution."""
+        duration = _new(Duration)
+        duration.total_milliseconds = total_milliseconds
+        return duration
+
+    @property
+    def total_minutes(self) -> int:
+        """The duration as a number of minutes, truncated"""
+        return truncated_div(self.total_milliseconds, MILLISECONDS_PER_MINUTE)
+
+    @total_minutes.setter
+    def total_minutes(self, new_total_minutes: int) -> None:
+        self.total_milliseconds = new_total_minutes * MILLISECONDS_PER_MINUTE
 
     @property
     def hours(self) -> int:
@@ -83,87 +181,160 @@ class Duration:
     def minutes(self, new_minutes: int) -> None:
         self.total_minutes = self.hours * 60 + new_minutes
 
+    @property
+    def seconds(self) -> int:
+        """The `seconds` part of the duration, truncated"""
+        sign, _, milliseconds = duration_friendly_divmod(self.total_milliseconds, MILLISECONDS_PER_MINUTE)
+        return sign * (milliseconds // MILLISECONDS_PER_SECOND)
+
+    @property
+    def milliseconds(self) -> int:
+        """The `milliseconds` part of the duration"""
+        sign, _, milliseconds = duration_friendly_divmod(self.total_milliseconds, MILLISECONDS_PER_SECOND)
+        return sign * milliseconds
+
     @staticmethod
     def from_timedelta(time_delta: timedelta) -> Duration:
-        """Create a Duration from a timedelta."""
-        return Duration(minutes=int(time_delta.total_seconds() / 60))
+        """Create a Duration from a timedelta, truncated to the resolution."""
+        unit = _settings.get().resolution
+        microseconds = (time_delta.days * 86_400 + time_delta.seconds) * 1_000_000 + time_delta.microseconds
+        return _from_milliseconds(truncated_div(microseconds, 1_000 * unit) * unit)
 
     @classmethod
     def get_hour_seps(cls) -> set[str]:
         """Return the set of characters used to separate hours and minutes."""
-        return set(DEFAULT_HOUR_SEPARATOR) | {cls.str_hour_sep}
+        return set(DEFAULT_HOUR_SEPARATOR) | {_settings.get().hour_sep}
 
     @classmethod
     def get_minute_seps(cls) -> set[str]:
         """Return the set of characters used to indicate minutes."""
         return set(DEFAULT_MINUTE_SEPARATOR) | {cls.str_minute_sep}
 
+    @classmethod
+    def get_second_seps(cls) -> set[str]:
+        """Return the set of characters used to indicate seconds."""
+        return set(DEFAULT_SECOND_SEPARATOR) | {cls.str_second_sep}
+
     @classmethod
     def get_hour_and_minute_seps(cls) -> set[str]:
-        """Return the set of characters used to separate hours and minutes, or indicate minutes."""
-        return cls.get_hour_seps() | cls.get_minute_seps()
+        """Return the set of characters used to separate hours and minutes, or indicate minutes or seconds."""
+        return cls.get_hour_seps() | cls.get_minute_seps() | cls.get_second_seps()
 
     @classmethod
-    def get_matchers(cls) -> set[str]:
-        """Return the set of strings matchers that can be used to parse a duration."""
-        matchers_hours = chain.from_iterable((f"%H{sep}%M", f"%H{sep}", f"{sep}%M") for sep in cls.get_hour_seps())
+    def get_char_classes(cls) -> dict[str, CharClass]:
+        """Return the class of each valid character of an expression, for the current separators."""
+        return char_classes(_settings.get().hour_sep)
+
+    @classmethod
+    def get_matchers(cls, hour_sep: Optional[str] = None) -> set[str]:
+        """Return the set of strings matchers that can be used to parse a duration.
+
+        The custom hour separator is the one of the current settings, unless `hour_sep` is given.
+        """
+        hour_seps = set(DEFAULT_HOUR_SEPARATOR) | {_settings.get().hour_sep if hour_sep is None else hour_sep}
+        matchers_hours = chain.from_iterable((f"%H{sep}%M", f"%H{sep}", f"{sep}%M") for sep in hour_seps)
         matchers_minutes = chain.from_iterable((f"%M{sep}",) for sep in cls.get_minute_seps())
+        matchers_seconds = chain.from_iterable(
+            (f"%S{sec_sep}", f"%M{min_sep}%S{sec_sep}", f"%H{sep}%M{min_sep}%S{sec_sep}")
+            for sep, min_sep, sec_sep in product(hour_seps, cls.get_minute_seps(), cls.get_second_seps())
+        )
 
-        return set(matchers_hours) | set(matchers_minutes)
+        return set(matchers_hours) | set(matchers_minutes) | set(matchers_seconds)
 
     @classmethod
     def parse(cls, time_str: str) -> Duration:
         """Create a Duration from a string."""
-        for matcher in cls.get_matchers():
-            pattern = compile_matcher(matcher)
-            try:
-                time = parse_duration(time_str, pattern)
-                return Duration(hours=time.hours, minutes=time.minutes)
-            except ValueError:
-                pass
-        raise ValueError(f"Invalid time: {time_str}")
+        time = parse_any_duration(time_str, duration_matchers(_settings.get().hour_sep))
+        return Duration(hours=time.hours, minutes=time.minutes, seconds=time.seconds)
+
+    @classmethod
+    def is_valid(cls, time_str: str) -> bool:
+        """Return whether `parse` accepts a string, without raising."""
+        return any(pattern.match(time_str) is not None for pattern in duration_matchers(_settings.get().hour_sep))
 
     def __str__(self) -> str:
-        sign, hours, minutes = duration_friendly_divmod(self.total_minutes, 60)
-        return f"{'-' if sign == -1 else ''}{hours}{self.str_hour_sep}{minutes:02}"
+        settings = _settings.get()
+        resolution = settings.resolution
+        if resolution is Resolution.MINUTE:
+            sign, hours, minutes = duration_friendly_divmod(self.total_minutes, 60)
+            return f"{'-' if sign == -1 else ''}{hours}{settings.hour_sep}{minutes:02}"
+
+        sign, hours, milliseconds = duration_friendly_divmod(self.total_milliseconds, MILLISECONDS_PER_HOUR)
+        minutes, milliseconds = divmod(milliseconds, MILLISECONDS_PER_MINUTE)
+        seconds, milliseconds = divmod(milliseconds, MILLISECONDS_PER_SECOND)
+        seconds_str = f"{seconds:02}" if resolution is Resolution.SECOND else f"{seconds:02}.{milliseconds:03}"
+        return (
+            f"{'-' if sign == -1 else ''}{hours}{settings.hour_sep}{minutes:02}"
+            f"{self.str_minute_sep}{seconds_str}{self.str_second_sep}"
+        )
 
     def __repr__(self) -> str:
-        return f"Duration(hours={self.hours}, minutes={self.minutes})"
+        if self.total_milliseconds % MILLISECONDS_PER_MINUTE == 0:
+            return f"Duration(hours={self.hours}, minutes={self.minutes})"
+        seconds = self.seconds + self.milliseconds / 1000 if self.milliseconds != 0 else self.seconds
+        return f"Duration(hours={self.hours}, minutes={self.minutes}, seconds={seconds})"
 
     def __eq__(self, other: object) -> bool:
-        if not isinstance(other, Duration):  # type: ignore
-            raise TypeError(f"unsupported operand type(s) for ==: '{type(self)}' and '{type(other)}'")
-        return self.total_minutes == other.total_minutes
+        try:
+            return self.total_milliseconds == other.total_milliseconds  # type: ignore
+        except AttributeError:
+            raise TypeError(f"unsupported operand type(s) for ==: '{type(self)}' and '{type(other)}'") from None
 
     def __lt__(self, other: Duration) -> bool:
-        if not isinstance(other, Duration):  # type: ignore
-            raise TypeError(f"unsupported operand type(s) for <: '{type(self)}' and '{type(other)}'")
-        return self.total_minutes < other.total_minutes
+        try:
+            return self.total_milliseconds < other.total_milliseconds
+        except AttributeError:
+            raise TypeError(f"unsupported operand type(s) for <: '{type(self)}' and '{type(other)}'") from None
 
     def __add__(self, other: Duration) -> Duration:
-        if not isinstance(other, Duration):  # type: ignore
-            raise TypeError(f"unsupported operand type(s) for +: '{type(self)}' and '{type(other)}'")
-        return Duration(minutes=self.total_minutes + other.total_minutes)
+        try:
+            return _from_milliseconds(self.total_milliseconds + other.total_milliseconds)
+        except AttributeError:
+            raise TypeError(f"unsupported operand type(s) for +: '{type(self)}' and '{type(other)}'") from None
 
     def __sub__(self, other: Duration) -> Duration:
-        if not isinstance(other, Duration):  # type: ignore
-            raise TypeError(f"unsupported operand type(s) for -: '{type(self)}' and '{type(other)}'")
-        return Duration(minutes=self.total_minutes - other.total_minutes)
+        try:
+            return _from_milliseconds(self.total_milliseconds - other.total_milliseconds)
+        except AttributeError:
+            raise TypeError(f"unsupported operand type(s) for -: '{type(self)}' and '{type(other)}'") from None
 
     def __mul__(self, other: Number) -> Duration:
         if not isinstance(other, (int, float)):  # type: ignore
             raise TypeError(f"unsupported operand type(s) for *: '{type(self)}' and '{type(other)}'")
-        return Duration(minutes=int(self.total_minutes * other))
+        unit = _settings.get().resolution
+        return _from_milliseconds(int(truncated_div(self.total_milliseconds, unit) * other) * unit)
 
-    def __rmul__(self, other: Number) -> Duration:
-        return self.__mul__(other)
+    __rmul__ = __mul__
 
     def __truediv__(self, other: Number) -> Duration:
         if not isinstance(other, (int, float)):  # type: ignore
             raise TypeError(f"unsupported operand type(s) for /: '{type(self)}' and '{type(other)}'")
-        return Duration(minutes=int(self.total_minutes / other))
+        unit = _settings.get().resolution
+        return _from_milliseconds(int(truncated_div(self.total_milliseconds, unit) / other) * unit)
+
+    def __reduce__(self) -> tuple[Callable[[int], Duration], tuple[int]]:
+        return (_from_milliseconds, (self.total_milliseconds,))
+
+    def to_bytes(self) -> bytes:
+        """Return the duration as 8 bytes: the number of milliseconds as a little-endian signed integer."""
+        return _INT64.pack(self.total_milliseconds)
+
+    @staticmethod
+    def from_bytes(data: bytes) -> Duration:
+        """Create a Duration from the 8 bytes returned by `to_bytes`."""
+        return _from_milliseconds(_INT64.unpack(data)[0])
 
     @property
     def as_timedelta(self) -> timedelta:
         """Return the duration as a timedelta."""
-        return timedelta(minutes=self.total_minutes)
+        return timedelta(milliseconds=self.total_milliseconds)
+
+
+@lru_cache(maxsize=None)
+def duration_matchers(hour_sep: str) -> tuple[DurationMatcher, ...]:
+    """Return the compiled matchers of `Duration.get_matchers` for a custom hour separator, built once per separator."""
+    return tuple(compile_matcher(matcher) for matcher in Duration.get_matchers(hour_sep))
+
+
+_new = object.__new__
+_from_milliseconds = Duration.from_milliseconds
@@ -0,0 +1,150 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import math
+from enum import Enum
+from fractions import Fraction
+from typing import Iterable, Union
+
+from calct._common import Number
+from calct._duration_parser import match_any_duration
+from calct.duration import (
+    MILLISECONDS_PER_HOUR,
+    MILLISECONDS_PER_MINUTE,
+    MILLISECONDS_PER_SECOND,
+    Duration,
+    duration_matchers,
+)
+from calct.parser import Token, fold_rpn, iter_lex, iter_parse
+
+
+class Rounding(Enum):
+    """Enum for the rounding policies applied to exact results"""
+
+    TRUNCATE = "truncate"
+    FLOOR = "floor"
+    CEILING = "ceiling"
+    HALF_EVEN = "half-even"
+    HALF_UP = "half-up"
+
+    def round(self, value: Fraction) -> int:
+        """Rounds a fraction to an integer"""
+        if self is Rounding.TRUNCATE:
+            return math.trunc(value)
+
+        if self is Rounding.FLOOR:
+            return math.floor(value)
+
+        if self is Rounding.CEILING:
+            return math.ceil(value)
+
+        if self is Rounding.HALF_EVEN:
+            return round(value)
+
+        if self is Rounding.HALF_UP:
+            rounded = math.floor(abs(value) + Fraction(1, 2))
+            return rounded if value >= 0 else -rounded
+
+        return NotImplemented
+
+
+class ExactDuration:
+    """Duration holding an exact, possibly fractional, number of milliseconds
+
+    Only used while evaluating an expression exactly: the result is rounded once into a `Duration`.
+    """
+
+    __slots__ = ("milliseconds",)
+
+    def __init__(self, milliseconds: Fraction) -> None:
+        self.milliseconds = milliseconds
+
+    def __repr__(self) -> str:
+        return f"ExactDuration({self.milliseconds!r})"
+
+    def __add__(self, other: ExactDuration) -> ExactDuration:
+        if not isinstance(other, ExactDuration):
+            return NotImplemented
+        return ExactDuration(self.milliseconds + other.milliseconds)
+
+    def __sub__(self, other: ExactDuration) -> ExactDuration:
+        if not isinstance(other, ExactDuration):
+            return NotImplemented
+        return ExactDuration(self.milliseconds - other.milliseconds)
+
+    def __mul__(self, other: Fraction) -> ExactDuration:
+        if not isinstance(other, Fraction):
+            return NotImplemented
+        return ExactDuration(self.milliseconds * other)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other: Fraction) -> ExactDuration:
+        if not isinstance(other, Fraction):
+            return NotImplemented
+        return ExactDuration(self.milliseconds / other)
+
+    def to_duration(self, rounding: Rounding = Rounding.TRUNCATE) -> Duration:
+        """Rounds the duration to the resolution of `Duration`"""
+        unit = Duration.get_resolution()
+        return Duration.from_milliseconds(rounding.round(self.milliseconds / unit) * unit)
+
+
+ExactValue = Union[Fraction, ExactDuration]
+
+
+def exact_duration(token: str) -> ExactDuration:
+    """Parses a duration token exactly, keeping decimal hours and seconds as fractions"""
+    parts = match_any_duration(token, duration_matchers(Duration.get_string_hour_minute_separator()))
+    return ExactDuration(
+        Fraction(parts["hours"]) * MILLISECONDS_PER_HOUR
+        + int(parts["minutes"]) * MILLISECONDS_PER_MINUTE
+        + Fraction(parts["seconds"]) * MILLISECONDS_PER_SECOND
+    )
+
+
+def exact_token(token: Token) -> ExactValue:
+    """Evaluates a single duration or number token, or an already evaluated literal, exactly"""
+    if isinstance(token, Duration):
+        return ExactDuration(Fraction(token.total_milliseconds))
+    if not isinstance(token, str):
+        return Fraction(token)
+    if set(token) & Duration.get_hour_and_minute_seps() != set():
+        return exact_duration(token)
+    try:
+        return Fraction(token)
+    except ValueError as ex:
+        raise ValueError(f"`{token}` is not a valid number") from ex
+
+
+def evaluate_rpn_exact(rpn: Iterable[Token], rounding: Rounding = Rounding.TRUNCATE) -> Union[Number, Duration]:
+    """Evaluates the Reverse Polish Notation (RPN) stack with exact rational arithmetic
+
+    Decimal literals are read as fractions and no intermediate result is truncated. A duration result is rounded
+    once to the resolution with `rounding`, and a number result is returned as an int when it is whole, or as the
+    nearest float otherwise.
+    """
+    result: ExactValue = fold_rpn(rpn, exact_token)
+    if isinstance(result, ExactDuration):
+        return result.to_duration(rounding)
+    return int(result) if result.denominator == 1 else float(result)
+
+
+def compute_exact(expr: str, rounding: Rounding = Rounding.TRUNCATE) -> Union[Number, Duration]:
+    """Computes the value of the expression with exact rational arithmetic, rounding the result once"""
+    return evaluate_rpn_exact(iter_parse(iter_lex([expr])), rounding)
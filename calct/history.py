@@ -0,0 +1,101 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import logging
+import os
+from collections import deque
+from pathlib import Path
+from typing import Iterator, Mapping, Optional, Union
+
+from calct._common import LAST_RESULT_STR, REFERENCE_PREFIX_STR, Number
+from calct.duration import Duration
+from calct.serialization import rpn_from_bytes, rpn_to_bytes
+
+Result = Union[Number, Duration]
+
+DEFAULT_HISTORY_SIZE = 1000
+HISTORY_PATH_ENV = "CALCT_HISTORY"
+
+
+def default_history_path() -> Path:
+    """Return the path of the history file, `~/.calct_history` unless set by the `CALCT_HISTORY` variable"""
+    return Path(os.environ.get(HISTORY_PATH_ENV, Path.home() / ".calct_history"))
+
+
+class History(Mapping[str, Result]):
+    """Bounded history of results, usable as the bindings of `evaluate_rpn`
+
+    `_` and `$1` are the last result, `$2` the one before, and so on. Durations are kept as is, and are stored in
+    the history file as integer minutes (or milliseconds) using the serialized RPN format. The file is only read
+    on the first access to the results, so creating a history is free.
+    """
+
+    def __init__(self, path: Optional[Union[str, os.PathLike[str]]] = None, size: int = DEFAULT_HISTORY_SIZE) -> None:
+        self.path = None if path is None else Path(path)
+        self.size = size
+        self._results: Optional[deque[Result]] = None
+
+    @property
+    def results(self) -> deque[Result]:
+        """The results, oldest first, loaded from the history file on first access"""
+        if self._results is None:
+            self._results = deque(self._load(), maxlen=self.size)
+        return self._results
+
+    def _load(self) -> list[Result]:
+        if self.path is None or not self.path.exists():
+            return []
+        try:
+            rpn = rpn_from_bytes(self.path.read_bytes())
+        except (OSError, ValueError) as ex:
+            logging.warning(f"Ignoring the unreadable history file {self.path}: {ex}")
+            return []
+        return [element for element in rpn if not isinstance(element, str)]
+
+    def append(self, result: Result) -> None:
+        """Add a result, which becomes `_` and `$1`"""
+        self.results.append(result)
+
+    def save(self) -> None:
+        """Write the results to the history file, replacing it atomically"""
+        if self.path is None or self._results is None:
+            return
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        temporary.write_bytes(rpn_to_bytes(self._results))
+        os.replace(temporary, self.path)
+
+    def __getitem__(self, reference: str) -> Result:
+        results = self.results
+        if reference == LAST_RESULT_STR:
+            index = 1
+        elif reference.startswith(REFERENCE_PREFIX_STR) and reference[1:].isdigit():
+            index = int(reference[1:])
+        else:
+            raise KeyError(reference)
+        if not 1 <= index <= len(results):
+            raise KeyError(reference)
+        return results[-index]
+
+    def __iter__(self) -> Iterator[str]:
+        if len(self.results) > 0:
+            yield LAST_RESULT_STR
+        for index in range(1, len(self.results) + 1):
+            yield f"{REFERENCE_PREFIX_STR}{index}"
+
+    def __len__(self) -> int:
+        return len(self.results) + (1 if len(self.results) > 0 else 0)
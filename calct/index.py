@@ -0,0 +1,144 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Generic, Hashable, Iterable, Iterator, Optional, TypeVar
+
+from calct.duration import Duration
+
+IdT = TypeVar("IdT", bound=Hashable)
+
+
+class DurationIndex(Generic[IdT]):
+    """Durations sorted by length, each with an id, for range, top-k and rank queries
+
+    The durations are kept as a sorted array of integer milliseconds next to the list of their ids, so queries
+    bisect integers instead of comparing `Duration` objects. Durations of the same length keep their insertion order.
+    """
+
+    __slots__ = ("_keys", "_ids")
+
+    def __init__(self, items: Iterable[tuple[IdT, Duration]] = ()) -> None:
+        self._keys: array[int] = array("q")
+        self._ids: list[IdT] = []
+        self.update(items)
+
+    @classmethod
+    def from_durations(cls, durations: Iterable[Duration]) -> DurationIndex[int]:
+        """Creates an index whose ids are the positions of the durations"""
+        return DurationIndex(enumerate(durations))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[tuple[IdT, Duration]]:
+        """Iterate over the ids and durations, shortest first"""
+        return zip(self._ids, map(Duration.from_milliseconds, self._keys))
+
+    def __repr__(self) -> str:
+        return f"DurationIndex({list(self)!r})"
+
+    def add(self, item_id: IdT, duration: Duration) -> None:
+        """Adds a duration in O(n); prefer `update` for many durations"""
+        position = bisect_right(self._keys, duration.total_milliseconds)
+        self._keys.insert(position, duration.total_milliseconds)
+        self._ids.insert(position, item_id)
+
+    def update(self, items: Iterable[tuple[IdT, Duration]]) -> None:
+        """Adds m durations in O(n + m log(n + m)), by sorting them then merging them with the index"""
+        new = sorted(((duration.total_milliseconds, item_id) for item_id, duration in items), key=lambda item: item[0])
+        if len(new) == 0:
+            return
+        keys, ids = self._keys, self._ids
+        merged_keys: array[int] = array("q")
+        merged_ids: list[IdT] = []
+        position = 0
+        for key, item_id in new:
+            end = bisect_right(keys, key, position)
+            merged_keys.extend(keys[position:end])
+            merged_ids.extend(ids[position:end])
+            merged_keys.append(key)
+            merged_ids.append(item_id)
+            position = end
+        merged_keys.extend(keys[position:])
+        merged_ids.extend(ids[position:])
+        self._keys, self._ids = merged_keys, merged_ids
+
+    def _bounds(
+        self, low: Optional[Duration], high: Optional[Duration], include_low: bool, include_high: bool
+    ) -> tuple[int, int]:
+        keys = self._keys
+        if low is None:
+            start = 0
+        else:
+            start = (bisect_left if include_low else bisect_right)(keys, low.total_milliseconds)
+        if high is None:
+            end = len(keys)
+        else:
+            end = (bisect_right if include_high else bisect_left)(keys, high.total_milliseconds)
+        return start, max(start, end)
+
+    def between(
+        self,
+        low: Optional[Duration] = None,
+        high: Optional[Duration] = None,
+        include_low: bool = True,
+        include_high: bool = False,
+    ) -> list[IdT]:
+        """Returns the ids of the durations from `low` to `high`, shortest first, in O(log n + k)
+
+        A missing bound is unbounded, so `between(low=Duration(10), include_low=False)` is every duration longer than
+        10 hours. Only the ids are returned, so no `Duration` is created.
+        """
+        start, end = self._bounds(low, high, include_low, include_high)
+        return self._ids[start:end]
+
+    def count(
+        self,
+        low: Optional[Duration] = None,
+        high: Optional[Duration] = None,
+        include_low: bool = True,
+        include_high: bool = False,
+    ) -> int:
+        """Returns the number of durations from `low` to `high`, in O(log n); see `between`"""
+        start, end = self._bounds(low, high, include_low, include_high)
+        return end - start
+
+    def top(self, k: int) -> list[tuple[IdT, Duration]]:
+        """Returns the ids and durations of the `k` longest durations, longest first"""
+        start = max(len(self._keys) - k, 0)
+        return list(zip(reversed(self._ids[start:]), map(Duration.from_milliseconds, reversed(self._keys[start:]))))
+
+    def bottom(self, k: int) -> list[tuple[IdT, Duration]]:
+        """Returns the ids and durations of the `k` shortest durations, shortest first"""
+        return list(zip(self._ids[:k], map(Duration.from_milliseconds, self._keys[:k])))
+
+    def rank(self, duration: Duration) -> int:
+        """Returns the number of durations shorter than `duration`"""
+        return bisect_left(self._keys, duration.total_milliseconds)
+
+    def percentile(self, percent: float) -> Duration:
+        """Returns the duration at the given percentile, from 0 to 100, using the nearest-rank method"""
+        if len(self._keys) == 0:
+            raise ValueError("The index is empty")
+        if not 0 <= percent <= 100:
+            raise ValueError(f"The percentile must be between 0 and 100, not {percent}")
+        position = max(math.ceil(percent / 100 * len(self._keys)) - 1, 0)
+        return Duration.from_milliseconds(self._keys[position])
@@ -0,0 +1,225 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from __future__ import annotations
+
+from enum import Enum
+from operator import add, mul, sub, truediv
+from typing import Any, Callable, Iterable, Mapping, Optional, Union, cast
+
+from calct._common import OPS_STR, REFERENCE_CHARS_STR, Number
+from calct._divmod import truncated_div
+from calct.duration import Duration, Settings, get_settings
+from calct.parser import Token, evaluate_token, lex, parse
+
+Kernel = Callable[[Any, Any], Any]
+
+_PUSH, _LOAD, _APPLY = range(3)
+
+
+class Kind(Enum):
+    """What a value of an expression is known to be before evaluation
+
+    Durations are handled as integer counts of the resolution unit (minutes by default), `ANY` is for values only
+    known when evaluating, such as unbound variables.
+    """
+
+    DURATION = 1
+    INTEGER = 2
+    NUMBER = 3
+    ANY = 4
+
+    @property
+    def is_number(self) -> bool:
+        """Whether the value is an integer or a float"""
+        return self is Kind.INTEGER or self is Kind.NUMBER
+
+
+def literal_kind(value: Union[Number, Duration]) -> Kind:
+    """Returns the kind of a literal value"""
+    if isinstance(value, Duration):
+        return Kind.DURATION
+    return Kind.INTEGER if isinstance(value, int) else Kind.NUMBER
+
+
+def result_kind(operator: str, left: Kind, right: Kind) -> Optional[Kind]:
+    """Returns the kind of the result of an operation, or None if durations and numbers don't support it
+
+    The rules are those of `Duration`: durations add to and subtract from durations, and are multiplied or divided by
+    numbers. The `to` operator, `@`, is a subtraction.
+    """
+    if left is Kind.ANY or right is Kind.ANY:
+        return Kind.ANY
+    if left.is_number and right.is_number:
+        return Kind.INTEGER if left is Kind.INTEGER and right is Kind.INTEGER and operator != "/" else Kind.NUMBER
+    if operator in "+-@":
+        return Kind.DURATION if left is Kind.DURATION and right is Kind.DURATION else None
+    if operator == "*":
+        return Kind.DURATION if left.is_number or right.is_number else None
+    return Kind.DURATION if right.is_number else None
+
+
+def unsupported_operation(operator: str, left: Kind, right: Kind) -> TypeError:
+    """Returns the error for an operation that `result_kind` doesn't support"""
+    return TypeError(f"unsupported operand type(s) for {operator}: '{left.name.lower()}' and '{right.name.lower()}'")
+
+
+def _to(start: Any, end: Any) -> Any:
+    return end - start
+
+
+def _scale(units: int, factor: Number) -> int:
+    return int(units * factor)
+
+
+def _scale_right(factor: Number, units: int) -> int:
+    return int(units * factor)
+
+
+def _divide(units: int, divisor: Number) -> int:
+    return int(units / divisor)
+
+
+_NUMBER_KERNELS: dict[str, Kernel] = {"+": add, "-": sub, "*": mul, "/": truediv, "@": _to}
+
+
+def kernel(operator: str, left: Kind, right: Kind) -> Kernel:
+    """Returns the function computing an operation on values of known kinds, without checking their types
+
+    Durations are integer counts of the resolution unit, truncated towards zero after a multiplication or a division,
+    exactly like `Duration` does. Raises a TypeError if the operation isn't supported.
+    """
+    kind = result_kind(operator, left, right)
+    if kind is None or kind is Kind.ANY:
+        raise unsupported_operation(operator, left, right)
+    if kind is not Kind.DURATION or operator in "+-@":
+        return _NUMBER_KERNELS[operator]
+    if operator == "/":
+        return _divide
+    if left is Kind.INTEGER or right is Kind.INTEGER:
+        return mul
+    return _scale if left is Kind.DURATION else _scale_right
+
+
+def literal(token: Token) -> Optional[Union[Number, Duration]]:
+    """Evaluates a literal token, or returns None for a variable or a result reference"""
+    if not isinstance(token, str):
+        return token
+    try:
+        return evaluate_token(token)
+    except ValueError:
+        if token[0] in REFERENCE_CHARS_STR or token.isidentifier():
+            return None
+        raise
+
+
+def infer(rpn: Iterable[Token], kinds: Optional[Mapping[str, Kind]] = None) -> list[tuple[Token, Kind]]:
+    """Labels each element of a Reverse Polish Notation (RPN) stack with the kind of its value
+
+    Literals are replaced by their value. Variables and result references have the kind given in `kinds`, or `ANY`.
+    Raises a TypeError for an operation that can't be done, like `1h * 2h`, before anything is evaluated.
+    """
+    kinds = {} if kinds is None else kinds
+    labeled: list[tuple[Token, Kind]] = []
+    stack: list[Kind] = []
+
+    for element in rpn:
+        if isinstance(element, str) and element in OPS_STR:
+            if len(stack) < 2:
+                raise ValueError(f"Invalid expression: `{element}` is missing an operand")
+            right = stack.pop()
+            left = stack.pop()
+            kind = result_kind(element, left, right)
+            if kind is None:
+                raise unsupported_operation(element, left, right)
+            labeled.append((element, kind))
+        elif (value := literal(element)) is None:
+            kind = kinds.get(cast(str, element), Kind.ANY)
+            labeled.append((element, kind))
+        else:
+            kind = literal_kind(value)
+            labeled.append((value, kind))
+        stack.append(kind)
+
+    if len(stack) == 0:
+        raise ValueError("Invalid expression: the expression is empty")
+    return labeled
+
+
+class TypedProgram:
+    """Expression typed once, each of its operators bound to a kernel, then evaluated without any type check
+
+    The kinds of the variables and result references are given when building the program, and the values bound to
+    them when evaluating must be of those kinds. Durations are integer counts of the resolution unit of the settings
+    the program is built with, which are also used to evaluate it.
+    """
+
+    __slots__ = ("kind", "settings", "_kinds", "_instructions")
+
+    def __init__(self, rpn: Iterable[Token], kinds: Optional[Mapping[str, Kind]] = None) -> None:
+        self.settings: Settings = get_settings()
+        self._kinds: dict[str, Kind] = {} if kinds is None else dict(kinds)
+        unit = self.settings.resolution.value
+        self._instructions: list[tuple[int, Any]] = []
+        stack: list[Kind] = []
+
+        for element, kind in infer(rpn, self._kinds):
+            if isinstance(element, str) and element in OPS_STR:
+                right = stack.pop()
+                left = stack.pop()
+                self._instructions.append((_APPLY, kernel(element, left, right)))
+            elif isinstance(element, str):
+                if kind is Kind.ANY:
+                    raise ValueError(f"`{element}` is not a variable or a result reference of a known kind")
+                self._instructions.append((_LOAD, element))
+            elif isinstance(element, Duration):
+                self._instructions.append((_PUSH, truncated_div(element.total_milliseconds, unit)))
+            else:
+                self._instructions.append((_PUSH, element))
+            stack.append(kind)
+        self.kind = stack[-1]
+
+    @classmethod
+    def from_string(cls, expr: str, kinds: Optional[Mapping[str, Kind]] = None) -> TypedProgram:
+        """Lexes, parses and types an expression"""
+        return cls(parse(lex(expr)), kinds)
+
+    def evaluate(self, bindings: Optional[Mapping[str, Union[Number, Duration]]] = None) -> Union[Number, Duration]:
+        """Evaluates the program, with values of the declared kinds bound to its variables and result references"""
+        unit = self.settings.resolution.value
+        values: dict[str, Any] = {}
+        for name, kind in self._kinds.items():
+            if bindings is None or name not in bindings:
+                raise ValueError(f"`{name}` is not a bound variable or a known result reference")
+            value = bindings[name]
+            if kind is Kind.DURATION:
+                value = truncated_div(cast(Duration, value).total_milliseconds, unit)
+            values[name] = value
+
+        stack: list[Any] = []
+        for code, argument in self._instructions:
+            if code == _APPLY:
+                right = stack.pop()
+                stack[-1] = argument(stack[-1], right)
+            elif code == _PUSH:
+                stack.append(argument)
+            else:
+                stack.append(values[argument])
+
+        if self.kind is Kind.DURATION:
+            return Duration.from_milliseconds(stack[-1] * unit)
+        return cast(Number, stack[-1])
@@ -0,0 +1,364 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import heapq
+import struct
+import tempfile
+from bisect import bisect_left, bisect_right
+from contextlib import ExitStack
+from itertools import chain, islice, starmap
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional, TextIO
+
+from calct._common import non_blank_lines
+from calct.duration import Duration
+
+Span = tuple[int, int]
+
+DEFAULT_SORT_CHUNK_SIZE = 1_000_000
+
+_SPAN = struct.Struct("<qq")
+_READ_SPANS = 4096
+
+
+class TimeRange(Duration):
+    """Duration between two times, remembering them
+
+    The result of `a @ b` on two durations: it is equal to, and computes like, the duration `b - a`, but keeps `a` as
+    its `start` and `b` as its `end`. Ranges are half-open, so a range ending at 17h doesn't contain 17h.
+    """
+
+    __slots__ = ("start", "end")
+
+    def __init__(self, start: Duration, end: Duration) -> None:  # pylint: disable=super-init-not-called
+        self.start = Duration.from_milliseconds(start.total_milliseconds)
+        self.end = Duration.from_milliseconds(end.total_milliseconds)
+        self.total_milliseconds = end.total_milliseconds - start.total_milliseconds
+
+    def __repr__(self) -> str:
+        return f"TimeRange(start={self.start!r}, end={self.end!r})"
+
+    def __reduce__(self) -> tuple[Callable[[Duration, Duration], TimeRange], tuple[Duration, Duration]]:  # type: ignore
+        return (TimeRange, (self.start, self.end))
+
+    def contains(self, time: Duration) -> bool:
+        """Whether the range contains a time"""
+        return self.start.total_milliseconds <= time.total_milliseconds < self.end.total_milliseconds
+
+    def overlaps(self, other: TimeRange) -> bool:
+        """Whether the range shares some time with another, which empty ranges never do"""
+        return max(self.start.total_milliseconds, other.start.total_milliseconds) < min(
+            self.end.total_milliseconds, other.end.total_milliseconds
+        )
+
+
+def _range_key(time_range: TimeRange) -> tuple[int, int]:
+    return time_range.start.total_milliseconds, time_range.end.total_milliseconds
+
+
+class _Node:  # pylint: disable=too-few-public-methods
+    """Node of a centered interval tree, holding the ranges that contain its center
+
+    Nodes are plain data, searched by the methods of `IntervalTree`.
+    """
+
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, center: int, by_start: list[int], by_end: list[int]) -> None:
+        self.center = center
+        self.by_start = by_start
+        self.by_end = by_end
+        self.left: Optional[_Node] = None
+        self.right: Optional[_Node] = None
+
+
+class IntervalTree:
+    """Index of time ranges, answering stabbing and overlap queries in O(log n + k) for k results
+
+    The ranges are kept sorted by start, and the non-empty ones are also indexed by a centered interval tree. Added
+    ranges are buffered, and the index is rebuilt in O(n log n) on the next query, so add ranges in bulk rather
+    than alternating additions and queries.
+    """
+
+    def __init__(self, ranges: Iterable[TimeRange] = ()) -> None:
+        self._ranges: list[TimeRange] = []
+        self._pending: list[TimeRange] = []
+        self._starts: list[int] = []
+        self._ends: list[int] = []
+        self._root: Optional[_Node] = None
+        self.update(ranges)
+
+    def add(self, time_range: TimeRange) -> None:
+        """Add a range, whose end can't be before its start"""
+        if time_range.end < time_range.start:
+            raise ValueError(f"The range {time_range!r} ends before it starts")
+        self._pending.append(time_range)
+
+    def update(self, ranges: Iterable[TimeRange]) -> None:
+        """Add many ranges at once"""
+        for time_range in ranges:
+            self.add(time_range)
+
+    def __len__(self) -> int:
+        return len(self._ranges) + len(self._pending)
+
+    def __iter__(self) -> Iterator[TimeRange]:
+        """Iterate over the ranges by start, then end"""
+        self._index()
+        return iter(self._ranges)
+
+    def _index(self) -> None:
+        if len(self._pending) == 0:
+            return
+        self._ranges.extend(self._pending)
+        self._pending.clear()
+        self._ranges.sort(key=_range_key)
+        self._starts = [time_range.start.total_milliseconds for time_range in self._ranges]
+        self._ends = [time_range.end.total_milliseconds for time_range in self._ranges]
+        non_empty = [index for index, (start, end) in enumerate(zip(self._starts, self._ends)) if start < end]
+        self._root = self._build(non_empty)
+
+    def _build(self, indices: list[int]) -> Optional[_Node]:
+        """Builds the tree of ranges given by their index, sorted by start, around the median start"""
+        if len(indices) == 0:
+            return None
+        starts, ends = self._starts, self._ends
+        center = starts[indices[len(indices) // 2]]
+        left = [index for index in indices if ends[index] <= center]
+        right = [index for index in indices if starts[index] > center]
+        middle = [index for index in indices if starts[index] <= center < ends[index]]
+
+        node = _Node(center, middle, sorted(middle, key=ends.__getitem__, reverse=True))
+        node.left = self._build(left)
+        node.right = self._build(right)
+        return node
+
+    def _stab(self, time: int) -> list[int]:
+        starts, ends = self._starts, self._ends
+        found: list[int] = []
+        node = self._root
+        while node is not None:
+            if time < node.center:
+                for index in node.by_start:
+                    if starts[index] > time:
+                        break
+                    found.append(index)
+                node = node.left
+            else:
+                for index in node.by_end:
+                    if ends[index] <= time:
+                        break
+                    found.append(index)
+                node = node.right
+        return found
+
+    def stab(self, time: Duration) -> list[TimeRange]:
+        """Return the ranges containing a time, in no particular order"""
+        self._index()
+        return [self._ranges[index] for index in self._stab(time.total_milliseconds)]
+
+    def overlap(self, time_range: TimeRange) -> list[TimeRange]:
+        """Return the ranges sharing some time with a range, in no particular order"""
+        self._index()
+        start, end = time_range.start.total_milliseconds, time_range.end.total_milliseconds
+        if end <= start:
+            return []
+        found = self._stab(start)
+        starts, ends = self._starts, self._ends
+        found.extend(
+            index
+            for index in range(bisect_right(starts, start), bisect_left(starts, end))
+            if starts[index] < ends[index]
+        )
+        return [self._ranges[index] for index in found]
+
+    def covered(self) -> Duration:
+        """Return the total time covered by at least one range"""
+        self._index()
+        spans = _union_spans(zip(self._starts, self._ends))
+        return Duration.from_milliseconds(sum(end - start for start, end in spans))
+
+
+def _time_range(start: int, end: int) -> TimeRange:
+    time_range = object.__new__(TimeRange)
+    time_range.start = Duration.from_milliseconds(start)
+    time_range.end = Duration.from_milliseconds(end)
+    time_range.total_milliseconds = end - start
+    return time_range
+
+
+def _spans(ranges: Iterable[TimeRange]) -> Iterator[Span]:
+    for time_range in ranges:
+        start, end = time_range.start.total_milliseconds, time_range.end.total_milliseconds
+        if end < start:
+            raise ValueError(f"The range {time_range!r} ends before it starts")
+        yield start, end
+
+
+def _read_spans(file: BinaryIO) -> Iterator[Span]:
+    while len(data := file.read(_SPAN.size * _READ_SPANS)) > 0:
+        yield from _SPAN.iter_unpack(data)
+
+
+def _sorted_spans(spans: Iterable[Span], chunk_size: int) -> Iterator[Span]:
+    """Sorts spans in memory if there are at most `chunk_size` of them, else with an external merge sort
+
+    Each chunk is sorted and written to a temporary file, then the chunks are merged lazily, so the memory used is
+    bounded by the chunk size.
+    """
+    spans = iter(spans)
+    chunk = list(islice(spans, chunk_size))
+    if len(chunk) < chunk_size:
+        chunk.sort()
+        yield from chunk
+        return
+
+    with ExitStack() as stack:
+        files = []
+        while len(chunk) > 0:
+            chunk.sort()
+            file = stack.enter_context(tempfile.TemporaryFile())
+            file.write(b"".join(starmap(_SPAN.pack, chunk)))
+            file.seek(0)
+            files.append(file)
+            chunk = list(islice(spans, chunk_size))
+        yield from heapq.merge(*(_read_spans(file) for file in files))
+
+
+def _check_sorted(spans: Iterable[Span]) -> Iterator[Span]:
+    last_start = None
+    for span in spans:
+        if last_start is not None and span[0] < last_start:
+            raise ValueError("The ranges are not sorted by start")
+        last_start = span[0]
+        yield span
+
+
+def _union_spans(spans: Iterable[Span]) -> Iterator[Span]:
+    """Merges spans sorted by start into disjoint spans, joining the ones that overlap or touch"""
+    spans = iter(spans)
+    if (first := next(spans, None)) is None:
+        return
+    current_start, current_end = first
+    for start, end in spans:
+        if start <= current_end:
+            current_end = max(current_end, end)
+        else:
+            yield current_start, current_end
+            current_start, current_end = start, end
+    yield current_start, current_end
+
+
+def _double_booked_spans(spans: Iterable[Span]) -> Iterator[Span]:
+    """Yields the spans of time covered at least twice, given spans sorted by start
+
+    Only the ends of the spans containing the sweep position are kept, in a heap, so the memory used is bounded by
+    the maximum number of simultaneous spans.
+    """
+    active: list[int] = []
+    booked_start: Optional[int] = None
+    # A last span without a start ends the sweep, popping the spans still active
+    sentinel: list[tuple[Optional[int], int]] = [(None, 0)]
+    for start, end in chain(spans, sentinel):
+        while len(active) > 0 and (start is None or active[0] <= start):
+            active_end = heapq.heappop(active)
+            if len(active) == 1 and booked_start is not None:
+                if active_end > booked_start:
+                    yield booked_start, active_end
+                booked_start = None
+        if start is not None:
+            heapq.heappush(active, end)
+            if len(active) == 2:
+                booked_start = start
+
+
+def _intersection_spans(first: Iterable[Span], second: Iterable[Span]) -> Iterator[Span]:
+    """Yields the spans of time covered by both sets of spans, each sorted by start"""
+    first, second = _union_spans(first), _union_spans(second)
+    first_span, second_span = next(first, None), next(second, None)
+    while first_span is not None and second_span is not None:
+        start, end = max(first_span[0], second_span[0]), min(first_span[1], second_span[1])
+        if start < end:
+            yield start, end
+        if first_span[1] < second_span[1]:
+            first_span = next(first, None)
+        else:
+            second_span = next(second, None)
+
+
+def sort_ranges(ranges: Iterable[TimeRange], chunk_size: int = DEFAULT_SORT_CHUNK_SIZE) -> Iterator[TimeRange]:
+    """Sorts ranges by start then end, lazily, in memory bounded by `chunk_size` ranges"""
+    return starmap(_time_range, _sorted_spans(_spans(ranges), chunk_size))
+
+
+def _prepared_spans(ranges: Iterable[TimeRange], presorted: bool, chunk_size: int) -> Iterator[Span]:
+    spans = _spans(ranges)
+    return _check_sorted(spans) if presorted else _sorted_spans(spans, chunk_size)
+
+
+def union(
+    ranges: Iterable[TimeRange], presorted: bool = False, chunk_size: int = DEFAULT_SORT_CHUNK_SIZE
+) -> Iterator[TimeRange]:
+    """Merges ranges into disjoint ranges, by start, joining the ones that overlap or touch
+
+    With `presorted`, the ranges must already be sorted by start, and are merged in O(n) in a single pass. Otherwise
+    they are sorted first, in O(n log n) and in memory bounded by `chunk_size` ranges.
+    """
+    return starmap(_time_range, _union_spans(_prepared_spans(ranges, presorted, chunk_size)))
+
+
+def double_booked(
+    ranges: Iterable[TimeRange], presorted: bool = False, chunk_size: int = DEFAULT_SORT_CHUNK_SIZE
+) -> Iterator[TimeRange]:
+    """Returns the disjoint ranges of time covered by at least two of the ranges, by start; see `union`"""
+    spans = _prepared_spans(ranges, presorted, chunk_size)
+    return starmap(_time_range, _union_spans(_double_booked_spans(spans)))
+
+
+def intersection(
+    first: Iterable[TimeRange],
+    second: Iterable[TimeRange],
+    presorted: bool = False,
+    chunk_size: int = DEFAULT_SORT_CHUNK_SIZE,
+) -> Iterator[TimeRange]:
+    """Returns the disjoint ranges of time covered by both sets of ranges, by start; see `union`"""
+    spans = _intersection_spans(
+        _prepared_spans(first, presorted, chunk_size), _prepared_spans(second, presorted, chunk_size)
+    )
+    return starmap(_time_range, spans)
+
+
+def total(ranges: Iterable[Duration]) -> Duration:
+    """Returns the sum of durations, such as the disjoint ranges returned by `union`"""
+    return Duration.from_milliseconds(sum(duration.total_milliseconds for duration in ranges))
+
+
+def parse_range(text: str) -> TimeRange:
+    """Parses a range written as `start @ end`, such as `9h @ 12h30`"""
+    start, separator, end = text.partition("@")
+    if separator == "":
+        raise ValueError(f"`{text.strip()}` is not a range like `9h @ 12h30`")
+    return TimeRange(Duration.parse(start.strip()), Duration.parse(end.strip()))
+
+
+def read_ranges(stream: TextIO) -> Iterator[TimeRange]:
+    """Parses the range on each non-blank line of a text stream, lazily"""
+    for line_number, line in non_blank_lines(stream):
+        try:
+            yield parse_range(line)
+        except ValueError as ex:
+            raise ValueError(f"Invalid range on line {line_number}: {ex}") from ex
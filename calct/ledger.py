@@ -0,0 +1,101 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+from typing import Iterable, Iterator
+
+from calct.duration import Duration
+
+
+class DurationLedger:
+    """Sequence of durations answering sums over any range of rows in O(log n)
+
+    The durations are kept as integer milliseconds, along with a Fenwick tree (binary indexed tree) of their partial
+    sums, so updating a row or summing a range only touches O(log n) partial sums.
+    """
+
+    __slots__ = ("_values", "_tree")
+
+    def __init__(self, durations: Iterable[Duration] = ()) -> None:
+        self._values = [duration.total_milliseconds for duration in durations]
+        self._tree = [0] + self._values
+        size = len(self._tree)
+        for index in range(1, size):
+            parent = index + (index & -index)
+            if parent < size:
+                self._tree[parent] += self._tree[index]
+
+    @classmethod
+    def from_strings(cls, time_strs: Iterable[str]) -> DurationLedger:
+        """Creates a ledger from duration strings, such as `1h30`, parsed with `Duration.parse`"""
+        return cls(Duration.parse(time_str) for time_str in time_strs)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __iter__(self) -> Iterator[Duration]:
+        return map(Duration.from_milliseconds, self._values)
+
+    def __getitem__(self, index: int) -> Duration:
+        return Duration.from_milliseconds(self._values[index])
+
+    def __setitem__(self, index: int, duration: Duration) -> None:
+        index = range(len(self._values))[index]
+        self._add(index, duration.total_milliseconds - self._values[index])
+        self._values[index] = duration.total_milliseconds
+
+    def __repr__(self) -> str:
+        return f"DurationLedger({list(self)!r})"
+
+    def _add(self, index: int, delta: int) -> None:
+        tree = self._tree
+        position = index + 1
+        while position < len(tree):
+            tree[position] += delta
+            position += position & -position
+
+    def _prefix(self, end: int) -> int:
+        tree = self._tree
+        total = 0
+        while end > 0:
+            total += tree[end]
+            end &= end - 1
+        return total
+
+    def append(self, duration: Duration) -> None:
+        """Adds a row at the end, in O(log n)"""
+        milliseconds = duration.total_milliseconds
+        position = len(self._tree)
+        # The new node covers the rows from `position - lowbit(position) + 1` to `position`, the last one being new
+        self._tree.append(milliseconds + self._prefix(position - 1) - self._prefix(position - (position & -position)))
+        self._values.append(milliseconds)
+
+    def prefix_sum(self, end: int) -> Duration:
+        """Returns the sum of the rows before `end`"""
+        if not 0 <= end <= len(self._values):
+            raise IndexError(f"ledger index {end} out of range")
+        return Duration.from_milliseconds(self._prefix(end))
+
+    def range_sum(self, start: int, end: int) -> Duration:
+        """Returns the sum of the rows from `start` included to `end` excluded"""
+        if not 0 <= start <= end <= len(self._values):
+            raise IndexError(f"ledger range [{start}, {end}) out of range")
+        return Duration.from_milliseconds(self._prefix(end) - self._prefix(start))
+
+    def total(self) -> Duration:
+        """Returns the sum of all the rows"""
+        return self.prefix_sum(len(self._values))
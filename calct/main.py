@@ -22,15 +22,31 @@ __license__ = "GPLv3"
 
 import argparse
 import cmd
+import csv
 import logging
 import os
 import sys
+from contextlib import nullcontext
 from dataclasses import dataclass
-from typing import cast
+from itertools import chain
+from typing import Callable, ContextManager, Iterable, Optional, TextIO, Union, cast
 
 from calct.__version__ import __version__
-from calct.duration import Duration
-from calct.parser import compute
+from calct.aggregate import Aggregation, aggregate_csv, evaluate_duration
+from calct.bulk import EVALUATION_ERRORS, evaluate_file
+from calct.duration import Duration, Resolution
+from calct.history import History, default_history_path
+from calct.intervals import DEFAULT_SORT_CHUNK_SIZE, double_booked, read_ranges, union
+from calct.parser import compute_chunks
+from calct.stats import (
+    DEFAULT_COMPRESSION,
+    DEFAULT_MAX_BINS,
+    DurationSketch,
+    sketch_file,
+    sketch_stream,
+)
+from calct.validation import ErrorCode, validate
+from calct.window import CsvLayout, Window, window_csv
 
 
 def log_level_from_name(name: str) -> int:
@@ -70,9 +86,11 @@ Supports parentheses to control precedence.
 Supports operators + and - between two durations.
 Supports operators * and / between a duration and a number.
 Supports operator @ to create a time range: (a @ b) is the same as (b - a)
+In interactive mode, use (_) or ($1) for the last result, ($2) for the one before, and so on.
 
 Separate hours and minutes using (:) or (h).
 Minutes can also be specified as (m) or decimal hours.
+Seconds can be specified as (s), as in 1h30m15s, and are kept with --resolution second or millisecond.
 
 Exemple:
     ::      3h23 @ 5h24 + 2 * (1h - 30m)
@@ -81,6 +99,12 @@ Exemple:
         =>  5h24 - 3h23 + 60m
         =>  2h01 + 60m
         =>  3h01
+
+Subcommands, run `calct <subcommand> --help` for details, the options -s and -r go before the subcommand:
+    agg     Sum, min, max, mean or count durations of a CSV file, grouped by key
+    union   Merge overlapping time ranges of a file, like `9h @ 12h`, and total them
+    stats   Count, mean, standard deviation and percentiles of the durations of a file
+    window  Rolling sum, min or max of the durations of a CSV file, such as hours worked in any 7 days
 """
 
 
@@ -97,16 +121,319 @@ def get_version_str() -> str:
 def run_once(time_expr_list: list[str]) -> None:
     """Run the computation on an expression once"""
 
-    expr = " ".join(time_expr_list)
+    # Separate the arguments with spaces without building the joined expression
+    chunks = chain.from_iterable((" ", expr) for expr in time_expr_list)
 
     try:
-        print(compute(expr))
+        print(compute_chunks(chunks))
     except ValueError as ex:
         logging.error(ex)
     except TypeError as ex:
         logging.error(ex)
 
 
+def evaluate_text_file(path: str, output: TextIO) -> list[str]:
+    """Run the computation on each non-blank line of a text file, reading it line by line"""
+    errors: list[str] = []
+
+    with open(path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, start=1):
+            if line.isspace():
+                continue
+            try:
+                print(compute_chunks([line]), file=output)
+            except EVALUATION_ERRORS as ex:
+                print(file=output)
+                errors.append(f"Invalid expression on line {line_number}: {ex!r}")
+
+    return errors
+
+
+def run_file(path: str, output_path: Optional[str] = None, use_mmap: bool = False, jobs: Optional[int] = None) -> None:
+    """Run the computation on each line of a file, writing one result per non-blank line, exiting with 1 on errors"""
+    try:
+        with open(output_path, "w", encoding="utf-8") if output_path is not None else nullcontext(sys.stdout) as output:
+            if use_mmap:
+                errors = evaluate_file(path, output, jobs)
+            else:
+                errors = evaluate_text_file(path, output)
+    except OSError as ex:
+        logging.error(ex)
+        sys.exit(-1)
+
+    for error in errors:
+        logging.error(error)
+    if len(errors) > 0:
+        sys.exit(1)
+
+
+def check_lines(name: str, lines: Iterable[str]) -> int:
+    """Validate each non-blank line, printing each error with its line and column, and return the number of errors"""
+    invalid = 0
+    for line_number, line in enumerate(lines, start=1):
+        if (diagnostic := validate(line.rstrip("\r\n"))) is None or diagnostic.code is ErrorCode.EMPTY:
+            continue
+        invalid += 1
+        text = f" `{diagnostic.text}`" if diagnostic.text != "" else ""
+        print(f"{name}:{line_number}:{diagnostic.offset + 1}: {diagnostic.code.value}{text}")
+    return invalid
+
+
+def run_check(path: Optional[str], time_expr_list: list[str]) -> None:
+    """Validate each line of a file, or the expression of the command arguments, exiting with 1 if one is invalid"""
+    if path is None:
+        if len(time_expr_list) == 0:
+            logging.error("No time expression in command arguments")
+            sys.exit(-1)
+        invalid = check_lines("<args>", [" ".join(time_expr_list)])
+    else:
+        try:
+            with open_input(path) as stream:
+                invalid = check_lines("<stdin>" if path == "-" else path, stream)
+        except OSError as ex:
+            logging.error(ex)
+            sys.exit(-1)
+    if invalid > 0:
+        sys.exit(1)
+
+
+def open_input(path: str) -> ContextManager[TextIO]:
+    """Open a text file for reading, or the standard input for `-`, which is left open at the end of a `with` block"""
+    if path == "-":
+        return nullcontext(sys.stdin)
+    return open(path, encoding="utf-8", newline="")
+
+
+def run_agg(argv: list[str]) -> None:
+    """Run the `agg` subcommand"""
+    parser = argparse.ArgumentParser(
+        prog="calct agg", description="Aggregate the duration expressions of a CSV or TSV file, grouped by key"
+    )
+    parser.add_argument("file", help="CSV or TSV file, or `-` for the standard input")
+    parser.add_argument(
+        "-k",
+        "--key",
+        action="append",
+        required=True,
+        help="Key column, by name or by index with --no-header; repeat to group by several columns",
+    )
+    parser.add_argument("-c", "--column", required=True, help="Column holding the duration expressions")
+    parser.add_argument(
+        "-a",
+        "--aggregations",
+        default=Aggregation.SUM.value,
+        help=f"Comma-separated aggregations among {', '.join(agg.value for agg in Aggregation)}",
+    )
+    parser.add_argument("-d", "--delimiter", default=None, help="Column delimiter, defaults to tab for .tsv files")
+    parser.add_argument("--no-header", action="store_true", help="The first row holds data, not column names")
+    args = parser.parse_args(argv)
+
+    delimiter = args.delimiter or ("\t" if args.file.endswith(".tsv") else ",")
+    try:
+        aggregations = [Aggregation(name.strip()) for name in args.aggregations.split(",")]
+    except ValueError as ex:
+        parser.error(str(ex))
+
+    def column(name: str) -> Union[int, str]:
+        return int(name) if args.no_header else name
+
+    try:
+        with open_input(args.file) as stream:
+            key_names, groups = aggregate_csv(
+                stream, [column(key) for key in args.key], column(args.column), delimiter, not args.no_header
+            )
+    except (OSError, ValueError, TypeError) as ex:
+        logging.error(ex)
+        sys.exit(-1)
+
+    writer = csv.writer(sys.stdout, delimiter=delimiter, lineterminator="\n")
+    writer.writerow(key_names + [aggregation.value for aggregation in aggregations])
+    for key, group in groups.items():
+        writer.writerow(list(key) + [str(group.value(aggregation)) for aggregation in aggregations])
+
+
+def run_union(argv: list[str]) -> None:
+    """Run the `union` subcommand"""
+    parser = argparse.ArgumentParser(
+        prog="calct union",
+        description="Merge the time ranges of a file, one `start @ end` per line, so overlapping time counts once",
+    )
+    parser.add_argument("-f", "--file", required=True, help="File of ranges, or `-` for the standard input")
+    parser.add_argument(
+        "--sorted", action="store_true", help="The ranges are already sorted by start, merge them in a single pass"
+    )
+    parser.add_argument(
+        "--double-booked", action="store_true", help="Output the time covered by at least two ranges instead"
+    )
+    parser.add_argument("-t", "--total", action="store_true", help="Only output the total duration of the result")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_SORT_CHUNK_SIZE,
+        help="Number of ranges sorted in memory at once, larger inputs are sorted through temporary files",
+    )
+    args = parser.parse_args(argv)
+
+    engine = double_booked if args.double_booked else union
+    total = 0
+    try:
+        with open_input(args.file) as stream:
+            for time_range in engine(read_ranges(stream), args.sorted, args.chunk_size):
+                total += time_range.total_milliseconds
+                if not args.total:
+                    print(f"{time_range.start} @ {time_range.end}")
+    except (OSError, ValueError) as ex:
+        logging.error(ex)
+        sys.exit(-1)
+
+    print(Duration.from_milliseconds(total))
+
+
+def run_stats(argv: list[str]) -> None:
+    """Run the `stats` subcommand"""
+    parser = argparse.ArgumentParser(
+        prog="calct stats",
+        description="Summarize the durations of a file, one expression per line, in bounded memory",
+    )
+    parser.add_argument("-f", "--file", required=True, help="File of expressions, or `-` for the standard input")
+    parser.add_argument(
+        "-p",
+        "--percentiles",
+        default="50,95,99",
+        help="Comma-separated percentiles to output, from 0 to 100",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="Number of worker processes, the file is memory-mapped and split"
+    )
+    parser.add_argument(
+        "--max-bins",
+        type=int,
+        default=DEFAULT_MAX_BINS,
+        help="Distinct minutes kept in the exact histogram before falling back to an approximate t-digest",
+    )
+    parser.add_argument(
+        "--compression",
+        type=int,
+        default=DEFAULT_COMPRESSION,
+        help="Accuracy of the t-digest, its size grows linearly with it",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        percentiles = [float(percent) for percent in args.percentiles.split(",")]
+    except ValueError as ex:
+        parser.error(str(ex))
+    if any(not 0 <= percent <= 100 for percent in percentiles):
+        parser.error("The percentiles must be between 0 and 100")
+
+    try:
+        if args.file == "-":
+            sketch = sketch_stream(sys.stdin, DurationSketch(max_bins=args.max_bins, compression=args.compression))
+        else:
+            sketch = sketch_file(args.file, args.jobs, args.max_bins, args.compression)
+    except (OSError, ValueError, TypeError) as ex:
+        logging.error(ex)
+        sys.exit(-1)
+
+    print(f"count\t{sketch.count}")
+    if sketch.count == 0:
+        return
+    print(f"min\t{Duration(minutes=sketch.minimum)}")
+    print(f"max\t{Duration(minutes=sketch.maximum)}")
+    print(f"mean\t{sketch.mean()}")
+    print(f"stdev\t{sketch.stdev()}")
+    for percent in percentiles:
+        print(f"p{percent:g}\t{sketch.percentile(percent)}")
+    if not sketch.is_exact:
+        print("# percentiles are approximate", file=sys.stderr)
+
+
+def run_window(argv: list[str]) -> None:
+    """Run the `window` subcommand"""
+    parser = argparse.ArgumentParser(
+        prog="calct window",
+        description="Add rolling aggregates of the duration expressions of a CSV or TSV file to each of its rows",
+    )
+    parser.add_argument("file", help="CSV or TSV file, or `-` for the standard input")
+    parser.add_argument(
+        "-t",
+        "--time",
+        required=True,
+        help="Column holding the time of each row, as an ISO 8601 date and time or a duration, sorted within groups",
+    )
+    parser.add_argument("-c", "--column", required=True, help="Column holding the duration expressions")
+    parser.add_argument("-w", "--width", required=True, help="Width of the trailing window, such as `7 * 24h`")
+    parser.add_argument(
+        "-k",
+        "--key",
+        action="append",
+        default=[],
+        help="Key column whose groups each have their own window; repeat to group by several columns",
+    )
+    parser.add_argument(
+        "-a",
+        "--aggregations",
+        default=Window.SUM.value,
+        help=f"Comma-separated aggregations among {', '.join(window.value for window in Window)}",
+    )
+    parser.add_argument(
+        "--over", default=None, help="Only output the rows whose first aggregation is over this duration, like `40h`"
+    )
+    parser.add_argument("-d", "--delimiter", default=None, help="Column delimiter, defaults to tab for .tsv files")
+    parser.add_argument("--no-header", action="store_true", help="The first row holds data, not column names")
+    args = parser.parse_args(argv)
+
+    delimiter = args.delimiter or ("\t" if args.file.endswith(".tsv") else ",")
+    try:
+        windows = [Window(name.strip()) for name in args.aggregations.split(",")]
+        width = evaluate_duration(args.width).total_minutes
+        over = None if args.over is None else evaluate_duration(args.over).total_minutes
+    except (ValueError, TypeError) as ex:
+        parser.error(str(ex))
+
+    def column(name: str) -> Union[int, str]:
+        return int(name) if args.no_header else name
+
+    writer = csv.writer(sys.stdout, delimiter=delimiter, lineterminator="\n")
+    try:
+        with open_input(args.file) as stream:
+            header, rows = window_csv(
+                stream,
+                CsvLayout(
+                    column(args.time),
+                    column(args.column),
+                    [column(key) for key in args.key],
+                    delimiter,
+                    not args.no_header,
+                ),
+                width,
+                windows,
+            )
+            if header is not None:
+                writer.writerow(header + [window.value for window in windows])
+            for row, values in rows:
+                if over is None or values[0] > over:
+                    writer.writerow(row + [str(Duration(minutes=minutes)) for minutes in values])
+    except (OSError, ValueError, TypeError) as ex:
+        logging.error(ex)
+        sys.exit(-1)
+
+
+SUBCOMMANDS: dict[str, Callable[[list[str]], None]] = {
+    "agg": run_agg,
+    "union": run_union,
+    "stats": run_stats,
+    "window": run_window,
+}
+
+
+def run_subcommand(parser: argparse.ArgumentParser, argv: list[str], remaining_args: list[str]) -> None:
+    """Run the subcommand named by the first argument, once the options of the program that come before are applied"""
+    if len(remaining_args) > 0:
+        parser.error(f"unrecognized arguments before `{argv[0]}`: {' '.join(remaining_args)}")
+    SUBCOMMANDS[argv[0]](argv[1:])
+
+
 class Repl(cmd.Cmd):
     """calct REPL"""
 
@@ -116,8 +443,22 @@ class Repl(cmd.Cmd):
     )
     prompt = "(calct) > "
 
+    def __init__(self, history: Optional[History] = None) -> None:
+        super().__init__()
+        self.history = History(default_history_path()) if history is None else history
+
     def default(self, line: str) -> None:
-        run_once([line])
+        try:
+            result = compute_chunks([line], self.history)
+        except EVALUATION_ERRORS as ex:
+            logging.error(ex)
+            return
+        print(result)
+        self.history.append(result)
+        try:
+            self.history.save()
+        except OSError as ex:
+            logging.warning(f"Could not save the history: {ex}")
 
     def emptyline(self) -> bool:
         return False
@@ -160,6 +501,22 @@ class Repl(cmd.Cmd):
             except ValueError as ex:
                 logging.error(ex)
 
+    def do_history(self, _) -> None:
+        """Show the previous results, the most recent last, with the reference to use them"""
+        results = self.history.results
+        for index, result in enumerate(results):
+            print(f"${len(results) - index}  {result}")
+
+    def do_resolution(self, arg: str) -> None:
+        """Show or set the smallest unit kept in computations and display: minute, second or millisecond"""
+        if len(arg) == 0:
+            print(Duration.get_resolution().name.lower())
+        else:
+            try:
+                Duration.set_resolution(Resolution[arg.strip().upper()])
+            except KeyError:
+                logging.error(f"Invalid resolution: {arg}")
+
 
 def run_loop():
     """Run the REPL loop"""
@@ -171,8 +528,8 @@ def run_loop():
 
 
 @dataclass
-class Args(argparse.Namespace):
-    """Arguments for the program"""
+class Args(argparse.Namespace):  # pylint: disable=too-many-instance-attributes
+    """Arguments for the program, one attribute per command-line option"""
 
     log_level: str = "WARNING"
     interactive: bool = False
@@ -180,13 +537,16 @@ class Args(argparse.Namespace):
     licence: bool = False
     version: bool = False
     separator: str = "h"
+    resolution: str = "minute"
+    file: Optional[str] = None
+    mmap: bool = False
+    output: Optional[str] = None
+    jobs: Optional[int] = None
+    check: bool = False
 
 
-def main():
-    """Main function"""
-    logging_format = "%(levelname)s: %(message)s"
-    logging.basicConfig(format=logging_format)
-
+def make_parser() -> argparse.ArgumentParser:
+    """Return the parser of the options of the program, which come before a subcommand"""
     parser = argparse.ArgumentParser(add_help=False)
     parser.add_argument(
         "-l",
@@ -228,7 +588,59 @@ def main():
         help="Set the separator for hours and minutes used in display, and usable in parsing",
         default="h",
     )
-    args, remaining_args = parser.parse_known_args(namespace=Args())
+    parser.add_argument(
+        "-r",
+        "--resolution",
+        choices=[resolution.name.lower() for resolution in Resolution],
+        help="Set the smallest unit kept in computations and display",
+        default="minute",
+    )
+    parser.add_argument(
+        "-f",
+        "--file",
+        help="Compute each line of a file instead of the command arguments",
+        default=None,
+    )
+    parser.add_argument(
+        "--mmap",
+        action="store_true",
+        help="Memory-map the file given with --file and compute its lines in parallel",
+        default=False,
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="Write the results of --file to this file instead of the standard output",
+        default=None,
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="Number of worker processes used with --mmap, defaults to the number of CPUs",
+        default=None,
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only check the syntax and types of the expressions, printing each error with its line and column",
+        default=False,
+    )
+    return parser
+
+
+def main():
+    """Main function"""
+    logging_format = "%(levelname)s: %(message)s"
+    logging.basicConfig(format=logging_format)
+
+    # The global options, such as the separator and the resolution, come before the subcommand and apply to it
+    argv = sys.argv[1:]
+    subcommand = next((index for index, arg in enumerate(argv) if arg in SUBCOMMANDS), len(argv))
+    argv, subcommand_argv = argv[:subcommand], argv[subcommand:]
+
+    parser = make_parser()
+    args, remaining_args = parser.parse_known_args(argv, namespace=Args())
     args = cast(Args, args)
 
     logging.getLogger().setLevel(log_level_from_name(args.log_level))
@@ -242,7 +654,14 @@ def main():
         except ValueError as ex:
             logging.error(ex)
 
-    if args.help:
+    Duration.set_resolution(Resolution[args.resolution.upper()])
+
+    if args.mmap and args.file is None:
+        parser.error("--mmap needs a file given with --file")
+
+    if len(subcommand_argv) > 0:
+        run_subcommand(parser, subcommand_argv, remaining_args)
+    elif args.help:
         print(get_help_str())
         parser.print_help()
         sys.exit()
@@ -254,6 +673,10 @@ def main():
         sys.exit()
     elif args.interactive:
         run_loop()
+    elif args.check:
+        run_check(args.file, remaining_args)
+    elif args.file is not None:
+        run_file(args.file, args.output, args.mmap, args.jobs)
     elif len(remaining_args) > 0:
         run_once(remaining_args)
     else:
@@ -17,44 +17,73 @@
 from __future__ import annotations
 
 import logging
+import re
 from collections import deque
 from enum import Enum
+from itertools import chain
 from operator import add, mul, sub, truediv
-from typing import Any, Callable, Union, cast
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+    Sequence,
+    TextIO,
+    TypeVar,
+    Union,
+    cast,
+)
 
 from calct._common import (
     DIGITS_STR,
-    FLOAT_CHARS_STR,
     FLOAT_EXPONENT_STR,
     FLOAT_SEPARATOR_EXPONENT_STR,
+    NUMBER_START_STR,
     OPS_PAREN_STR,
     OPS_STR,
+    REFERENCE_CHARS_STR,
     SIGN_STR,
-    WHITESPACE_STR,
+    CharClass,
     Number,
+    parse_number,
 )
 from calct.duration import Duration
+from calct.intervals import TimeRange
 
+Token = Union[str, Number, Duration]
+TokenT = TypeVar("TokenT", str, Token)
 
-def lex(input_str: str) -> list[str]:
-    """Lexes the input string into a list of tokens"""
-    tokens: list[str] = []
-    buffer: list[str] = []
 
-    logging.debug(input_str)
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# A sign right after an exponent, as in `1e-3`, belongs to the number, so no cut is made there
+_SUM_OPERATOR = re.compile(rf"(?<![{FLOAT_EXPONENT_STR}])[{SIGN_STR}]")
+_SUM_OPERATOR_OR_PAREN = re.compile(rf"(?<![{FLOAT_EXPONENT_STR}])[{SIGN_STR}]|[()]")
 
-    def add_token():
+
+def iter_lex(chars: Iterable[str]) -> Iterator[str]:
+    """Lexes a stream of characters or text chunks into tokens, lazily"""
+    buffer: list[str] = []
+
+    def flush_token() -> Iterator[str]:
         if len(buffer) > 0:
-            tokens.append("".join(buffer))
+            yield "".join(buffer)
             buffer.clear()
 
     last_char = None
+    classes = Duration.get_char_classes()
+    operator, whitespace = CharClass.OPERATOR, CharClass.WHITESPACE
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
 
-    for char in input_str:
+    for char in chain.from_iterable(chars):
 
-        logging.debug(f"{char=}, {buffer=}, {tokens=}")
-        if char in OPS_PAREN_STR:
-            if last_char and last_char in FLOAT_EXPONENT_STR:
+        if debug:
+            logging.debug(f"{char=}, {buffer=}")
+        char_class = classes.get(char)
+        if char_class is operator:
+            if last_char and last_char in FLOAT_EXPONENT_STR and buffer[0] in NUMBER_START_STR:
                 if char in SIGN_STR:
                     buffer.append(char)
                 else:
@@ -64,26 +93,39 @@ def lex(input_str: str) -> list[str]:
                     )
 
             else:
-                add_token()
-                tokens.append(char)
-        elif char in WHITESPACE_STR:
-            add_token()
-        elif char in FLOAT_CHARS_STR:
-            buffer.append(char)
-        elif char in Duration.get_hour_and_minute_seps():
+                yield from flush_token()
+                yield char
+        elif char_class is whitespace:
+            yield from flush_token()
+        elif char_class is not None:
             buffer.append(char)
         else:
             raise ValueError(
                 f"`{char}` is not a digit `{DIGITS_STR}`, "
                 f"an operator or parenthesis `{OPS_PAREN_STR}`, "
                 f"a whitespace, a digit separator or exponent `{FLOAT_SEPARATOR_EXPONENT_STR}`, "
+                f"a variable name, a result reference `{REFERENCE_CHARS_STR}`, "
                 f"or a time unit or separator `{''.join(Duration.get_hour_and_minute_seps())}`"
             )
         last_char = char
 
-    add_token()
+    yield from flush_token()
+
+
+def lex(input_str: str) -> list[str]:
+    """Lexes the input string into a list of tokens"""
+    logging.debug(input_str)
+    return list(iter_lex([input_str]))
+
+
+def read_chunks(stream: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """Reads a text stream in chunks of at most `chunk_size` characters"""
+    return iter(lambda: stream.read(chunk_size), "")
 
-    return tokens
+
+def lex_stream(stream: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """Lexes a text stream into tokens, reading it in chunks"""
+    return iter_lex(read_chunks(stream, chunk_size))
 
 
 class Associativity(Enum):
@@ -94,7 +136,9 @@ class Associativity(Enum):
 
 
 def op_to(val1: Any, val2: Any) -> Any:
-    """Implements the `to` operator"""
+    """Implements the `to` operator: the time range from `val1` to `val2` for durations, else their difference"""
+    if isinstance(val1, Duration) and isinstance(val2, Duration):
+        return TimeRange(val1, val2)
     return val2 - val1
 
 
@@ -168,16 +212,17 @@ class Operation(Enum):
         return NotImplemented
 
 
-def parse(tokens: list[str]) -> deque[str]:
-    """Parses the tokens into a Reverse Polish Notation (RPN) stack"""
-    logging.debug(tokens)
+def iter_parse(tokens: Iterable[TokenT]) -> Iterator[TokenT]:
+    """Parses a stream of tokens into a Reverse Polish Notation (RPN) stream, lazily
 
-    out_queue: deque[str] = deque()
+    Only pending operators and parentheses are kept in memory, so the memory used is bounded by the nesting depth
+    of the expression rather than by its length.
+    """
     op_stack: deque[str] = deque()
 
     for token in tokens:
-        if token not in OPS_PAREN_STR:
-            out_queue.append(token)
+        if not isinstance(token, str) or token not in OPS_PAREN_STR:
+            yield token
         elif token in OPS_STR:
             while (len(op_stack) > 0 and op_stack[-1] in OPS_STR) and (
                 (Operation(op_stack[-1]).precedence > Operation(token).precedence)
@@ -186,7 +231,7 @@ def parse(tokens: list[str]) -> deque[str]:
                     and Operation(token).associativity == Associativity.LEFT
                 )
             ):
-                out_queue.append(op_stack.pop())
+                yield op_stack.pop()
             op_stack.append(token)
         elif token == "(":
             op_stack.append(token)
@@ -194,7 +239,7 @@ def parse(tokens: list[str]) -> deque[str]:
             if len(op_stack) == 0:
                 raise ValueError("Unmatched closing parenthesis")
             while op_stack[-1] != "(":
-                out_queue.append(op_stack.pop())
+                yield op_stack.pop()
                 if len(op_stack) == 0:
                     raise ValueError("Unmatched closing parenthesis")
             op_stack.pop()
@@ -202,44 +247,288 @@ def parse(tokens: list[str]) -> deque[str]:
     while len(op_stack) > 0:
         if op_stack[-1] == "(":
             raise ValueError("Unmatched opening parenthesis")
-        out_queue.append(op_stack.pop())
+        yield op_stack.pop()
 
-    return out_queue
 
+def parse(tokens: list[str]) -> deque[str]:
+    """Parses the tokens into a Reverse Polish Notation (RPN) stack"""
+    logging.debug(tokens)
+    return deque(iter_parse(tokens))
+
+
+def evaluate_token(token: str) -> Union[Number, Duration]:
+    """Evaluates a single duration or number token
+
+    Variables and result references can't be evaluated on their own: they need the `bindings` of `evaluate_rpn`.
+    """
+    if (common := (set(token) & Duration.get_hour_and_minute_seps())) != set():
+        logging.debug("%s is a time because it contains %s", token, common)
+        try:
+            return Duration.parse(token)
+        except ValueError:
+            if not token.isidentifier():
+                raise
+
+    if token[0] in REFERENCE_CHARS_STR or token.isidentifier():
+        raise ValueError(f"`{token}` is not a bound variable or a known result reference")
 
-def evaluate_rpn(rpn: deque[str]) -> Union[Number, Duration]:
-    """Evaluates the Reverse Polish Notation (RPN) stack"""
-    eval_stack: deque[Union[str, Number, Duration]] = deque()
+    return parse_number(token)
+
+
+def fold_rpn(rpn: Iterable[Token], operand: Callable[[Token], Any]) -> Any:
+    """Evaluates the Reverse Polish Notation (RPN) stack, applying each operator to the two values below it
+
+    Every other element is turned into a value by `operand`, which lets the values be durations, numbers, or
+    anything else supporting the operators.
+    """
+    eval_stack: deque[Any] = deque()
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
 
     for element in rpn:
-        logging.debug(f"{element=}")
-        if element in OPS_STR:
-            logging.debug(f"op1={eval_stack[-1]!r}, op2={eval_stack[-2]!r}")
+        if isinstance(element, str) and element in OPS_STR:
             op2 = eval_stack.pop()
             op1 = eval_stack.pop()
             eval_stack.append(Operation(element).operation(op1, op2))
-            logging.debug(f"t is {element}, {eval_stack=}")
         else:
-            if (common := (set(element) & Duration.get_hour_and_minute_seps())) != set():
-                eval_stack.append(Duration.parse(element))
-                logging.debug(f"t is a time because it contains {common}, {eval_stack=}")
-            else:
-                try:
-                    eval_stack.append(int(element))
-                except ValueError:
-                    try:
-                        eval_stack.append(float(element))
-                    except ValueError as ex:
-                        raise ValueError(f"`{element}` is not a valid number") from ex
-                logging.debug(f"t is a number, {eval_stack=}")
-
-    if not isinstance(eval_stack[-1], (Duration, int, float)):
+            eval_stack.append(operand(element))
+        if debug:
+            logging.debug(f"{element=}, {eval_stack=}")
+
+    return eval_stack[-1]
+
+
+def evaluate_rpn(
+    rpn: Iterable[Token], bindings: Optional[Mapping[str, Union[Number, Duration]]] = None
+) -> Union[Number, Duration]:
+    """Evaluates the Reverse Polish Notation (RPN) stack, or a stream of RPN elements
+
+    Besides string tokens, the RPN can hold literals that were already evaluated, as numbers or durations.
+    Tokens found in `bindings`, like the result references `_` and `$1`, evaluate to their bound value.
+    """
+
+    def operand(element: Token) -> Union[Number, Duration]:
+        if not isinstance(element, str):
+            return element
+        if bindings is not None and element in bindings:
+            return bindings[element]
+        return evaluate_token(element)
+
+    result = fold_rpn(rpn, operand)
+    if not isinstance(result, (Duration, int, float)):
+        raise ValueError("Invalid expression: the result is not a duration or a number")
+    return cast(Union[Number, Duration], result)
+
+
+_PRATT_OPERATIONS = {
+    operation.value: (operation.operation, operation.precedence, operation.associativity is Associativity.RIGHT)
+    for operation in Operation
+}
+
+
+def evaluate_pratt(
+    tokens: Sequence[str], bindings: Optional[Mapping[str, Union[Number, Duration]]] = None
+) -> Union[Number, Duration]:
+    """Evaluates a list of tokens in a single pass, with a Pratt parser
+
+    Each operation is applied as soon as its right operand is parsed, using the precedence and associativity of
+    `Operation`, so no RPN is built. Unlike `evaluate_rpn`, operands that are not separated by an operator are
+    rejected. The nesting depth of parentheses is limited by the recursion limit.
+    """
+    position = 0
+    end = len(tokens)
+
+    def operand() -> Any:
+        nonlocal position
+        if position == end:
+            raise ValueError("Missing operand at the end of the expression")
+        token = tokens[position]
+        position += 1
+        if token == "(":
+            value = expression(0)
+            if position == end:
+                raise ValueError("Unmatched opening parenthesis")
+            position += 1
+            return value
+        if token in OPS_PAREN_STR:
+            raise ValueError(f"Missing operand before `{token}`")
+        if bindings is not None and token in bindings:
+            return bindings[token]
+        return evaluate_token(token)
+
+    def expression(min_precedence: int) -> Any:
+        nonlocal position
+        left = operand()
+        while position < end:
+            token = tokens[position]
+            if token == ")":
+                break
+            try:
+                operation, precedence, right_associative = _PRATT_OPERATIONS[token]
+            except KeyError:
+                raise ValueError(f"Missing operator before `{token}`") from None
+            if precedence < min_precedence:
+                break
+            position += 1
+            left = operation(left, expression(precedence if right_associative else precedence + 1))
+        return left
+
+    value = expression(0)
+    if position < end:
+        raise ValueError("Unmatched closing parenthesis")
+    if not isinstance(value, (Duration, int, float)):
         raise ValueError("Invalid expression: the result is not a duration or a number")
-    return cast(Union[Number, Duration], eval_stack[-1])
+    return cast(Union[Number, Duration], value)
+
+
+class Node:  # pylint: disable=too-few-public-methods
+    """Node of an expression tree
+
+    Nodes are immutable and compared by identity: build them with an `AstBuilder` so that identical subtrees are
+    shared, which makes identity equivalent to structural equality. They are plain data, walked by `lower_ast` and
+    `evaluate_ast` rather than by methods of their own.
+    """
 
+    __slots__ = ()
 
-def compute(expr: str) -> Union[Number, Duration]:
-    """Computes the value of the expression"""
+
+class Literal(Node):  # pylint: disable=too-few-public-methods
+    """Leaf of an expression tree, holding a duration or number token"""
+
+    __slots__ = ("token",)
+
+    def __init__(self, token: str) -> None:
+        self.token = token
+
+    def __repr__(self) -> str:
+        return f"Literal({self.token!r})"
+
+
+class BinaryOp(Node):  # pylint: disable=too-few-public-methods
+    """Inner node of an expression tree, applying an operation to two subtrees"""
+
+    __slots__ = ("operation", "left", "right")
+
+    def __init__(self, operation: Operation, left: Node, right: Node) -> None:
+        self.operation = operation
+        self.left = left
+        self.right = right
+
+    def __repr__(self) -> str:
+        return f"BinaryOp({self.operation.value!r}, {self.left!r}, {self.right!r})"
+
+
+class AstBuilder:
+    """Hash-consing factory for expression tree nodes
+
+    Asking twice for the same literal, or for the same operation on the same children, returns the same node.
+    """
+
+    def __init__(self) -> None:
+        self._nodes: dict[tuple[Any, ...], Node] = {}
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def literal(self, token: str) -> Node:
+        """Returns the unique leaf for a token"""
+        key = (token,)
+        if (node := self._nodes.get(key)) is None:
+            node = self._nodes[key] = Literal(token)
+        return node
+
+    def binary_op(self, operation: Operation, left: Node, right: Node) -> Node:
+        """Returns the unique node applying `operation` to `left` and `right`"""
+        key = (operation, left, right)
+        if (node := self._nodes.get(key)) is None:
+            node = self._nodes[key] = BinaryOp(operation, left, right)
+        return node
+
+
+def build_ast(rpn: Iterable[str], builder: Optional[AstBuilder] = None) -> Node:
+    """Builds a hash-consed expression tree from a Reverse Polish Notation (RPN) stack"""
+    if builder is None:
+        builder = AstBuilder()
+
+    node_stack: list[Node] = []
+
+    for element in rpn:
+        if element in OPS_STR:
+            if len(node_stack) < 2:
+                raise ValueError(f"Invalid expression: missing operand for `{element}`")
+            right = node_stack.pop()
+            left = node_stack.pop()
+            node_stack.append(builder.binary_op(Operation(element), left, right))
+        else:
+            node_stack.append(builder.literal(element))
+
+    if len(node_stack) != 1:
+        raise ValueError("Invalid expression: expected exactly one value")
+    return node_stack[0]
+
+
+def parse_ast(tokens: list[str]) -> Node:
+    """Parses the tokens into a hash-consed expression tree"""
+    return build_ast(parse(tokens))
+
+
+def lower_ast(node: Node) -> deque[str]:
+    """Lowers an expression tree back into a Reverse Polish Notation (RPN) stack, for `evaluate_rpn`"""
+    rpn: deque[str] = deque()
+    work: list[tuple[Node, bool]] = [(node, False)]
+
+    while len(work) > 0:
+        current, expanded = work.pop()
+        if isinstance(current, Literal):
+            rpn.append(current.token)
+        elif expanded:
+            rpn.append(cast(BinaryOp, current).operation.value)
+        else:
+            current = cast(BinaryOp, current)
+            work.append((current, True))
+            work.append((current.right, False))
+            work.append((current.left, False))
+
+    return rpn
+
+
+def evaluate_ast(node: Node) -> Union[Number, Duration]:
+    """Evaluates an expression tree, computing each shared subtree only once"""
+    values: dict[Node, Union[Number, Duration]] = {}
+    work: list[Node] = [node]
+
+    while len(work) > 0:
+        current = work[-1]
+        if current in values:
+            work.pop()
+        elif isinstance(current, Literal):
+            values[current] = evaluate_token(current.token)
+            work.pop()
+        else:
+            current = cast(BinaryOp, current)
+            if current.left not in values:
+                work.append(current.left)
+            elif current.right not in values:
+                work.append(current.right)
+            else:
+                values[current] = current.operation.operation(values[current.left], values[current.right])
+                work.pop()
+
+    return values[node]
+
+
+class ParseMethod(Enum):
+    """Enum for the ways `compute` parses and evaluates an expression"""
+
+    RPN = "rpn"
+    PRATT = "pratt"
+
+
+def compute(expr: str, method: ParseMethod = ParseMethod.RPN) -> Union[Number, Duration]:
+    """Computes the value of the expression
+
+    `ParseMethod.RPN` builds a Reverse Polish Notation (RPN) stack then evaluates it, while `ParseMethod.PRATT`
+    evaluates while parsing, in a single pass.
+    """
 
     # TODO: add error messages to raised exception for each case and remove all try-except blocks here
     try:
@@ -247,6 +536,9 @@ def compute(expr: str) -> Union[Number, Duration]:
     except ValueError as ex:
         raise ex
 
+    if method is ParseMethod.PRATT:
+        return evaluate_pratt(tokens)
+
     try:
         rpn = parse(tokens)
     except ValueError as ex:
@@ -265,3 +557,53 @@ def compute(expr: str) -> Union[Number, Duration]:
         raise ex
 
     return val
+
+
+def compute_chunks(
+    chunks: Iterable[str], bindings: Optional[Mapping[str, Union[Number, Duration]]] = None
+) -> Union[Number, Duration]:
+    """Computes the value of an expression given as consecutive text chunks, without joining them"""
+    return evaluate_rpn(iter_parse(iter_lex(chunks)), bindings)
+
+
+def split_sum(expr: str, parts: int) -> list[str]:
+    """Splits an expression into at most `parts` pieces of similar length, each cut before a top-level `+` or `-`
+
+    As `+` and `-` have the lowest precedence and are left-associative, the expression is its first piece followed
+    by each of the other pieces, in order, each starting with its `+` or `-`. An expression without top-level `+` or
+    `-` is a single piece.
+    """
+    targets = iter(len(expr) * part // parts for part in range(1, parts))
+    target = next(targets, None)
+    cuts = [0]
+
+    if "(" not in expr and ")" not in expr:
+        while target is not None:
+            match = _SUM_OPERATOR.search(expr, max(target, cuts[-1] + 1))
+            if match is None:
+                break
+            cuts.append(match.start())
+            while target is not None and target <= match.start():
+                target = next(targets, None)
+    else:
+        depth = 0
+        for match in _SUM_OPERATOR_OR_PAREN.finditer(expr):
+            if target is None:
+                break
+            char = match.group()
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+            elif depth == 0 and match.start() >= target and match.start() > 0:
+                cuts.append(match.start())
+                while target is not None and target <= match.start():
+                    target = next(targets, None)
+
+    cuts.append(len(expr))
+    return [expr[start:end] for start, end in zip(cuts, cuts[1:])]
+
+
+def compute_stream(stream: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Union[Number, Duration]:
+    """Computes the value of an expression read from a text stream in chunks"""
+    return compute_chunks(read_chunks(stream, chunk_size))
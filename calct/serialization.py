@@ -0,0 +1,182 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import struct
+import sys
+from array import array
+from collections import deque
+from enum import IntEnum
+from typing import Iterable
+
+from calct.duration import MILLISECONDS_PER_MINUTE, Duration
+from calct.parser import OPS_STR, Token, evaluate_token
+
+RPN_MAGIC = b"CRPN"
+RPN_VERSION = 1
+
+_FLOAT64 = struct.Struct("<d")
+
+
+class Tag(IntEnum):
+    """Tag byte preceding each element of a serialized RPN"""
+
+    ADD = 1
+    SUB = 2
+    MUL = 3
+    DIV = 4
+    TO = 5
+    INT = 16
+    FLOAT = 17
+    DURATION = 18
+    DURATION_MS = 19
+
+
+_OPERATOR_TAGS = dict(zip(OPS_STR, (Tag.ADD, Tag.SUB, Tag.MUL, Tag.DIV, Tag.TO)))
+_TAG_OPERATORS = {tag.value: operator for operator, tag in _OPERATOR_TAGS.items()}
+
+
+def encode_varint(value: int, out: bytearray) -> None:
+    """Appends a signed integer to `out` as a zigzag LEB128 varint"""
+    value = value * 2 if value >= 0 else -value * 2 - 1
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data: bytes, pos: int) -> tuple[int, int]:
+    """Reads a zigzag LEB128 varint from `data` at `pos`, returning its value and the position after it"""
+    result = 0
+    shift = 0
+    while True:
+        try:
+            byte = data[pos]
+        except IndexError as ex:
+            raise ValueError("Truncated varint") from ex
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            break
+        shift += 7
+    return (result >> 1) ^ -(result & 1), pos
+
+
+def ints_to_bytes(values: Iterable[int]) -> bytes:
+    """Serializes integers, such as minutes, as consecutive little-endian signed 64-bit integers"""
+    packed = array("q", values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def ints_from_bytes(data: bytes) -> array[int]:
+    """Deserializes the integers produced by `ints_to_bytes`"""
+    if len(data) % 8 != 0:
+        raise ValueError("Serialized integers must be a multiple of 8 bytes long")
+    unpacked = array("q")
+    unpacked.frombytes(data)
+    if sys.byteorder == "big":
+        unpacked.byteswap()
+    return unpacked
+
+
+def durations_to_bytes(durations: Iterable[Duration]) -> bytes:
+    """Serializes durations as consecutive little-endian signed 64-bit counts of milliseconds"""
+    return ints_to_bytes(duration.total_milliseconds for duration in durations)
+
+
+def durations_from_bytes(data: bytes) -> list[Duration]:
+    """Deserializes the durations produced by `durations_to_bytes`"""
+    return [Duration.from_milliseconds(milliseconds) for milliseconds in ints_from_bytes(data)]
+
+
+def rpn_to_bytes(rpn: Iterable[Token]) -> bytes:
+    """Serializes a Reverse Polish Notation (RPN) stack
+
+    Literals are evaluated while serializing, so the deserialized RPN holds numbers and durations that
+    `evaluate_rpn` uses without parsing them again.
+    """
+    out = bytearray(RPN_MAGIC)
+    out.append(RPN_VERSION)
+
+    for element in rpn:
+        if isinstance(element, str):
+            if element in OPS_STR:
+                out.append(_OPERATOR_TAGS[element])
+                continue
+            element = evaluate_token(element)
+
+        if isinstance(element, Duration):
+            minutes, milliseconds = divmod(element.total_milliseconds, MILLISECONDS_PER_MINUTE)
+            if milliseconds == 0:
+                out.append(Tag.DURATION)
+                encode_varint(minutes, out)
+            else:
+                out.append(Tag.DURATION_MS)
+                encode_varint(element.total_milliseconds, out)
+        elif isinstance(element, int):
+            out.append(Tag.INT)
+            encode_varint(element, out)
+        elif isinstance(element, float):
+            out.append(Tag.FLOAT)
+            out += _FLOAT64.pack(element)
+        else:
+            raise TypeError(f"Can't serialize RPN element {element!r}")
+
+    return bytes(out)
+
+
+def rpn_from_bytes(data: bytes) -> deque[Token]:
+    """Deserializes a Reverse Polish Notation (RPN) stack produced by `rpn_to_bytes`
+
+    Raises a ValueError if the data is not a serialized RPN, or is truncated.
+    """
+    if data[: len(RPN_MAGIC)] != RPN_MAGIC:
+        raise ValueError("Not a serialized RPN")
+    if len(data) <= len(RPN_MAGIC):
+        raise ValueError("Truncated RPN")
+    if data[len(RPN_MAGIC)] != RPN_VERSION:
+        raise ValueError(f"Unsupported serialized RPN version {data[len(RPN_MAGIC)]}")
+
+    rpn: deque[Token] = deque()
+    pos = len(RPN_MAGIC) + 1
+
+    while pos < len(data):
+        tag = data[pos]
+        pos += 1
+        if (operator := _TAG_OPERATORS.get(tag)) is not None:
+            rpn.append(operator)
+        elif tag == Tag.DURATION:
+            minutes, pos = decode_varint(data, pos)
+            rpn.append(Duration.from_milliseconds(minutes * MILLISECONDS_PER_MINUTE))
+        elif tag == Tag.DURATION_MS:
+            milliseconds, pos = decode_varint(data, pos)
+            rpn.append(Duration.from_milliseconds(milliseconds))
+        elif tag == Tag.INT:
+            value, pos = decode_varint(data, pos)
+            rpn.append(value)
+        elif tag == Tag.FLOAT:
+            if pos + _FLOAT64.size > len(data):
+                raise ValueError("Truncated RPN")
+            (number,) = _FLOAT64.unpack_from(data, pos)
+            rpn.append(number)
+            pos += _FLOAT64.size
+        else:
+            raise ValueError(f"Unknown tag {tag} at byte offset {pos - 1}")
+
+    return rpn
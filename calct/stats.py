@@ -0,0 +1,327 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from __future__ import annotations
+
+import math
+import mmap
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Iterable, Iterator, NamedTuple, Optional, TextIO, Union
+
+from calct._common import non_blank_lines
+from calct.aggregate import Group, evaluate_duration
+from calct.bulk import RANGES_PER_JOB, iter_line_spans, split_line_ranges
+from calct.bytes_parser import Buffer, compute_bytes
+from calct.duration import Duration, Settings, get_settings, use_settings
+
+DEFAULT_MAX_BINS = 10_080  # One bin per minute of a week
+
+DEFAULT_COMPRESSION = 200
+
+Centroid = tuple[float, int]
+
+
+class SketchState(NamedTuple):
+    """State of a sketch needed to merge it into another one, see `DurationSketch.merge_state`"""
+
+    group: Group
+    m2: float
+    histogram: Optional[Counter[int]]
+    centroids: list[Centroid]
+
+
+class DurationSketch:
+    """Streaming summary of durations, kept as integer minutes, answering quantiles in bounded memory
+
+    Up to `max_bins` distinct minutes, the sketch is an exact histogram, so quantiles are exact. Past that, the
+    histogram is compressed to a t-digest: weighted centroids, small near the extremes and larger around the median,
+    whose number is bounded by the `compression`. The count, minimum, maximum, mean and variance are always exact, the
+    variance being kept with Welford's algorithm. Sketches are picklable and can be merged, so they can be built by
+    several processes over parts of an input.
+    """
+
+    __slots__ = ("max_bins", "compression", "_group", "_m2", "_histogram", "_centroids")
+
+    def __init__(
+        self,
+        durations: Iterable[Duration] = (),
+        max_bins: int = DEFAULT_MAX_BINS,
+        compression: int = DEFAULT_COMPRESSION,
+    ) -> None:
+        self.max_bins = max_bins
+        self.compression = compression
+        self._group = Group()
+        self._m2 = 0.0
+        self._histogram: Optional[Counter[int]] = Counter()
+        self._centroids: list[Centroid] = []
+        self.update(durations)
+
+    @property
+    def count(self) -> int:
+        """Number of durations added"""
+        return self._group.count
+
+    @property
+    def minimum(self) -> int:
+        """Shortest duration added, in minutes"""
+        return self._group.minimum
+
+    @property
+    def maximum(self) -> int:
+        """Longest duration added, in minutes"""
+        return self._group.maximum
+
+    @property
+    def is_exact(self) -> bool:
+        """Whether the quantiles are exact, that is, the sketch is still a histogram"""
+        return self._histogram is not None
+
+    def _mean_minutes(self) -> float:
+        return self._group.total / self._group.count if self._group.count > 0 else 0.0
+
+    def add_minutes(self, minutes: int, weight: int = 1) -> None:
+        """Adds `weight` durations of `minutes` minutes"""
+        mean_before = self._mean_minutes()
+        self._group.add(minutes, weight)
+        self._m2 += (minutes - mean_before) * (minutes - self._mean_minutes()) * weight
+
+        if self._histogram is not None:
+            self._histogram[minutes] += weight
+            if len(self._histogram) > self.max_bins:
+                self._compress()
+        else:
+            self._centroids.append((minutes, weight))
+            if len(self._centroids) > 4 * self.compression:
+                self._compress()
+
+    def add(self, duration: Duration) -> None:
+        """Adds a duration, truncated to minutes"""
+        self.add_minutes(duration.total_minutes)
+
+    def update(self, durations: Iterable[Duration]) -> None:
+        """Adds many durations"""
+        for duration in durations:
+            self.add_minutes(duration.total_minutes)
+
+    def merge_state(self) -> SketchState:
+        """Returns the state that `merge` combines into another sketch"""
+        return SketchState(self._group, self._m2, self._histogram, self._centroids)
+
+    def merge(self, other: DurationSketch) -> None:
+        """Adds all the durations of another sketch to this one"""
+        state = other.merge_state()
+        if state.group.count == 0:
+            return
+        # Chan et al. combination of the two Welford states
+        count = self.count + state.group.count
+        delta = state.group.total / state.group.count - self._mean_minutes()
+        self._m2 += state.m2 + delta * delta * self.count * state.group.count / count
+        self._group.merge(state.group)
+
+        if self._histogram is not None and state.histogram is not None:
+            self._histogram.update(state.histogram)
+            if len(self._histogram) > self.max_bins:
+                self._compress()
+            return
+        if self._histogram is not None:
+            self._compress()
+        self._centroids.extend(_points(state.histogram, state.centroids))
+        self._compress()
+
+    def _compress(self) -> None:
+        """Merges the points of the sketch into centroids, turning the histogram into a t-digest if needed"""
+        points = sorted(_points(self._histogram, self._centroids))
+        self._histogram = None
+        self._centroids = []
+        if len(points) == 0:
+            return
+
+        total = self.count
+        scale = self.compression / (2 * math.pi)
+
+        def weight_limit(weight_before: float) -> float:
+            # Cumulative weight reachable by a centroid starting at `weight_before`, with the k1 scale function
+            k = scale * math.asin(2 * weight_before / total - 1) + 1
+            if k >= scale * math.pi / 2:
+                return total
+            return total * (math.sin(k / scale) + 1) / 2
+
+        centroids = self._centroids
+        mean, weight = points[0]
+        weight_before = 0
+        limit = weight_limit(weight_before)
+        for point_mean, point_weight in points[1:]:
+            if weight_before + weight + point_weight <= limit:
+                weight += point_weight
+                mean += (point_mean - mean) * point_weight / weight
+            else:
+                centroids.append((mean, weight))
+                weight_before += weight
+                limit = weight_limit(weight_before)
+                mean, weight = point_mean, point_weight
+        centroids.append((mean, weight))
+
+    def _quantile_minutes(self, fraction: float) -> float:
+        if self._histogram is not None:
+            # Nearest rank, like `DurationIndex.percentile`
+            rank = max(math.ceil(fraction * self.count), 1)
+            seen = 0
+            for minutes in sorted(self._histogram):
+                seen += self._histogram[minutes]
+                if seen >= rank:
+                    return minutes
+            return self.maximum
+
+        if len(self._centroids) > 4 * self.compression or not _is_sorted(self._centroids):
+            self._compress()
+        # Interpolate between the centers of the centroids, pinning the extremes to the minimum and maximum
+        target = fraction * self.count
+        previous_center, previous_mean = 0.0, float(self.minimum)
+        seen = 0
+        for mean, weight in self._centroids:
+            center = seen + weight / 2
+            if target < center:
+                if center == previous_center:
+                    return mean
+                return previous_mean + (mean - previous_mean) * (target - previous_center) / (center - previous_center)
+            previous_center, previous_mean = center, mean
+            seen += weight
+        if seen == previous_center:
+            return previous_mean
+        return previous_mean + (self.maximum - previous_mean) * (target - previous_center) / (seen - previous_center)
+
+    def quantile(self, fraction: float) -> Duration:
+        """Returns the duration at the given quantile, from 0 to 1, rounded to the minute"""
+        if self.count == 0:
+            raise ValueError("The sketch is empty")
+        if not 0 <= fraction <= 1:
+            raise ValueError(f"The quantile must be between 0 and 1, not {fraction}")
+        minutes = self._quantile_minutes(fraction)
+        return Duration(minutes=min(max(round(minutes), self.minimum), self.maximum))
+
+    def percentile(self, percent: float) -> Duration:
+        """Returns the duration at the given percentile, from 0 to 100, rounded to the minute"""
+        if not 0 <= percent <= 100:
+            raise ValueError(f"The percentile must be between 0 and 100, not {percent}")
+        return self.quantile(percent / 100)
+
+    def mean(self) -> Duration:
+        """Returns the mean duration, rounded to the minute"""
+        return Duration(minutes=round(self._mean_minutes()))
+
+    def variance(self) -> float:
+        """Returns the population variance, in squared minutes"""
+        return self._m2 / self.count if self.count > 0 else 0.0
+
+    def stdev(self) -> Duration:
+        """Returns the population standard deviation, rounded to the minute"""
+        return Duration(minutes=round(math.sqrt(self.variance())))
+
+    def bins(self) -> Iterator[tuple[Duration, int]]:
+        """Iterate over the histogram bins, or the t-digest centroids, as durations with their counts, shortest first"""
+        if self._histogram is None:
+            self._compress()
+        for minutes, weight in sorted(_points(self._histogram, self._centroids)):
+            yield Duration(minutes=round(minutes)), weight
+
+    def __repr__(self) -> str:
+        kind = "exact" if self.is_exact else "t-digest"
+        return f"DurationSketch(count={self.count}, {kind}, minimum={self.minimum}, maximum={self.maximum})"
+
+
+def _points(histogram: Optional[Counter[int]], centroids: list[Centroid]) -> list[Centroid]:
+    if histogram is not None:
+        return [(float(minutes), weight) for minutes, weight in histogram.items()]
+    return list(centroids)
+
+
+def _is_sorted(centroids: list[Centroid]) -> bool:
+    return all(first[0] <= second[0] for first, second in zip(centroids, centroids[1:]))
+
+
+def sketch_lines(
+    data: Buffer, start: int = 0, end: Optional[int] = None, sketch: Optional[DurationSketch] = None
+) -> DurationSketch:
+    """Adds the durations computed from each non-blank line of a buffer to a sketch, a new one by default"""
+    sketch = DurationSketch() if sketch is None else sketch
+    for line_start, line_end in iter_line_spans(data, start, end):
+        try:
+            value = compute_bytes(data, line_start, line_end)
+        except (ValueError, TypeError) as ex:
+            raise type(ex)(f"Invalid expression on the line at byte offset {line_start}: {ex}") from ex
+        if not isinstance(value, Duration):
+            raise ValueError(f"The expression on the line at byte offset {line_start} is not a duration")
+        sketch.add_minutes(value.total_minutes)
+    return sketch
+
+
+def sketch_stream(stream: TextIO, sketch: Optional[DurationSketch] = None) -> DurationSketch:
+    """Adds the durations computed from each non-blank line of a text stream to a sketch, a new one by default"""
+    sketch = DurationSketch() if sketch is None else sketch
+    for line_number, line in non_blank_lines(stream):
+        try:
+            sketch.add_minutes(evaluate_duration(line.strip()).total_minutes)
+        except (ValueError, TypeError) as ex:
+            raise type(ex)(f"Invalid duration on line {line_number}: {ex}") from ex
+    return sketch
+
+
+def _sketch_mapped_range(settings: Settings, path: str, start: int, end: int, sketch: DurationSketch) -> DurationSketch:
+    with use_settings(settings), open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return sketch_lines(data, start, end, sketch)
+
+
+def sketch_file(
+    path: Union[str, os.PathLike[str]],
+    jobs: Optional[int] = None,
+    max_bins: int = DEFAULT_MAX_BINS,
+    compression: int = DEFAULT_COMPRESSION,
+) -> DurationSketch:
+    """Builds a sketch of the durations computed from each non-blank line of a file
+
+    The file is memory-mapped and, with more than one job, split into line-aligned byte ranges sketched by worker
+    processes, so only the sketches go through pipes before being merged.
+    """
+    path = os.fspath(path)
+    jobs = (os.cpu_count() or 1) if jobs is None else jobs
+    sketch = DurationSketch(max_bins=max_bins, compression=compression)
+
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return sketch
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if jobs <= 1:
+                return sketch_lines(data, sketch=sketch)
+            ranges = split_line_ranges(data, jobs * RANGES_PER_JOB)
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        starts, ends = zip(*ranges)
+        parts = executor.map(
+            _sketch_mapped_range,
+            repeat(get_settings()),
+            repeat(path),
+            starts,
+            ends,
+            repeat(DurationSketch(max_bins=max_bins, compression=compression)),
+        )
+        for part in parts:
+            sketch.merge(part)
+    return sketch
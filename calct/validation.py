@@ -0,0 +1,273 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from enum import Enum
+from functools import lru_cache
+from typing import Collection, Iterable, Optional, Union
+
+from calct._common import (
+    FLOAT_EXPONENT_STR,
+    NUMBER_START_STR,
+    OPS_PAREN_STR,
+    REFERENCE_CHARS_STR,
+    SIGN_STR,
+    CharClass,
+    char_classes,
+)
+from calct.duration import Duration, get_settings
+from calct.inference import Kind, result_kind
+from calct.parser import Associativity, Operation
+
+_NUMBER = re.compile(r"(?:\d*\.\d+|\d+\.?)(?:[eE][+-]?\d+)?")
+_ZERO = re.compile(r"[0.]*(?:[eE][+-]?\d+)?")
+
+OPERAND_CACHE_SIZE = 64 * 1024
+
+_OPERATORS = {
+    operation.value: (operation.precedence, operation.associativity is Associativity.RIGHT) for operation in Operation
+}
+
+
+class ErrorCode(Enum):
+    """Enum for the errors found by `validate`"""
+
+    EMPTY = "empty"
+    INVALID_CHARACTER = "invalid-character"
+    INVALID_EXPONENT = "invalid-exponent"
+    INVALID_TOKEN = "invalid-token"
+    UNKNOWN_NAME = "unknown-name"
+    MISSING_OPERAND = "missing-operand"
+    MISSING_OPERATOR = "missing-operator"
+    UNMATCHED_OPENING = "unmatched-opening-parenthesis"
+    UNMATCHED_CLOSING = "unmatched-closing-parenthesis"
+    TYPE_MISMATCH = "type-mismatch"
+    DIVISION_BY_ZERO = "division-by-zero"
+
+
+@dataclass(frozen=True)
+class Diagnostic:
+    """Error found in an expression: its code, the offset of the character where it starts, and its text"""
+
+    code: ErrorCode
+    offset: int
+    text: str = ""
+
+    def __str__(self) -> str:
+        return f"{self.code.value} at offset {self.offset}" + (f": `{self.text}`" if self.text != "" else "")
+
+
+_NOT_WORD = (CharClass.WHITESPACE, CharClass.OPERATOR)
+
+Operand = tuple[Kind, bool]
+
+
+@lru_cache(maxsize=None)
+def _tokenizer(hour_sep: str) -> re.Pattern[str]:
+    """Matches the operators and words that `iter_lex` splits an expression into, after whitespace, for a separator"""
+    classes = char_classes(hour_sep)
+    spaces = re.escape("".join(char for char, cls in classes.items() if cls is CharClass.WHITESPACE))
+    word = re.escape("".join(char for char, cls in classes.items() if cls not in _NOT_WORD))
+    number_start, signs = re.escape(NUMBER_START_STR), re.escape(SIGN_STR)
+    # In a word starting like a number, a sign right after an exponent is part of the word, as in `1e-3`
+    number = rf"[{number_start}][{word}]*(?:(?<=[{FLOAT_EXPONENT_STR}])[{signs}][{word}]*)*"
+    operators = re.escape(OPS_PAREN_STR)
+    return re.compile(rf"[{spaces}]*(?:(?P<operator>[{operators}])|(?P<word>{number}|[{word}]+))")
+
+
+def _operand(text: str, names: Collection[str]) -> Union[Operand, ErrorCode]:
+    """The kind of a word and whether it is a literal zero, like `evaluate_token` would evaluate it, or an error"""
+    if text in names:
+        return Kind.ANY, False
+    if not Duration.get_hour_and_minute_seps().isdisjoint(text):
+        if Duration.is_valid(text):
+            return Kind.DURATION, False
+        if not text.isidentifier():
+            return ErrorCode.INVALID_TOKEN
+    if text[0] in REFERENCE_CHARS_STR or text.isidentifier():
+        return ErrorCode.UNKNOWN_NAME
+    return _number(text)
+
+
+def _number(text: str) -> Union[Operand, ErrorCode]:
+    """The kind of a word that is neither a name nor a duration and whether it is a literal zero, or an error"""
+    if _NUMBER.fullmatch(text) is not None:
+        return Kind.NUMBER, _ZERO.fullmatch(text) is not None
+    try:
+        # Rare spellings that `int` accepts, such as `1_000`
+        return Kind.NUMBER, int(text) == 0
+    except ValueError:
+        return ErrorCode.INVALID_TOKEN
+
+
+def _combine(operator: str, left: Operand, right: Operand) -> Union[Kind, ErrorCode]:
+    """The kind of the result of an operation, or an error"""
+    if operator == "/" and right[1]:
+        return ErrorCode.DIVISION_BY_ZERO
+    kind = result_kind(operator, left[0], right[0])
+    return ErrorCode.TYPE_MISMATCH if kind is None else kind
+
+
+class _Validation:
+    """Shunting-yard state of `_validate` for an expression, which takes its operators and words one at a time
+
+    Only the kinds of the operands are kept, along with the pending operators and opening parentheses and their offsets.
+    """
+
+    __slots__ = ("expr", "names", "operand_cache", "operands", "operators", "expect_operand")
+
+    def __init__(self, expr: str, names: Collection[str], operand_cache: dict[str, Union[Operand, ErrorCode]]) -> None:
+        self.expr = expr
+        self.names = names
+        self.operand_cache = operand_cache
+        self.operands: list[Operand] = []
+        self.operators: list[tuple[str, int]] = []
+        self.expect_operand = True
+
+    def word(self, text: str, start: int, end: int) -> Optional[Diagnostic]:
+        """Pushes the kind of the word from `start` to `end`, or returns its error"""
+        if not self.expect_operand:
+            return Diagnostic(ErrorCode.MISSING_OPERATOR, start, text)
+        expr = self.expr
+        if (
+            text[-1] in FLOAT_EXPONENT_STR
+            and text[0] in NUMBER_START_STR
+            and end < len(expr)
+            and expr[end] in OPS_PAREN_STR
+        ):
+            return Diagnostic(ErrorCode.INVALID_EXPONENT, end, expr[end])
+        if (operand := self.operand_cache.get(text)) is None:
+            operand = self.operand_cache[text] = _operand(text, self.names)
+        if isinstance(operand, ErrorCode):
+            return Diagnostic(operand, start, text)
+        self.operands.append(operand)
+        self.expect_operand = False
+        return None
+
+    def operator(self, text: str, start: int) -> Optional[Diagnostic]:
+        """Pushes an operator or a parenthesis, reducing the operators it closes, or returns the first error"""
+        if text == "(":
+            if not self.expect_operand:
+                return Diagnostic(ErrorCode.MISSING_OPERATOR, start, text)
+            self.operators.append((text, start))
+            return None
+        if self.expect_operand:
+            return Diagnostic(ErrorCode.MISSING_OPERAND, start, text)
+        if text == ")":
+            return self._close(start)
+        error = self._reduce_above(*_OPERATORS[text])
+        if error is None:
+            self.operators.append((text, start))
+            self.expect_operand = True
+        return error
+
+    def finish(self) -> Optional[Diagnostic]:
+        """Reduces the pending operators at the end of the expression, returning the first error"""
+        end = len(self.expr)
+        if self.expect_operand:
+            if len(self.operands) == 0 and len(self.operators) == 0:
+                return Diagnostic(ErrorCode.EMPTY, end)
+            return Diagnostic(ErrorCode.MISSING_OPERAND, end)
+        while len(self.operators) > 0:
+            if self.operators[-1][0] == "(":
+                return Diagnostic(ErrorCode.UNMATCHED_OPENING, self.operators[-1][1], "(")
+            if (error := self._reduce()) is not None:
+                return error
+        return None
+
+    def _close(self, start: int) -> Optional[Diagnostic]:
+        """Reduces the operators up to the matching opening parenthesis, which is dropped"""
+        while len(self.operators) > 0 and self.operators[-1][0] != "(":
+            if (error := self._reduce()) is not None:
+                return error
+        if len(self.operators) == 0:
+            return Diagnostic(ErrorCode.UNMATCHED_CLOSING, start, ")")
+        self.operators.pop()
+        return None
+
+    def _reduce_above(self, precedence: int, right_associative: bool) -> Optional[Diagnostic]:
+        """Reduces the pending operators that bind tighter than an operator about to be pushed"""
+        while len(self.operators) > 0 and self.operators[-1][0] != "(":
+            top_precedence = _OPERATORS[self.operators[-1][0]][0]
+            if top_precedence < precedence or (top_precedence == precedence and right_associative):
+                break
+            if (error := self._reduce()) is not None:
+                return error
+        return None
+
+    def _reduce(self) -> Optional[Diagnostic]:
+        """Replaces the top operator and its two operands by the kind of its result"""
+        operator, offset = self.operators.pop()
+        right = self.operands.pop()
+        kind = _combine(operator, self.operands.pop(), right)
+        if isinstance(kind, ErrorCode):
+            return Diagnostic(kind, offset, operator)
+        self.operands.append((kind, False))
+        return None
+
+
+def _validate(
+    expr: str, names: Collection[str], operand_cache: dict[str, Union[Operand, ErrorCode]]
+) -> Optional[Diagnostic]:
+    match = _tokenizer(get_settings().hour_sep).match
+    state = _Validation(expr, names, operand_cache)
+    position, end = 0, len(expr)
+    while position < end:
+        found = match(expr, position)
+        if found is None:
+            rest = expr[position:]
+            if rest.isspace():
+                break
+            position += len(rest) - len(rest.lstrip())
+            return Diagnostic(ErrorCode.INVALID_CHARACTER, position, expr[position])
+        position = found.end()
+        if (operator := found["operator"]) is not None:
+            error = state.operator(operator, found.start("operator"))
+        else:
+            error = state.word(found["word"], found.start("word"), position)
+        if error is not None:
+            return error
+    return state.finish()
+
+
+def validate(expr: str, names: Collection[str] = frozenset()) -> Optional[Diagnostic]:
+    """Checks an expression without evaluating it, returning its first error, or None if it is valid
+
+    The expression is lexed, parsed and its operands typed as durations or numbers in a single pass, so no value is
+    computed and no exception is raised. Words in `names`, such as bound variables, can be of any type. Operands that
+    follow each other without an operator, which `compute` silently ignores, are reported as errors. Errors that
+    depend on values, such as a division by a computed zero, are only found by evaluating the expression.
+    """
+    return _validate(expr, names, {})
+
+
+def validate_many(exprs: Iterable[str], names: Collection[str] = frozenset()) -> list[Optional[Diagnostic]]:
+    """Checks each expression with `validate`, returning its first error, or None if it is valid, in input order
+
+    The kinds of the words are cached across expressions, as the same durations and numbers tend to come back.
+    """
+    names = frozenset(names)
+    operand_cache: dict[str, Union[Operand, ErrorCode]] = {}
+    diagnostics: list[Optional[Diagnostic]] = []
+    for expr in exprs:
+        if len(operand_cache) > OPERAND_CACHE_SIZE:
+            operand_cache.clear()
+        diagnostics.append(_validate(expr, names, operand_cache))
+    return diagnostics
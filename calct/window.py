@@ -0,0 +1,239 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from __future__ import annotations
+
+import csv
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Iterator, Optional, Sequence, TextIO
+
+from calct.aggregate import Column, GroupKey, column_index, evaluate_duration
+from calct.duration import Duration
+
+_EPOCH = datetime(1970, 1, 1)
+_MINUTE = timedelta(minutes=1)
+
+
+class Window(Enum):
+    """Enum for the aggregations computed over a rolling window"""
+
+    SUM = "sum"
+    MAX = "max"
+    MIN = "min"
+
+
+class RollingWindow:
+    """Trailing window over timestamped integer minutes, updated in amortized O(1) per row
+
+    A row pushed at time `t` stays in the window until a row at time `t + width` or later is pushed, so the window
+    holds the rows of the last `width` minutes, current row included. The minimum and maximum are kept at the front
+    of monotonic deques, so each row is added and removed at most once from each of them.
+    """
+
+    __slots__ = ("width", "total", "_rows", "_maxima", "_minima")
+
+    def __init__(self, width: int) -> None:
+        if width <= 0:
+            raise ValueError(f"The window width must be positive, not {width}")
+        self.width = width
+        self.total = 0
+        self._rows: deque[tuple[int, int]] = deque()
+        self._maxima: deque[tuple[int, int]] = deque()
+        self._minima: deque[tuple[int, int]] = deque()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def push(self, time: int, minutes: int) -> None:
+        """Adds a row at `time`, which must not be before the previous one, and drops the rows now out of the window"""
+        rows = self._rows
+        if len(rows) > 0 and time < rows[-1][0]:
+            raise ValueError(f"The rows must be sorted by time, got {time} after {rows[-1][0]}")
+        rows.append((time, minutes))
+        self.total += minutes
+        maxima, minima = self._maxima, self._minima
+        while len(maxima) > 0 and maxima[-1][1] <= minutes:
+            maxima.pop()
+        maxima.append((time, minutes))
+        while len(minima) > 0 and minima[-1][1] >= minutes:
+            minima.pop()
+        minima.append((time, minutes))
+
+        oldest = time - self.width
+        while rows[0][0] <= oldest:
+            self.total -= rows.popleft()[1]
+        while maxima[0][0] <= oldest:
+            maxima.popleft()
+        while minima[0][0] <= oldest:
+            minima.popleft()
+
+    @property
+    def maximum(self) -> int:
+        """The largest value in the window"""
+        return self._maxima[0][1]
+
+    @property
+    def minimum(self) -> int:
+        """The smallest value in the window"""
+        return self._minima[0][1]
+
+    def value(self, window: Window) -> int:
+        """Returns an aggregate of the rows in the window, in minutes"""
+        if window is Window.SUM:
+            return self.total
+        if window is Window.MAX:
+            return self.maximum
+        if window is Window.MIN:
+            return self.minimum
+        return NotImplemented
+
+
+def _check_sorted(times: Sequence[int]) -> None:
+    for position in range(1, len(times)):
+        if times[position] < times[position - 1]:
+            raise ValueError(f"The rows must be sorted by time, row {position} is before row {position - 1}")
+
+
+def rolling_sum_minutes(times: Sequence[int], values: Sequence[int], width: int) -> list[int]:
+    """Returns, for each row, the sum of the values of the rows of the last `width` minutes, in O(n)
+
+    `times` and `values` are integer minutes, such as lists or `array("q")`, with `times` sorted.
+    """
+    if width <= 0:
+        raise ValueError(f"The window width must be positive, not {width}")
+    _check_sorted(times)
+    sums: list[int] = []
+    total = 0
+    first = 0
+    for time, value in zip(times, values):
+        total += value
+        oldest = time - width
+        while times[first] <= oldest:
+            total -= values[first]
+            first += 1
+        sums.append(total)
+    return sums
+
+
+def _rolling_extreme_minutes(times: Sequence[int], values: Sequence[int], width: int, maximum: bool) -> list[int]:
+    if width <= 0:
+        raise ValueError(f"The window width must be positive, not {width}")
+    _check_sorted(times)
+    extremes: list[int] = []
+    # Positions of the rows that can still become the extreme, their values being monotonic from the front
+    candidates: deque[int] = deque()
+    for position, (time, value) in enumerate(zip(times, values)):
+        if maximum:
+            while len(candidates) > 0 and values[candidates[-1]] <= value:
+                candidates.pop()
+        else:
+            while len(candidates) > 0 and values[candidates[-1]] >= value:
+                candidates.pop()
+        candidates.append(position)
+        oldest = time - width
+        while times[candidates[0]] <= oldest:
+            candidates.popleft()
+        extremes.append(values[candidates[0]])
+    return extremes
+
+
+def rolling_max_minutes(times: Sequence[int], values: Sequence[int], width: int) -> list[int]:
+    """Returns, for each row, the largest value of the rows of the last `width` minutes, in O(n)"""
+    return _rolling_extreme_minutes(times, values, width, True)
+
+
+def rolling_min_minutes(times: Sequence[int], values: Sequence[int], width: int) -> list[int]:
+    """Returns, for each row, the smallest value of the rows of the last `width` minutes, in O(n)"""
+    return _rolling_extreme_minutes(times, values, width, False)
+
+
+def rolling(
+    times: Sequence[Duration], durations: Sequence[Duration], width: Duration, window: Window = Window.SUM
+) -> list[Duration]:
+    """Returns, for each row, an aggregate of the durations of the rows of the last `width`, truncated to minutes
+
+    `times` are the offsets of the rows, such as `Duration(24 * day + hour)`, sorted.
+    """
+    if len(times) != len(durations):
+        raise ValueError(f"Got {len(times)} times for {len(durations)} durations")
+    time_minutes = [time.total_minutes for time in times]
+    value_minutes = [duration.total_minutes for duration in durations]
+    if window is Window.SUM:
+        result = rolling_sum_minutes(time_minutes, value_minutes, width.total_minutes)
+    else:
+        result = _rolling_extreme_minutes(time_minutes, value_minutes, width.total_minutes, window is Window.MAX)
+    return [Duration(minutes=minutes) for minutes in result]
+
+
+def parse_timestamp(text: str) -> int:
+    """Parses an ISO 8601 date or date and time, as minutes since the epoch, or a duration expression, as minutes"""
+    try:
+        moment = datetime.fromisoformat(text.strip())
+    except ValueError:
+        return evaluate_duration(text).total_minutes
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return (moment - _EPOCH) // _MINUTE
+
+
+@dataclass(frozen=True)
+class CsvLayout:
+    """Where the timestamps, values and keys are in a CSV or TSV stream, with columns given by index or header name"""
+
+    time_column: Column
+    value_column: Column
+    key_columns: Sequence[Column] = ()
+    delimiter: str = ","
+    has_header: bool = True
+
+
+def window_csv(
+    stream: TextIO, layout: CsvLayout, width: int, windows: Sequence[Window]
+) -> tuple[Optional[list[str]], Iterator[tuple[list[str], list[int]]]]:
+    """Computes rolling aggregates of the duration expressions of a CSV or TSV stream, row by row
+
+    Each group of rows with the same key columns has its own window, the rows of a group being sorted by time.
+    Returns the header, if any, and an iterator over the rows with their aggregates, in minutes, in input order.
+    """
+    reader = csv.reader(stream, delimiter=layout.delimiter)
+    header = next(reader, None) if layout.has_header else None
+
+    time_index = column_index(layout.time_column, header)
+    value_index = column_index(layout.value_column, header)
+    key_indices = [column_index(column, header) for column in layout.key_columns]
+    row_width = max([time_index, value_index, *key_indices]) + 1
+
+    def rows() -> Iterator[tuple[list[str], list[int]]]:
+        groups: dict[GroupKey, RollingWindow] = {}
+        for row_number, row in enumerate(reader, start=1):
+            if len(row) == 0:
+                continue
+            if len(row) < row_width:
+                raise ValueError(f"Invalid row {row_number}: expected at least {row_width} columns, got {len(row)}")
+            key = tuple(row[index] for index in key_indices)
+            if (group := groups.get(key)) is None:
+                group = groups[key] = RollingWindow(width)
+            try:
+                group.push(parse_timestamp(row[time_index]), evaluate_duration(row[value_index]).total_minutes)
+            except (ValueError, TypeError) as ex:
+                raise type(ex)(f"Invalid row {row_number}: {ex}") from ex
+            yield row, [group.value(window) for window in windows]
+
+    return header, rows()
@@ -0,0 +1,104 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import io
+
+import pytest
+
+from calct.aggregate import Aggregation, Group, aggregate, aggregate_csv
+from calct.duration import Duration
+
+CSV = """employee,week,hours
+ann,1,8h
+bob,1,9h @ 17h30 - 30m
+ann,1,7h30
+
+ann,2,1h + 2h
+"""
+
+
+def test_group_aggregations():
+    group = Group()
+    for minutes in [480, 450, 500]:
+        group.add(minutes)
+    assert group.value(Aggregation.COUNT) == 3
+    assert group.value(Aggregation.SUM) == Duration(minutes=1430)
+    assert group.value(Aggregation.MIN) == Duration(minutes=450)
+    assert group.value(Aggregation.MAX) == Duration(minutes=500)
+    assert group.value(Aggregation.MEAN) == Duration(minutes=476)
+
+
+def test_group_merge():
+    first, second, both = Group(), Group(), Group()
+    for minutes in [10, -5]:
+        first.add(minutes)
+        both.add(minutes)
+    for minutes in [30, 2]:
+        second.add(minutes)
+        both.add(minutes)
+    first.merge(second)
+    first.merge(Group())
+    assert repr(first) == repr(both)
+
+
+def test_group_weights():
+    weighted, repeated = Group(), Group()
+    weighted.add(20, 3)
+    weighted.add(-4, 2)
+    for minutes in [20, 20, 20, -4, -4]:
+        repeated.add(minutes)
+    assert repr(weighted) == repr(repeated)
+
+
+def test_empty_group_mean():
+    assert Group().value(Aggregation.MEAN) == Duration()
+
+
+def test_aggregate_rows():
+    groups = aggregate([["a", "1h"], ["b", "2h"], ["a", "30m * 2"]], [0], 1)
+    assert groups[("a",)].value(Aggregation.SUM) == Duration(hours=2)
+    assert groups[("b",)].count == 1
+
+
+def test_aggregate_csv_by_name():
+    key_names, groups = aggregate_csv(io.StringIO(CSV), ["employee", "week"], "hours")
+    assert key_names == ["employee", "week"]
+    assert list(groups) == [("ann", "1"), ("bob", "1"), ("ann", "2")]
+    assert groups[("ann", "1")].value(Aggregation.SUM) == Duration(hours=15, minutes=30)
+    assert groups[("bob", "1")].value(Aggregation.SUM) == Duration(hours=8)
+
+
+def test_aggregate_tsv_by_index():
+    _, groups = aggregate_csv(io.StringIO("ann\t1h\nann\t2h\n"), [0], 1, delimiter="\t", has_header=False)
+    assert groups[("ann",)].value(Aggregation.SUM) == Duration(hours=3)
+
+
+def test_unknown_column():
+    with pytest.raises(ValueError):
+        aggregate_csv(io.StringIO(CSV), ["name"], "hours")
+
+
+def test_number_is_not_a_duration():
+    with pytest.raises(ValueError, match="row 1"):
+        aggregate([["a", "2 * 3"]], [0], 1)
+
+
+def test_short_row():
+    with pytest.raises(ValueError, match="Invalid row 2: expected at least 2 columns, got 1"):
+        aggregate([["a", "1h"], ["b"]], [0], 1)
+    assert aggregate([["1h"]], [], 0)[()].count == 1
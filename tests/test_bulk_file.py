@@ -0,0 +1,155 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import io
+import sys
+
+import pytest
+
+from calct.bulk import (
+    compute_file,
+    compute_lines,
+    compute_parallel,
+    evaluate_file,
+    iter_line_ranges,
+    iter_line_spans,
+    render_lines,
+    split_line_ranges,
+)
+from calct.duration import Duration, Resolution, Settings, use_settings
+from calct.main import main, run_file
+from calct.parser import compute
+
+
+def test_iter_line_spans_skips_blank_lines():
+    data = b"1h\n\n  \n2h + 1h\r\n"
+    assert [data[start:end] for start, end in iter_line_spans(data)] == [b"1h", b"2h + 1h\r"]
+
+
+def test_compute_lines():
+    assert list(compute_lines(b"1h + 30m\n2 * 3h\n")) == [Duration(minutes=90), Duration(hours=6)]
+
+
+def test_compute_file(tmp_path):
+    path = tmp_path / "exprs.txt"
+    path.write_text("1h + 30m\n\n2 * 3h\n3 * 2\n")
+    assert list(compute_file(path)) == [Duration(minutes=90), Duration(hours=6), 6]
+
+
+def test_compute_empty_file(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    assert not list(compute_file(path))
+
+
+def test_compute_file_reports_offset(tmp_path):
+    path = tmp_path / "exprs.txt"
+    path.write_text("1h\n1h + x\n")
+    with pytest.raises(ValueError, match="byte offset 3"):
+        list(compute_file(path))
+
+
+def test_split_line_ranges():
+    data = b"1h\n2h\n3h\n4h\n5h"
+    for parts in range(1, 8):
+        ranges = split_line_ranges(data, parts)
+        assert ranges[0][0] == 0
+        assert ranges[-1][1] == len(data)
+        assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+        assert all(data[end - 1] == ord("\n") for _, end in ranges[:-1])
+
+
+def test_iter_line_ranges():
+    data = b"1h\n22h\n333h\n4h\n5h"
+    for range_size in range(1, 20):
+        ranges = list(iter_line_ranges(data, range_size))
+        assert ranges[0][0] == 0
+        assert ranges[-1][1] == len(data)
+        assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+        assert all(data[end - 1] == ord("\n") and end - start > range_size for start, end in ranges[:-1])
+
+
+def test_render_lines_keeps_invalid_lines_in_place():
+    lines, errors = render_lines(b"1h + 30m\n1h + x\n3 * 2\n")
+    assert lines == ["1h30", "", "6"]
+    assert len(errors) == 1
+
+
+@pytest.mark.parametrize("jobs", [1, 3])
+def test_evaluate_file_in_order(tmp_path, jobs):
+    path = tmp_path / "exprs.txt"
+    path.write_text("".join(f"{i}h + {i % 60}m\n" for i in range(200)))
+    output = io.StringIO()
+    assert not evaluate_file(path, output, jobs=jobs)
+    assert output.getvalue().splitlines() == [f"{i}h{i % 60:02}" for i in range(200)]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_evaluate_file_in_small_ranges(tmp_path, jobs):
+    path = tmp_path / "exprs.txt"
+    path.write_text("".join(f"{i}h + {i % 60}m\n" if i % 7 else "1h +\n" for i in range(300)))
+    output = io.StringIO()
+    errors = evaluate_file(path, output, jobs=jobs, range_size=64)
+    assert len(errors) == 43
+    assert output.getvalue().splitlines() == [f"{i}h{i % 60:02}" if i % 7 else "" for i in range(300)]
+
+
+def test_run_file_reports_unwritable_output(tmp_path, caplog):
+    path = tmp_path / "exprs.txt"
+    path.write_text("1h + 2h\n")
+    with pytest.raises(SystemExit) as exit_info:
+        run_file(str(path), str(tmp_path / "missing" / "out.txt"))
+    assert exit_info.value.code != 0
+    assert "No such file or directory" in caplog.text
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_run_file_exits_with_1_on_invalid_lines(tmp_path, capsys, use_mmap):
+    path = tmp_path / "exprs.txt"
+    path.write_text("1h + 2h\n1h +\n")
+    with pytest.raises(SystemExit) as exit_info:
+        run_file(str(path), use_mmap=use_mmap, jobs=1)
+    assert exit_info.value.code == 1
+    assert capsys.readouterr().out.splitlines() == ["3h00", ""]
+
+
+def test_mmap_needs_file(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["calct", "--mmap", "1h"])
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 2
+
+
+@pytest.mark.parametrize("resolution", [Resolution.MINUTE, Resolution.SECOND])
+def test_compute_parallel_matches_sequential(resolution):
+    # The divisions truncate to the resolution, in each term, as they do sequentially
+    terms = [f"{i % 11}h{i % 60:02}" if i % 4 else f"(1h{i % 60:02}m{i % 7}s / {i % 5 + 2})" for i in range(3000)]
+    expr = terms[0] + "".join(f" {'+-'[i % 3 == 0]} {term}" for i, term in enumerate(terms[1:]))
+    with use_settings(Settings(resolution=resolution)):
+        assert compute_parallel(expr, jobs=3, min_length=0) == compute(expr)
+
+
+def test_compute_parallel_falls_back_to_sequential():
+    assert compute_parallel("1.5 + 2.25 - 3", jobs=2, min_length=0) == 0.75
+    assert compute_parallel("1h + 2h", jobs=2) == Duration(3)
+    for expr in ["1h + 2h 3h + 4h", "1h + 2h 3h", "(1h) (2h) + 3h + 4h"]:
+        assert compute_parallel(expr, jobs=2, min_length=0) == compute(expr)
+    with pytest.raises(TypeError):
+        compute_parallel("1h + 2 - 3h", jobs=2, min_length=0)
+    with pytest.raises(ValueError):
+        compute_parallel("1h + (2h - 3h", jobs=2, min_length=0)
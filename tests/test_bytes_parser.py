@@ -0,0 +1,105 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import mmap
+import re
+
+import pytest
+
+from calct.bytes_parser import compute_bytes, decode_duration, decode_literal, lex_bytes
+from calct.duration import Duration
+from calct.parser import compute, evaluate_token
+
+EXPRESSIONS = [
+    "2h + 3h + 4h12 + 3h10",
+    "3h23 @ 5h24 + 2 * (1h - 30m)",
+    "1.5h * 3 / 2",
+    "3e-2 * 1h",
+    "h30 + 12m + 1:15",
+    "((2 * 1h02)) @ 3h14",
+    "2.5 * 4",
+]
+
+
+def test_compute_bytes_matches_compute():
+    for expr in EXPRESSIONS:
+        assert compute_bytes(expr.encode()) == compute(expr)
+
+
+def test_decode_literal_matches_evaluate_token():
+    for token in ["1h", "1h30", "h45", "90m", "1.25h", "1.5e1h", "3", "3.5", "3e2"]:
+        assert decode_literal(token.encode()) == evaluate_token(token)
+
+
+def test_decode_duration():
+    assert decode_duration(b"2h15") == Duration(minutes=135)
+    assert decode_duration(b"0.5h") == Duration(minutes=30)
+    with pytest.raises(ValueError):
+        decode_duration(b"1h2h")
+
+
+def test_decode_errors_show_text():
+    with pytest.raises(ValueError, match="^`1.2.3` is not a valid number$"):
+        decode_literal(b"1.2.3")
+
+
+def test_lex_bytes_decodes_literals():
+    assert lex_bytes(b"2 * (1h30 - 1)") == [2, "*", "(", Duration(minutes=90), "-", 1, ")"]
+
+
+def test_memoryview_slice():
+    data = memoryview(b"ignored 1h + 30m ignored")
+    assert compute_bytes(data, 8, 16) == Duration(minutes=90)
+
+
+def test_mmap(tmp_path):
+    path = tmp_path / "expr.txt"
+    path.write_bytes(b"2 * (1h - 30m)")
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        assert compute_bytes(data) == Duration(hours=1)
+
+
+def test_custom_separator():
+    Duration.set_string_hour_minute_separator("!")
+    try:
+        assert compute_bytes(b"1!30 + 1h") == Duration(hours=2, minutes=30)
+    finally:
+        Duration.del_string_hour_minute_separator()
+
+
+def test_invalid_character():
+    with pytest.raises(ValueError, match="^Invalid character at byte offset 5"):
+        compute_bytes(b"1h + #")
+
+
+@pytest.mark.parametrize("name", ["x", "total", "$1", "_"])
+def test_names_match_text_errors(name):
+    expr = f"1h + {name} - 1"
+    with pytest.raises(ValueError) as text_error:
+        compute(expr)
+    with pytest.raises(ValueError, match=f"^{re.escape(str(text_error.value))}$"):
+        compute_bytes(expr.encode())
+
+
+def test_number_spellings_match_text():
+    assert lex_bytes(b"1_000 - 1e-3") == [1000, "-", 0.001]
+
+
+def test_exponent_followed_by_operator():
+    with pytest.raises(ValueError):
+        lex_bytes(b"1e*2")
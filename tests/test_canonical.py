@@ -0,0 +1,102 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import random
+
+import pytest
+
+from calct.canonical import canonicalize, fingerprint
+from calct.duration import Duration, Resolution, Settings, use_settings
+from calct.inference import Kind
+from calct.parser import evaluate_rpn, lex, parse
+
+KINDS = {"x": Kind.DURATION, "y": Kind.DURATION, "n": Kind.INTEGER}
+
+
+def random_expression(rng, depth=0):
+    if depth > 3 or rng.random() < 0.3:
+        return rng.choice(["2h30", "45m", "1h0m7s", "0.250s", "3", "07", "2.5", "x", "y", "n", "f"])
+    return f"({random_expression(rng, depth + 1)} {rng.choice('+-*/@')} {random_expression(rng, depth + 1)})"
+
+
+def outcome(expr, bindings):
+    try:
+        return evaluate_rpn(parse(lex(expr)), bindings)
+    except (TypeError, ZeroDivisionError) as ex:
+        return type(ex)
+
+
+@pytest.mark.parametrize("expr", ["1h+2h", "2h + 1h", "60m+2:00", "(1h)+(2h)", "((2:00)) + 1h"])
+def test_spellings_share_a_fingerprint(expr):
+    assert canonicalize(expr) == "120m + 60m"
+    assert fingerprint(expr) == fingerprint("1h + 2h")
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [("1h - 2h", "2h - 1h"), ("x / 2", "2 / x"), ("1h @ 2h", "2h @ 1h"), ("2", "2.0"), ("x", "y"), ("_", "$1")],
+)
+def test_different_computations_differ(first, second):
+    assert canonicalize(first) != canonicalize(second)
+    assert fingerprint(first) != fingerprint(second)
+
+
+def test_canonical_forms():
+    assert canonicalize("1h - (2h - 3h)") == "180m + 60m - 120m"
+    assert canonicalize("2 * 3 * (4 + 1)") == "(1 + 4) * 2 * 3"
+    assert canonicalize("(1h @ 2h) @ 3h") == "(60m @ 120m) @ 180m"
+    assert canonicalize("x / (2 / 3)") == "x / (2 / 3)"
+    assert canonicalize("(a - b) + (c - d)") == "a - b + (c - d)"
+    assert canonicalize("(a - b) + (c - d)", dict.fromkeys("abcd", Kind.DURATION)) == "a + c - b - d"
+    with use_settings(Settings(resolution=Resolution.MILLISECOND)):
+        assert canonicalize("1m + 0.250s") == "0.250s + 60s"
+
+
+def test_errors():
+    with pytest.raises(TypeError):
+        canonicalize("1h * 2h")
+    with pytest.raises(TypeError):
+        canonicalize("x * y", KINDS)
+    with pytest.raises(ValueError):
+        canonicalize("1h +")
+    with pytest.raises(ValueError):
+        canonicalize("1h 2h")
+
+
+@pytest.mark.parametrize("resolution", list(Resolution))
+def test_canonical_form_computes_the_same(resolution):
+    rng = random.Random(50)
+    with use_settings(Settings(resolution=resolution)):
+        for _ in range(2000):
+            expr = random_expression(rng)
+            bindings = {"x": Duration(1, rng.randrange(-500, 500), 13), "y": Duration(0, -7, -13), "n": 3, "f": 2.5}
+            try:
+                form = canonicalize(expr, KINDS)
+            except TypeError:
+                assert outcome(expr, bindings) in (TypeError, ZeroDivisionError)
+                continue
+            assert canonicalize(form, KINDS) == form
+            assert outcome(form, bindings) == outcome(expr, bindings), (expr, form)
+
+
+def test_fingerprint_is_stable():
+    assert fingerprint("1h + 2h") == 0xC65AC0960D282B79
+    in_minutes = fingerprint("x * 2")
+    assert 0 <= in_minutes < 2**64
+    with use_settings(Settings(resolution=Resolution.SECOND)):
+        assert canonicalize("x * 2") == "2 * x"
+        assert fingerprint("2*x") != in_minutes
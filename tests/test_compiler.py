@@ -0,0 +1,125 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import pytest
+
+from calct.compiler import Expression
+from calct.compiler import compile as compile_expr
+from calct.compiler import compile_source
+from calct.duration import Duration, Resolution
+from calct.history import History
+from calct.parser import compute, evaluate_rpn, lex, parse
+
+EXPRESSIONS = [
+    "3h23 @ 5h24 + 2 * (1h - 30m)",
+    "2h + 3h + 4h12 + 3h10",
+    "1h30 / 7 * 3",
+    "(0h - 1h31) / 7",
+    "2.5 * 1h + 1h * 3",
+    "1 @ 2 @ 4",
+    "2 * 3 / 4 + 1",
+    "(1h - 3h) / 4",
+    "1e2 * 1m",
+    "7h",
+]
+
+
+@pytest.mark.parametrize("expr", EXPRESSIONS)
+def test_matches_compute(expr):
+    assert compile_expr(expr)() == compute(expr)
+
+
+@pytest.mark.parametrize("expr", ["0h - 1h30 / 7", "1h0m10s * 2.5", "1.5s @ 2h"])
+def test_matches_compute_in_seconds(expr):
+    Duration.set_resolution(Resolution.SECOND)
+    assert compile_expr(expr)() == compute(expr)
+    Duration.del_resolution()
+
+
+def test_integer_arithmetic():
+    source, _ = compile_source(parse(lex("3h23 @ 5h24 + 2 * (1h - 30m)")))
+    assert "Duration" not in source
+    assert "int(" not in source
+    assert "60000" in source.splitlines()[-1]
+
+
+def test_constants():
+    assert compile_expr("1e999 * 0 + 1")() != compile_expr("1")()
+    assert compile_expr("2 * 1.5")() == 3.0
+
+
+def test_references():
+    history = History()
+    history.append(Duration(1))
+    history.append(4)
+    function = compile_expr("$2 * $1 + 30m")
+    assert function(history) == Duration(4, 30)
+    history.append(Duration(2))
+    assert function(history) == Duration(8, 30)
+    with pytest.raises(ValueError):
+        function()
+
+
+def test_type_error():
+    with pytest.raises(TypeError):
+        compile_expr("1h * 2h")()
+    with pytest.raises(TypeError):
+        compile_expr("1 + 2h")()
+
+
+def test_variables():
+    function = compile_expr("start @ end - brk")
+    assert function({"start": Duration(9), "end": Duration(17), "brk": Duration(0, 30)}) == Duration(7, 30)
+    with pytest.raises(ValueError):
+        function({"start": Duration(9)})
+
+
+def test_evaluate_columns():
+    expression = Expression("start @ end - brk * 2 + 1h")
+    assert expression.variables == ("start", "end", "brk")
+    starts, ends, breaks = [540, 600, 0, 1], [1020, 1000, 0, 0], [30, 0, 45, 7]
+    results = expression.evaluate({"start": starts, "end": ends, "brk": breaks})
+
+    for start, end, brk, result in zip(starts, ends, breaks, results):
+        bindings = {"start": Duration(minutes=start), "end": Duration(minutes=end), "brk": Duration(minutes=brk)}
+        assert Duration(minutes=result) == evaluate_rpn(parse(lex(expression.expr)), bindings)
+
+
+def test_evaluate_scalars():
+    expression = Expression("(start @ end) * rate / 3")
+    assert expression.evaluate({"start": Duration(9), "end": [600, 1020], "rate": 1.5}) == [30, 240]
+    assert expression.evaluate({"start": [0], "end": [60], "rate": 2}) == [40]
+    assert Expression("x - x + 2 * 3m").evaluate({"x": [1, 2, 3]}) == [6, 6, 6]
+    assert Expression("x * 2").evaluate({"x": []}) == []
+
+
+def test_evaluate_in_seconds():
+    Duration.set_resolution(Resolution.SECOND)
+    assert Expression("x + 1m30s").evaluate({"x": [30]}) == [120]
+    Duration.del_resolution()
+    assert Expression("x + 1m30s").evaluate({"x": [30]}) == [31]
+
+
+def test_evaluate_errors():
+    expression = Expression("a + b")
+    with pytest.raises(ValueError):
+        expression.evaluate({"a": [1, 2], "b": [1]})
+    with pytest.raises(ValueError):
+        expression.evaluate({"a": [1, 2]})
+    with pytest.raises(ValueError):
+        expression.evaluate({"a": Duration(1), "b": Duration(2)})
+    with pytest.raises(TypeError):
+        expression.evaluate({"a": [1, 2], "b": 3})
@@ -18,7 +18,7 @@ from __future__ import annotations
 
 import pytest
 
-from calct.duration import Duration
+from calct.duration import Duration, duration_matchers
 
 
 def test_get_separator():
@@ -38,6 +38,13 @@ def test_parse_custom_separator():
     Duration.del_string_hour_minute_separator()
 
 
+def test_matchers_for_separator():
+    assert "%H!%M" in Duration.get_matchers("!")
+    assert "%H!%M" not in Duration.get_matchers()
+    assert any(pattern.match("3!34") for pattern in duration_matchers("!"))
+    assert not any(pattern.match("3!34") for pattern in duration_matchers(":"))
+
+
 def test_set_separator_to_none():
     with pytest.raises(TypeError):
         Duration.set_string_hour_minute_separator(None)  # type: ignore
@@ -72,3 +79,19 @@ def test_set_separator_to_operators_or_parens():
         Duration.set_string_hour_minute_separator("(")
     with pytest.raises(ValueError):
         Duration.set_string_hour_minute_separator(")")
+
+
+def test_set_separator_to_reserved_characters():
+    for sep in ["m", "s", "$", "_", "1", ".", "e", " "]:
+        with pytest.raises(ValueError):
+            Duration.set_string_hour_minute_separator(sep)
+    Duration.set_string_hour_minute_separator(":")
+    Duration.del_string_hour_minute_separator()
+
+
+def test_operations_return_new_durations():
+    duration = Duration(hours=1)
+    result = duration + Duration()
+    assert result is not duration
+    result.minutes = 5
+    assert duration == Duration(hours=1)
@@ -0,0 +1,94 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pytest
+
+from calct.duration import Duration, Resolution
+from calct.parser import compute
+
+
+@pytest.fixture(name="resolution")
+def fixture_resolution():
+    def set_resolution(resolution: Resolution) -> None:
+        Duration.set_resolution(resolution)
+
+    yield set_resolution
+    Duration.del_resolution()
+
+
+def test_default_resolution_is_minute():
+    assert Duration.get_resolution() is Resolution.MINUTE
+    assert str(Duration(hours=1, minutes=2, seconds=59)) == "1h02"
+    assert Duration(seconds=59) == Duration()
+
+
+def test_parse_seconds():
+    assert Duration.parse("90s") == Duration(minutes=1)
+    assert Duration.parse("1h30m15s") == Duration(hours=1, minutes=30)
+
+
+def test_second_resolution(resolution):
+    resolution(Resolution.SECOND)
+    assert Duration.parse("1h30m15s") == Duration(hours=1, minutes=30, seconds=15)
+    assert Duration.parse("2m5s").total_milliseconds == 125_000
+    assert str(Duration(hours=1, minutes=2, seconds=3.9)) == "1h02m03s"
+    assert str(Duration(seconds=-75)) == "-0h01m15s"
+
+
+def test_millisecond_resolution(resolution):
+    resolution(Resolution.MILLISECOND)
+    assert Duration.parse("1.001s").total_milliseconds == 1_001
+    assert str(compute("1h30m15.250s + 0.75s")) == "1h30m16.000s"
+    assert repr(Duration(seconds=1.5)) == "Duration(hours=0, minutes=0, seconds=1.5)"
+
+
+def test_arithmetic_truncates_to_resolution(resolution):
+    assert Duration(minutes=1) * 0.5 == Duration()
+    resolution(Resolution.SECOND)
+    assert Duration(minutes=1) * 0.5 == Duration(seconds=30)
+    assert Duration(seconds=1) / 3 == Duration()
+    assert Duration(seconds=-10) / 3 == Duration(seconds=-3)
+
+
+def test_total_minutes_truncates():
+    assert Duration.from_milliseconds(-90_000).total_minutes == -1
+    assert Duration.from_milliseconds(90_000).total_minutes == 1
+
+
+def test_parts():
+    duration = Duration.from_milliseconds(-(3_600_000 + 2 * 60_000 + 3_004))
+    assert (duration.hours, duration.minutes, duration.seconds, duration.milliseconds) == (-1, -2, -3, -4)
+
+
+def test_from_timedelta_keeps_seconds(resolution):
+    assert Duration.from_timedelta(timedelta(seconds=-150)) == Duration(minutes=-2)
+    resolution(Resolution.SECOND)
+    assert Duration.from_timedelta(timedelta(seconds=150, microseconds=999_999)) == Duration(seconds=150)
+    assert Duration(seconds=150).as_timedelta == timedelta(seconds=150)
+
+
+def test_set_resolution_type():
+    with pytest.raises(TypeError):
+        Duration.set_resolution(1000)  # type: ignore
+
+
+def test_second_separator_is_reserved():
+    with pytest.raises(ValueError):
+        Duration.set_string_hour_minute_separator("s")
@@ -0,0 +1,94 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+from fractions import Fraction
+
+import pytest
+
+from calct.duration import Duration, Resolution
+from calct.exact import (
+    ExactDuration,
+    Rounding,
+    compute_exact,
+    evaluate_rpn_exact,
+    exact_token,
+)
+from calct.parser import compute, lex, parse
+
+
+def test_matches_float_path_on_whole_values():
+    for expr in ["2h + 3h + 4h12 + 3h10", "3h23 @ 5h24 + 2 * (1h - 30m)", "2 * 2h12 @ 3h14", "1.5h * 3"]:
+        assert compute_exact(expr) == compute(expr)
+
+
+def test_decimal_hours_are_exact():
+    assert compute("2.05h") == Duration(hours=2, minutes=2)
+    assert compute_exact("2.05h") == Duration(hours=2, minutes=3)
+
+
+def test_rounds_once_at_the_end():
+    assert compute("1h / 7 * 7") == Duration(minutes=56)
+    assert compute_exact("1h / 7 * 7") == Duration(hours=1)
+
+
+def test_rounding_policies():
+    assert compute_exact("10m / 4") == Duration(minutes=2)
+    assert compute_exact("10m / 4", Rounding.CEILING) == Duration(minutes=3)
+    assert compute_exact("10m / 4", Rounding.HALF_UP) == Duration(minutes=3)
+    assert compute_exact("10m / 4", Rounding.HALF_EVEN) == Duration(minutes=2)
+    assert compute_exact("(0m - 10m) / 4", Rounding.FLOOR) == Duration(minutes=-3)
+    assert compute_exact("(0m - 10m) / 4", Rounding.HALF_UP) == Duration(minutes=-3)
+    assert compute_exact("(0m - 10m) / 4") == Duration(minutes=-2)
+
+
+def test_rounds_to_resolution():
+    Duration.set_resolution(Resolution.SECOND)
+    try:
+        assert compute_exact("1m / 7") == Duration(seconds=8)
+        assert compute_exact("1m / 7", Rounding.CEILING) == Duration(seconds=9)
+    finally:
+        Duration.del_resolution()
+
+
+def test_number_results():
+    assert compute_exact("2.5 * 4") == 10
+    assert compute_exact("1 / 4") == 0.25
+
+
+def test_exact_token():
+    assert exact_token("1.1") == Fraction(11, 10)
+    assert isinstance(exact_token("1.1h"), ExactDuration)
+    assert exact_token(Duration(minutes=1)).milliseconds == 60_000  # type: ignore
+
+
+def test_evaluate_rpn_exact():
+    assert evaluate_rpn_exact(parse(lex("2 * (2h - 12m)"))) == Duration(hours=3, minutes=36)
+
+
+def test_type_errors():
+    with pytest.raises(TypeError):
+        compute_exact("1h * 2h")
+    with pytest.raises(TypeError):
+        compute_exact("1h + 2")
+    with pytest.raises(TypeError):
+        compute_exact("2 / 1h")
+
+
+def test_division_by_zero():
+    with pytest.raises(ZeroDivisionError):
+        compute_exact("1h / 0")
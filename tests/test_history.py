@@ -0,0 +1,94 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import pytest
+
+from calct.duration import Duration
+from calct.history import History
+from calct.main import Repl
+from calct.parser import compute_chunks, evaluate_rpn, lex, parse
+
+
+def test_references():
+    history = History()
+    for result in [Duration(1), 2, Duration(minutes=30)]:
+        history.append(result)
+
+    assert history["_"] == Duration(minutes=30)
+    assert history["$1"] == Duration(minutes=30)
+    assert history["$2"] == 2
+    assert history["$3"] == Duration(1)
+    assert "$4" not in history
+    assert "$0" not in history
+    assert list(history) == ["_", "$1", "$2", "$3"]
+
+
+def test_evaluate_with_references():
+    history = History()
+    history.append(Duration(1, 30))
+    history.append(3)
+
+    assert evaluate_rpn(parse(lex("_ * $2 + 15m")), history) == Duration(4, 45)
+    assert compute_chunks(["($2 @ 3h) / ", "$1"], history) == Duration(minutes=30)
+
+
+def test_unknown_reference():
+    with pytest.raises(ValueError):
+        compute_chunks(["_ + 1h"], History())
+    with pytest.raises(ValueError):
+        compute_chunks(["$1 + 1h"])
+
+
+def test_history_is_bounded():
+    history = History(size=3)
+    for minutes in range(10):
+        history.append(Duration(minutes=minutes))
+    assert list(history.results) == [Duration(minutes=7), Duration(minutes=8), Duration(minutes=9)]
+
+
+def test_history_file(tmp_path):
+    path = tmp_path / "history"
+    history = History(path)
+    for result in [Duration(1, 30), Duration.from_milliseconds(1500), 4, 2.5]:
+        history.append(result)
+    history.save()
+
+    assert list(History(path).results) == [Duration(1, 30), Duration.from_milliseconds(1500), 4, 2.5]
+
+    # The file is only read on the first access to the results
+    loaded = History(path)
+    path.unlink()
+    assert len(loaded) == 0
+
+
+@pytest.mark.parametrize("data", [b"garbage", b"CRPN", b"CRPN\x01\x11\x00", b"CRPN\x01\x10\x80"])
+def test_history_file_unreadable(tmp_path, capsys, data):
+    path = tmp_path / "history"
+    path.write_bytes(data)
+    assert len(History(path)) == 0
+
+    Repl(History(path)).onecmd("1h + 1h")
+    assert capsys.readouterr().out.split() == ["2h00"]
+
+
+def test_repl_references(tmp_path, capsys):
+    repl = Repl(History(tmp_path / "history"))
+    repl.onecmd("1h30 + 30m")
+    repl.onecmd("_ * 2")
+    repl.onecmd("$1 - $2")
+    assert capsys.readouterr().out.split() == ["2h00", "4h00", "2h00"]
+
+    assert list(History(tmp_path / "history").results) == [Duration(2), Duration(4), Duration(2)]
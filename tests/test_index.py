@@ -0,0 +1,82 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import random
+
+import pytest
+
+from calct.duration import Duration
+from calct.index import DurationIndex
+
+
+def random_items(rng, count, first_id=0):
+    return [(first_id + item_id, Duration(minutes=rng.randrange(0, 16 * 60))) for item_id in range(count)]
+
+
+def by_length(items):
+    return sorted(items, key=lambda item: item[1].total_milliseconds)
+
+
+def ids(items):
+    return [item_id for item_id, _ in items]
+
+
+def test_update_merges_sorted():
+    rng = random.Random(44)
+    items = random_items(rng, 300)
+    index = DurationIndex(items[:100])
+    index.update(items[100:250])
+    for item_id, duration in items[250:]:
+        index.add(item_id, duration)
+    assert len(index) == 300
+    assert list(index) == by_length(items)
+
+
+def test_between_matches_filter():
+    rng = random.Random(440)
+    items = random_items(rng, 500)
+    index = DurationIndex(items)
+    for _ in range(100):
+        low, high = Duration(minutes=rng.randrange(16 * 60)), Duration(minutes=rng.randrange(16 * 60))
+        expected = by_length([item for item in items if low <= item[1] < high])
+        assert index.between(low, high) == ids(expected)
+        assert index.count(low, high) == len(expected)
+        expected = by_length([item for item in items if low < item[1] <= high])
+        assert index.between(low, high, include_low=False, include_high=True) == ids(expected)
+
+    longer = index.between(low=Duration(10), include_low=False)
+    assert longer == ids(by_length([item for item in items if item[1] > Duration(10)]))
+
+
+def test_top_and_bottom():
+    index = DurationIndex.from_durations([Duration(3), Duration(1), Duration(5), Duration(2)])
+    assert index.top(2) == [(2, Duration(5)), (0, Duration(3))]
+    assert index.bottom(2) == [(1, Duration(1)), (3, Duration(2))]
+    assert len(index.top(10)) == 4
+
+
+def test_rank_and_percentile():
+    index = DurationIndex.from_durations([Duration(minutes=minutes) for minutes in range(1, 101)])
+    assert index.rank(Duration(minutes=1)) == 0
+    assert index.rank(Duration(minutes=50)) == 49
+    assert index.percentile(0) == Duration(minutes=1)
+    assert index.percentile(50) == Duration(minutes=50)
+    assert index.percentile(90.5) == Duration(minutes=91)
+    assert index.percentile(100) == Duration(minutes=100)
+    with pytest.raises(ValueError):
+        index.percentile(101)
+    with pytest.raises(ValueError):
+        DurationIndex().percentile(50)
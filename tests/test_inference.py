@@ -0,0 +1,116 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import math
+import random
+from operator import add
+
+import pytest
+
+from calct.duration import Duration, Resolution, Settings, use_settings
+from calct.inference import Kind, TypedProgram, infer, kernel, result_kind
+from calct.parser import evaluate_rpn, lex, parse
+
+KINDS = {"x": Kind.DURATION, "y": Kind.DURATION, "n": Kind.INTEGER, "f": Kind.NUMBER}
+
+
+def random_expression(rng, depth=0):
+    if depth > 3 or rng.random() < 0.3:
+        return rng.choice(["2h30", "45m", "1h0m7s", "3", "2.5", "x", "y", "n", "f"])
+    return f"({random_expression(rng, depth + 1)} {rng.choice('+-*/@')} {random_expression(rng, depth + 1)})"
+
+
+def same(first, second):
+    if isinstance(first, Duration) or isinstance(second, Duration):
+        return isinstance(first, Duration) and isinstance(second, Duration) and first == second
+    return type(first) is type(second) and math.isclose(first, second)
+
+
+def test_result_kinds():
+    assert result_kind("+", Kind.DURATION, Kind.DURATION) is Kind.DURATION
+    assert result_kind("@", Kind.DURATION, Kind.DURATION) is Kind.DURATION
+    assert result_kind("*", Kind.INTEGER, Kind.DURATION) is Kind.DURATION
+    assert result_kind("/", Kind.DURATION, Kind.NUMBER) is Kind.DURATION
+    assert result_kind("*", Kind.INTEGER, Kind.INTEGER) is Kind.INTEGER
+    assert result_kind("/", Kind.INTEGER, Kind.INTEGER) is Kind.NUMBER
+    assert result_kind("+", Kind.ANY, Kind.INTEGER) is Kind.ANY
+    invalid = [
+        ("*", Kind.DURATION, Kind.DURATION),
+        ("/", Kind.INTEGER, Kind.DURATION),
+        ("-", Kind.DURATION, Kind.NUMBER),
+    ]
+    for operator, left, right in invalid:
+        assert result_kind(operator, left, right) is None
+
+
+def test_infer_labels_each_element():
+    labeled = infer(parse(lex("x * 2 + 30m")), KINDS)
+    assert labeled == [
+        ("x", Kind.DURATION),
+        (2, Kind.INTEGER),
+        ("*", Kind.DURATION),
+        (Duration(0, 30), Kind.DURATION),
+        ("+", Kind.DURATION),
+    ]
+    assert infer(parse(lex("a + 1h")))[0] == ("a", Kind.ANY)
+
+
+@pytest.mark.parametrize("expr", ["1h * 2h", "2 / 1h", "1 + 2h", "1h @ 2", "x * y"])
+def test_rejected_before_evaluation(expr):
+    with pytest.raises(TypeError):
+        infer(parse(lex(expr)), KINDS)
+    with pytest.raises(TypeError):
+        TypedProgram.from_string(expr, KINDS)
+
+
+def test_kernels_have_no_type_checks():
+    assert kernel("+", Kind.DURATION, Kind.DURATION) is add
+    assert kernel("/", Kind.DURATION, Kind.INTEGER)(-7, 2) == -3
+    assert kernel("*", Kind.NUMBER, Kind.DURATION)(1.5, 5) == 7
+    with pytest.raises(TypeError):
+        kernel("+", Kind.ANY, Kind.DURATION)
+
+
+@pytest.mark.parametrize("resolution", list(Resolution))
+def test_program_matches_evaluate_rpn(resolution):
+    rng = random.Random(49)
+    with use_settings(Settings(resolution=resolution)):
+        for _ in range(2000):
+            expr = random_expression(rng)
+            bindings = {"x": Duration(1, rng.randrange(-500, 500), 13), "y": Duration(0, -7, -13), "n": 3, "f": 2.5}
+            rpn = parse(lex(expr))
+            try:
+                program = TypedProgram(rpn, KINDS)
+            except TypeError:
+                with pytest.raises((TypeError, ZeroDivisionError)):
+                    evaluate_rpn(rpn, bindings)
+                continue
+            try:
+                expected = evaluate_rpn(rpn, bindings)
+            except ZeroDivisionError:
+                continue
+            assert same(program.evaluate(bindings), expected), expr
+
+
+def test_program_errors():
+    with pytest.raises(ValueError):
+        TypedProgram.from_string("a + 1h")
+    program = TypedProgram.from_string("a + 1h", {"a": Kind.DURATION})
+    assert program.kind is Kind.DURATION
+    assert program.evaluate({"a": Duration(0, 30)}) == Duration(1, 30)
+    with pytest.raises(ValueError):
+        program.evaluate()
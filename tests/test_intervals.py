@@ -0,0 +1,204 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import io
+import pickle
+import random
+import sys
+
+import pytest
+
+from calct.duration import Duration
+from calct.intervals import (
+    IntervalTree,
+    TimeRange,
+    double_booked,
+    intersection,
+    parse_range,
+    read_ranges,
+    sort_ranges,
+    total,
+    union,
+)
+from calct.main import main, run_union
+from calct.parser import compute
+
+
+def minutes_range(start, end):
+    return TimeRange(Duration(minutes=start), Duration(minutes=end))
+
+
+def random_ranges(rng, count):
+    ranges = []
+    for _ in range(count):
+        start = rng.randrange(0, 24 * 60)
+        ranges.append(minutes_range(start, start + rng.choice([0, 15, 30, 60, 240, 480])))
+    return ranges
+
+
+def key(time_range):
+    return time_range.start.total_milliseconds, time_range.end.total_milliseconds, id(time_range)
+
+
+def test_to_operator():
+    time_range = compute("9h @ 17h30")
+    assert isinstance(time_range, TimeRange)
+    assert time_range == Duration(8, 30)
+    assert (time_range.start, time_range.end) == (Duration(9), Duration(17, 30))
+    assert str(time_range) == "8h30"
+    shifted = time_range + Duration(1)
+    assert isinstance(shifted, Duration) and not isinstance(shifted, TimeRange)
+    assert compute("2 @ 5") == 3
+
+
+def test_time_range():
+    time_range = minutes_range(60, 120)
+    assert time_range.contains(Duration(minutes=60))
+    assert not time_range.contains(Duration(minutes=120))
+    assert time_range.overlaps(minutes_range(90, 200))
+    assert not time_range.overlaps(minutes_range(120, 200))
+    copy = pickle.loads(pickle.dumps(time_range))
+    assert isinstance(copy, TimeRange) and (copy.start, copy.end) == (time_range.start, time_range.end)
+
+
+def test_stab_and_overlap_match_brute_force():
+    rng = random.Random(41)
+    ranges = random_ranges(rng, 500)
+    tree = IntervalTree(ranges[:300])
+    tree.update(ranges[300:])
+    assert len(tree) == 500
+
+    for _ in range(200):
+        time = Duration(minutes=rng.randrange(-10, 30 * 60))
+        expected = [time_range for time_range in ranges if time_range.contains(time)]
+        assert sorted(tree.stab(time), key=key) == sorted(expected, key=key)
+
+        query = random_ranges(rng, 1)[0]
+        expected = [time_range for time_range in ranges if time_range.overlaps(query)]
+        assert sorted(tree.overlap(query), key=key) == sorted(expected, key=key)
+
+
+def test_iteration_is_sorted():
+    tree = IntervalTree([minutes_range(30, 40), minutes_range(10, 50), minutes_range(10, 20)])
+    assert [(r.start.total_minutes, r.end.total_minutes) for r in tree] == [(10, 20), (10, 50), (30, 40)]
+
+
+def test_covered():
+    tree = IntervalTree()
+    assert tree.covered() == Duration(0)
+    tree.update([minutes_range(0, 60), minutes_range(30, 90), minutes_range(120, 150), minutes_range(150, 160)])
+    tree.add(minutes_range(200, 200))
+    assert tree.covered() == Duration(minutes=130)
+
+
+def test_covered_matches_brute_force():
+    rng = random.Random(410)
+    ranges = random_ranges(rng, 300)
+    minutes = set()
+    for time_range in ranges:
+        minutes.update(range(time_range.start.total_minutes, time_range.end.total_minutes))
+    assert IntervalTree(ranges).covered() == Duration(minutes=len(minutes))
+
+
+def test_reversed_range():
+    with pytest.raises(ValueError):
+        IntervalTree().add(compute("17h @ 9h"))
+
+
+def covered_minutes(ranges, times=1):
+    counts = {}
+    for time_range in ranges:
+        for minute in range(time_range.start.total_minutes, time_range.end.total_minutes):
+            counts[minute] = counts.get(minute, 0) + 1
+    return {minute for minute, count in counts.items() if count >= times}
+
+
+def spans(ranges):
+    return [(time_range.start.total_minutes, time_range.end.total_minutes) for time_range in ranges]
+
+
+def test_union():
+    ranges = [parse_range("9h @ 12h"), parse_range("11h30 @ 14h"), parse_range("14h @ 15h"), parse_range("16h @ 17h")]
+    assert spans(union(ranges)) == [(540, 900), (960, 1020)]
+    assert total(union(ranges)) == Duration(7)
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1000])
+def test_union_matches_brute_force(chunk_size):
+    ranges = random_ranges(random.Random(42), 400)
+    merged = list(union(ranges, chunk_size=chunk_size))
+    assert all(previous.end < following.start for previous, following in zip(merged, merged[1:]))
+    assert covered_minutes(merged) == covered_minutes(ranges)
+    assert spans(union(sort_ranges(ranges), presorted=True)) == spans(merged)
+
+
+def test_double_booked_matches_brute_force():
+    ranges = random_ranges(random.Random(420), 300)
+    booked = list(double_booked(ranges, chunk_size=50))
+    assert covered_minutes(booked) == covered_minutes(ranges, times=2)
+    assert spans(double_booked([parse_range("9h @ 12h"), parse_range("11h30 @ 14h")])) == [(690, 720)]
+
+
+def test_intersection_matches_brute_force():
+    rng = random.Random(4200)
+    first, second = random_ranges(rng, 100), random_ranges(rng, 100)
+    assert covered_minutes(intersection(first, second)) == covered_minutes(first) & covered_minutes(second)
+
+
+def test_sort_ranges_externally():
+    ranges = random_ranges(random.Random(42000), 100)
+    assert spans(sort_ranges(ranges, chunk_size=9)) == sorted(spans(ranges))
+
+
+def test_presorted_check():
+    with pytest.raises(ValueError):
+        list(union([parse_range("10h @ 11h"), parse_range("9h @ 12h")], presorted=True))
+
+
+def test_read_ranges():
+    stream = io.StringIO("9h @ 12h\n\n  1:30 @ 2h45  \n")
+    assert spans(read_ranges(stream)) == [(540, 720), (90, 165)]
+    with pytest.raises(ValueError):
+        list(read_ranges(io.StringIO("9h @ 12h\n9h - 12h\n")))
+
+
+def test_union_subcommand(tmp_path, capsys):
+    path = tmp_path / "punches.txt"
+    path.write_text("9h @ 12h\n11h30 @ 14h\n15h @ 16h\n")
+    run_union(["-f", str(path)])
+    assert capsys.readouterr().out.splitlines() == ["9h00 @ 14h00", "15h00 @ 16h00", "6h00"]
+    run_union(["-f", str(path), "--double-booked", "--total"])
+    assert capsys.readouterr().out.splitlines() == ["0h30"]
+
+
+def test_union_subcommand_uses_global_options(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "ranges.txt"
+    path.write_text("9!00 @ 9!00m30s\n")
+    monkeypatch.setattr(sys, "argv", ["calct", "-s", "!", "-r", "second", "union", "-f", str(path), "--total"])
+    try:
+        main()
+    finally:
+        Duration.del_string_hour_minute_separator()
+        Duration.del_resolution()
+    assert capsys.readouterr().out.splitlines() == ["0!00m30s"]
+
+
+def test_union_subcommand_leaves_stdin_open(monkeypatch, capsys):
+    stdin = io.StringIO("9h @ 12h\n11h @ 14h\n")
+    monkeypatch.setattr(sys, "stdin", stdin)
+    run_union(["-f", "-", "--total"])
+    assert capsys.readouterr().out.splitlines() == ["5h00"]
+    assert not stdin.closed
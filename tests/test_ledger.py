@@ -0,0 +1,80 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import random
+
+import pytest
+
+from calct.duration import Duration
+from calct.ledger import DurationLedger
+
+
+def naive_sum(durations):
+    return sum(durations, Duration())
+
+
+def test_range_sums_match_naive():
+    rng = random.Random(43)
+    durations = [Duration(minutes=rng.randrange(-600, 600)) for _ in range(257)]
+    ledger = DurationLedger(durations)
+    assert len(ledger) == 257
+    assert ledger.total() == naive_sum(durations)
+    for _ in range(300):
+        start = rng.randrange(0, 258)
+        end = rng.randrange(start, 258)
+        assert ledger.range_sum(start, end) == naive_sum(durations[start:end])
+        assert ledger.prefix_sum(end) == naive_sum(durations[:end])
+
+
+def test_updates():
+    rng = random.Random(430)
+    durations = [Duration(minutes=rng.randrange(600)) for _ in range(100)]
+    ledger = DurationLedger(durations)
+    for _ in range(200):
+        index = rng.randrange(-100, 100)
+        durations[index] = Duration(minutes=rng.randrange(600))
+        ledger[index] = durations[index]
+        start = rng.randrange(0, 101)
+        end = rng.randrange(start, 101)
+        assert ledger.range_sum(start, end) == naive_sum(durations[start:end])
+    assert list(ledger) == durations
+
+
+def test_append():
+    ledger = DurationLedger()
+    durations = []
+    for minutes in range(1, 70):
+        ledger.append(Duration(minutes=minutes))
+        durations.append(Duration(minutes=minutes))
+        assert ledger.total() == naive_sum(durations)
+        third = len(durations) // 3
+        assert ledger.range_sum(third, len(durations)) == naive_sum(durations[third:])
+
+
+def test_from_strings():
+    ledger = DurationLedger.from_strings(["1h30", "45m", ":15", "2h"])
+    assert ledger[1] == Duration(minutes=45)
+    assert ledger.range_sum(0, 3) == Duration(2, 30)
+
+
+def test_out_of_range():
+    ledger = DurationLedger([Duration(1)])
+    with pytest.raises(IndexError):
+        ledger.range_sum(0, 2)
+    with pytest.raises(IndexError):
+        ledger.prefix_sum(-1)
+    with pytest.raises(IndexError):
+        ledger[1] = Duration(1)
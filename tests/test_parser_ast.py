@@ -0,0 +1,108 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import pytest
+
+from calct.parser import (
+    AstBuilder,
+    BinaryOp,
+    Duration,
+    Literal,
+    Operation,
+    build_ast,
+    deque,
+    evaluate_ast,
+    evaluate_rpn,
+    lex,
+    lower_ast,
+    parse,
+    parse_ast,
+)
+
+
+def test_literal():
+    node = parse_ast(["2h"])
+    assert isinstance(node, Literal)
+    assert node.token == "2h"
+
+
+def test_precedence():
+    node = parse_ast(["2h12", "-", "12m", "*", "2"])
+    assert isinstance(node, BinaryOp)
+    assert node.operation is Operation.SUB
+    assert isinstance(node.right, BinaryOp)
+    assert node.right.operation is Operation.MUL
+
+
+def test_identical_subtrees_are_shared():
+    node = parse_ast(lex("(1h + 2h) * 2 + (1h + 2h) * 2"))
+    assert isinstance(node, BinaryOp)
+    assert node.left is node.right
+
+
+def test_builder_reused_across_expressions():
+    builder = AstBuilder()
+    first = build_ast(parse(lex("1h + 30m")), builder)
+    size = len(builder)
+    second = build_ast(parse(lex("1h + 30m")), builder)
+    assert first is second
+    assert len(builder) == size
+
+
+def test_lowering_round_trip():
+    rpn = parse(lex("3h23 @ 5h24 + 2 * (1h - 30m)"))
+    assert lower_ast(build_ast(rpn)) == rpn
+
+
+def test_lowering_expands_shared_subtrees():
+    rpn = parse(lex("(1h + 2h) - (1h + 2h)"))
+    assert lower_ast(build_ast(rpn)) == deque(["1h", "2h", "+", "1h", "2h", "+", "-"])
+
+
+def test_evaluate_matches_rpn():
+    for expr in ["2h + 3h + 4h12 + 3h10", "2 * (2h - 12m)", "2 * 2h12 @ 3h14", "(2 * 1h02) @ 3h14", "3 * 2.5"]:
+        rpn = parse(lex(expr))
+        assert evaluate_ast(build_ast(rpn)) == evaluate_rpn(rpn)
+
+
+def test_evaluate_shared_subtrees_once(monkeypatch):
+    calls = []
+    original = Duration.parse
+
+    def counting_parse(time_str):
+        calls.append(time_str)
+        return original(time_str)
+
+    monkeypatch.setattr(Duration, "parse", counting_parse)
+    assert evaluate_ast(parse_ast(lex("(1h + 2h) + (1h + 2h)"))) == Duration(hours=6)
+    assert sorted(calls) == ["1h", "2h"]
+
+
+def test_deep_chain():
+    rpn = parse(lex(" + ".join(["1m"] * 1500)))
+    assert evaluate_ast(build_ast(rpn)) == Duration(minutes=1500)
+
+
+def test_missing_operand():
+    with pytest.raises(ValueError):
+        build_ast(deque(["1h", "+"]))
+
+
+def test_too_many_operands():
+    with pytest.raises(ValueError):
+        build_ast(deque(["1h", "2h"]))
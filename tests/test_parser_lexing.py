@@ -16,6 +16,10 @@
 
 from __future__ import annotations
 
+import pytest
+
+from calct._common import CharClass, char_classes
+from calct.duration import Duration
 from calct.parser import lex
 
 
@@ -39,3 +43,30 @@ def test_exponential():
     assert lex("3e2 * 1h") == ["3e2", "*", "1h"]
     assert lex("3E2 * 1h") == ["3E2", "*", "1h"]
     assert lex("3e-2 * 1h") == ["3e-2", "*", "1h"]
+
+
+def test_char_classes():
+    classes = char_classes("!")
+    assert classes["+"] is CharClass.OPERATOR
+    assert classes["\t"] is CharClass.WHITESPACE
+    assert classes["e"] is CharClass.NUMBER
+    assert classes["$"] is CharClass.REFERENCE
+    assert classes["!"] is classes["h"] is classes[":"] is CharClass.HOUR_SEPARATOR
+    assert classes["m"] is classes["s"] is CharClass.UNIT
+    assert classes["x"] is CharClass.IDENTIFIER
+    assert "?" not in classes
+    assert char_classes("!") is classes
+
+
+def test_custom_separator():
+    with pytest.raises(ValueError):
+        lex("1!30")
+    Duration.set_string_hour_minute_separator("!")
+    assert lex("1!30 + 2h") == ["1!30", "+", "2h"]
+    Duration.del_string_hour_minute_separator()
+
+
+def test_identifiers():
+    assert lex("start @ end - break") == ["start", "@", "end", "-", "break"]
+    assert lex("time-1e-2*2h") == ["time", "-", "1e-2", "*", "2h"]
+    assert lex("rate*start_2") == ["rate", "*", "start_2"]
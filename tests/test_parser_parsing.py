@@ -18,7 +18,7 @@ from __future__ import annotations
 
 import pytest
 
-from calct.parser import deque, parse
+from calct.parser import deque, parse, split_sum
 
 
 def test_triple_sum():
@@ -122,3 +122,14 @@ def test_unmatched_closing_paren_alone():
 
 def test_substract_becomes_negative_with_minutes():
     assert parse(["0h", "-", "0h10"]) == deque(["0h", "0h10", "-"])
+
+
+def test_split_sum_cuts_top_level_signs():
+    expr = "1h + 2h - (3h + 4h) * 2 + 1e-3 * 2h - 5m"
+    assert split_sum(expr, 1) == [expr]
+    assert split_sum(expr, 50) == ["1h ", "+ 2h ", "- (3h + 4h) * 2 ", "+ 1e-3 * 2h ", "- 5m"]
+    for parts in range(1, 8):
+        pieces = split_sum(expr, parts)
+        assert "".join(pieces) == expr
+        assert len(pieces) <= parts
+    assert split_sum("(1h + 2h) * 2", 4) == ["(1h + 2h) * 2"]
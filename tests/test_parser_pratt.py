@@ -0,0 +1,82 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import random
+
+import pytest
+
+from calct.duration import Duration
+from calct.history import History
+from calct.parser import ParseMethod, compute, evaluate_pratt, evaluate_rpn, lex, parse
+
+EXPRESSIONS = [
+    "3h23 @ 5h24 + 2 * (1h - 30m)",
+    "2h + 3h + 4h12 + 3h10",
+    "10h - 2h - 3h",
+    "1 @ 2 @ 4",
+    "1h @ 2h * 3",
+    "((1h30))",
+    "2 * 3 / 4",
+    "1h / 2 / 2",
+    "(1h + 2h) * (3 - 1.5) / 2",
+    "3e2 * 1m - 1.5h",
+]
+
+
+@pytest.mark.parametrize("expr", EXPRESSIONS)
+def test_matches_rpn(expr):
+    assert evaluate_pratt(lex(expr)) == evaluate_rpn(parse(lex(expr)))
+
+
+def random_expression(rng, depth=0):
+    if depth == 4 or rng.random() < 0.3:
+        return rng.choice([f"{rng.randrange(24)}h{rng.randrange(60):02}", f"{rng.randrange(1, 9)}"])
+    expr = f"{random_expression(rng, depth + 1)} {rng.choice('+-*/@')} {random_expression(rng, depth + 1)}"
+    return f"({expr})" if rng.random() < 0.5 else expr
+
+
+def test_matches_rpn_random():
+    rng = random.Random(38)
+    for _ in range(500):
+        expr = random_expression(rng)
+        try:
+            expected = evaluate_rpn(parse(lex(expr)))
+        except (ArithmeticError, TypeError) as ex:
+            with pytest.raises(type(ex)):
+                evaluate_pratt(lex(expr))
+            continue
+        assert evaluate_pratt(lex(expr)) == expected, expr
+
+
+def test_compute_method():
+    assert compute("1h30 * 2", ParseMethod.PRATT) == compute("1h30 * 2", ParseMethod.RPN) == Duration(3)
+
+
+@pytest.mark.parametrize("expr", ["1h +", "* 2", "(1h + 2h", "1h + 2h)", "1h 2h", "()"])
+def test_invalid(expr):
+    with pytest.raises(ValueError):
+        evaluate_pratt(lex(expr))
+
+
+def test_type_error():
+    with pytest.raises(TypeError):
+        evaluate_pratt(lex("1h * 2h"))
+
+
+def test_bindings():
+    history = History()
+    history.append(Duration(1))
+    assert evaluate_pratt(lex("_ * 2 + $1"), history) == Duration(3)
@@ -0,0 +1,82 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import io
+from itertools import chain, repeat
+
+import pytest
+
+from calct.parser import (
+    Duration,
+    compute,
+    compute_chunks,
+    compute_stream,
+    iter_lex,
+    iter_parse,
+    lex,
+    lex_stream,
+    parse,
+)
+
+EXPR = "3h23 @ 5h24 + 2 * (1h - 30m) + 3e-2 * 1h + 1.5 * 2h10"
+
+
+def test_lex_stream_matches_lex_for_every_chunk_size():
+    expected = lex(EXPR)
+    for chunk_size in range(1, len(EXPR) + 1):
+        assert list(lex_stream(io.StringIO(EXPR), chunk_size)) == expected
+
+
+def test_iter_lex_tokens_split_across_chunks():
+    assert list(iter_lex(["1", "h3", "0 +", " 2", "h"])) == ["1h30", "+", "2h"]
+
+
+def test_iter_lex_invalid_character():
+    with pytest.raises(ValueError):
+        list(iter_lex(["1h", " ", "?"]))
+
+
+def test_iter_parse_matches_parse():
+    tokens = lex(EXPR)
+    assert list(iter_parse(tokens)) == list(parse(tokens))
+
+
+def test_iter_parse_is_lazy():
+    tokens = chain(["1h"], chain.from_iterable(repeat(["+", "1h"])))
+    rpn = iter_parse(tokens)
+    assert [next(rpn) for _ in range(5)] == ["1h", "1h", "+", "1h", "+"]
+
+
+def test_iter_parse_unmatched_parens():
+    with pytest.raises(ValueError):
+        list(iter_parse(["(", "1h"]))
+    with pytest.raises(ValueError):
+        list(iter_parse(["1h", ")"]))
+
+
+def test_compute_stream():
+    assert compute_stream(io.StringIO(EXPR), chunk_size=3) == compute(EXPR)
+
+
+def test_compute_stream_long_sum():
+    stream = io.StringIO(" + ".join(["1h01"] * 10_000))
+    assert compute_stream(stream, chunk_size=4096) == Duration(minutes=10_000 * 61)
+
+
+def test_compute_chunks():
+    assert compute_chunks(["2 * (1h", " - 30m)"]) == Duration(hours=1)
@@ -0,0 +1,100 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+import pickle
+
+import pytest
+
+from calct.duration import Duration
+from calct.parser import evaluate_rpn, lex, parse
+from calct.serialization import (
+    decode_varint,
+    durations_from_bytes,
+    durations_to_bytes,
+    encode_varint,
+    ints_from_bytes,
+    ints_to_bytes,
+    rpn_from_bytes,
+    rpn_to_bytes,
+)
+
+
+def test_duration_to_bytes():
+    assert Duration(hours=1, minutes=2).to_bytes() == (62 * 60_000).to_bytes(8, "little", signed=True)
+    for minutes in [0, 1, -1, 2**40, -(2**40)]:
+        assert Duration.from_bytes(Duration(minutes=minutes).to_bytes()) == Duration(minutes=minutes)
+
+
+def test_duration_pickle():
+    duration = Duration(hours=-3, minutes=-12)
+    assert pickle.loads(pickle.dumps(duration)) == duration
+    assert b"total_minutes" not in pickle.dumps(duration)
+
+
+def test_varint():
+    for value in [0, 1, -1, 63, -64, 64, 2**63 - 1, -(2**63), 2**80, -(2**80)]:
+        out = bytearray()
+        encode_varint(value, out)
+        assert decode_varint(bytes(out), 0) == (value, len(out))
+
+
+def test_varint_is_compact():
+    out = bytearray()
+    encode_varint(-60, out)
+    assert len(out) == 1
+
+
+def test_truncated_varint():
+    with pytest.raises(ValueError):
+        decode_varint(b"\x80", 0)
+
+
+def test_ints_round_trip():
+    assert list(ints_from_bytes(ints_to_bytes([1, -2, 3]))) == [1, -2, 3]
+    with pytest.raises(ValueError):
+        ints_from_bytes(b"123")
+
+
+def test_durations_round_trip():
+    durations = [Duration(hours=1), Duration(minutes=-5), Duration()]
+    assert durations_from_bytes(durations_to_bytes(durations)) == durations
+
+
+def test_rpn_round_trip():
+    rpn = parse(lex("3h23 @ 5h24 + 2.5 * (1h - 30m) - 3 * 10m"))
+    restored = rpn_from_bytes(rpn_to_bytes(rpn))
+    assert [element for element in restored if isinstance(element, str)] == ["@", "-", "*", "+", "*", "-"]
+    assert evaluate_rpn(restored) == evaluate_rpn(rpn)
+
+
+def test_rpn_round_trip_keeps_milliseconds():
+    restored = rpn_from_bytes(rpn_to_bytes([Duration.from_milliseconds(1_500), Duration(minutes=2), "+"]))
+    assert evaluate_rpn(restored) == Duration.from_milliseconds(121_500)
+
+
+def test_rpn_from_invalid_bytes():
+    with pytest.raises(ValueError):
+        rpn_from_bytes(b"nope")
+    with pytest.raises(ValueError):
+        rpn_from_bytes(b"CRPN\x01\xff")
+
+
+@pytest.mark.parametrize("data", [b"CRPN", b"CRPN\x01\x11\x00", b"CRPN\x01\x10\x80", b"CRPN\x01\x12"])
+def test_rpn_from_truncated_bytes(data):
+    with pytest.raises(ValueError, match="Truncated"):
+        rpn_from_bytes(data)
@@ -0,0 +1,123 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import io
+import math
+import pickle
+import random
+import statistics
+
+import pytest
+
+from calct.duration import Duration
+from calct.stats import DurationSketch, sketch_file, sketch_stream
+
+
+def random_minutes(rng, count):
+    return [int(rng.lognormvariate(4, 1)) for _ in range(count)]
+
+
+def nearest_rank(sorted_minutes, fraction):
+    return sorted_minutes[max(math.ceil(fraction * len(sorted_minutes)) - 1, 0)]
+
+
+def test_exact_quantiles_and_moments():
+    rng = random.Random(45)
+    minutes = random_minutes(rng, 5000)
+    sketch = DurationSketch(Duration(minutes=value) for value in minutes)
+    assert sketch.is_exact
+    assert sketch.count == 5000
+    assert (sketch.minimum, sketch.maximum) == (min(minutes), max(minutes))
+    ordered = sorted(minutes)
+    for percent in (0, 1, 25, 50, 90, 95, 99, 99.9, 100):
+        assert sketch.percentile(percent) == Duration(minutes=nearest_rank(ordered, percent / 100))
+    assert sketch.mean() == Duration(minutes=round(statistics.fmean(minutes)))
+    assert sketch.variance() == pytest.approx(statistics.pvariance(minutes))
+    assert sum(count for _, count in sketch.bins()) == 5000
+
+
+def test_t_digest_fallback_is_close():
+    rng = random.Random(450)
+    minutes = random_minutes(rng, 50_000)
+    sketch = DurationSketch(max_bins=50)
+    for value in minutes:
+        sketch.add_minutes(value)
+    assert not sketch.is_exact
+    assert len(list(sketch.bins())) <= 2 * sketch.compression
+    ordered = sorted(minutes)
+    for fraction in (0.01, 0.5, 0.95, 0.99):
+        # The rank error of a t-digest is smallest near the extremes
+        rank = ordered.index(sketch.quantile(fraction).total_minutes)
+        assert abs(rank / len(ordered) - fraction) < 0.01
+    assert sketch.quantile(0) == Duration(minutes=min(minutes))
+    assert sketch.quantile(1) == Duration(minutes=max(minutes))
+    assert sketch.variance() == pytest.approx(statistics.pvariance(minutes))
+
+
+@pytest.mark.parametrize("max_bins", [10_000, 30])
+def test_merge_matches_single_sketch(max_bins):
+    rng = random.Random(451)
+    minutes = random_minutes(rng, 3000)
+    whole = DurationSketch(max_bins=max_bins)
+    parts = [DurationSketch(max_bins=max_bins) for _ in range(3)]
+    for position, value in enumerate(minutes):
+        whole.add_minutes(value)
+        parts[position % 3].add_minutes(value)
+    merged = pickle.loads(pickle.dumps(parts[0]))
+    merged.merge(DurationSketch())
+    for part in parts[1:]:
+        merged.merge(pickle.loads(pickle.dumps(part)))
+
+    assert merged.count == whole.count
+    assert (merged.minimum, merged.maximum) == (whole.minimum, whole.maximum)
+    assert merged.mean() == whole.mean()
+    assert merged.variance() == pytest.approx(whole.variance())
+    assert merged.is_exact == whole.is_exact
+    if whole.is_exact:
+        assert list(merged.bins()) == list(whole.bins())
+    for fraction in (0.5, 0.95):
+        assert abs(merged.quantile(fraction).total_minutes - whole.quantile(fraction).total_minutes) <= 2
+
+
+def test_empty_and_invalid():
+    sketch = DurationSketch()
+    assert sketch.variance() == 0.0
+    with pytest.raises(ValueError):
+        sketch.quantile(0.5)
+    sketch.add(Duration(1))
+    with pytest.raises(ValueError):
+        sketch.percentile(101)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_sketch_file(tmp_path, jobs):
+    path = tmp_path / "durations.txt"
+    path.write_text("1h\n\n30m + 30m\n2 * 1h30\n4h @ 7h\n")
+    sketch = sketch_file(path, jobs)
+    assert sketch.count == 4
+    assert sketch.percentile(50) == Duration(1)
+    assert sketch.percentile(100) == Duration(3)
+    assert sketch_stream(io.StringIO(path.read_text())).percentile(75) == Duration(3)
+
+
+def test_sketch_rejects_numbers(tmp_path):
+    path = tmp_path / "durations.txt"
+    path.write_text("1h\n2 * 3\n")
+    with pytest.raises(ValueError, match="byte offset 3"):
+        sketch_file(path, 1)
+    with pytest.raises(ValueError, match="line 2"):
+        sketch_stream(io.StringIO(path.read_text()))
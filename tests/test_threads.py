@@ -0,0 +1,76 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import threading
+
+import pytest
+
+from calct.bulk import compute_many
+from calct.duration import Duration, Resolution, Settings, get_settings, use_settings
+from calct.parser import compute
+
+EXPRESSIONS = [f"{i % 24}h{i % 60:02} @ 30h + {i}m * 2" for i in range(1000)]
+
+
+def test_compute_many_matches_compute():
+    assert compute_many(EXPRESSIONS, max_workers=4, batch_size=32) == [compute(expr) for expr in EXPRESSIONS]
+
+
+def test_compute_many_single_worker():
+    assert compute_many(["1h + 1h", "2 * 3"], max_workers=1) == [Duration(2), 6]
+
+
+def test_compute_many_empty():
+    assert not compute_many([])
+
+
+def test_compute_many_raises():
+    with pytest.raises(ValueError):
+        compute_many(EXPRESSIONS[:100] + ["1h + (2"], max_workers=2, batch_size=10)
+
+
+def test_compute_many_uses_caller_settings():
+    with use_settings(Settings(hour_sep=":", resolution=Resolution.SECOND)):
+        results = compute_many(["1:30 + 15s"] * 50, max_workers=4, batch_size=5)
+        assert [str(result) for result in results] == ["1:30m15s"] * 50
+    assert get_settings() == Settings()
+
+
+def test_settings_are_scoped_to_threads():
+    barrier = threading.Barrier(2)
+    outputs = {}
+
+    def run(sep):
+        Duration.set_string_hour_minute_separator(sep)
+        barrier.wait()
+        outputs[sep] = str(compute(f"1{sep}30 + 45m"))
+
+    threads = [threading.Thread(target=run, args=(sep,)) for sep in ":,"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert outputs == {":": "2:15", ",": "2,15"}
+    assert Duration.get_string_hour_minute_separator() == "h"
+
+
+def test_use_settings_restores_previous():
+    Duration.set_resolution(Resolution.SECOND)
+    with use_settings(Settings(resolution=Resolution.MILLISECOND)):
+        assert Duration.get_resolution() is Resolution.MILLISECOND
+    assert Duration.get_resolution() is Resolution.SECOND
+    Duration.del_resolution()
@@ -0,0 +1,96 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import random
+
+import pytest
+
+from calct.duration import Settings, use_settings
+from calct.parser import compute_chunks
+from calct.validation import Diagnostic, ErrorCode, validate, validate_many
+
+
+@pytest.mark.parametrize(
+    "expr",
+    [
+        "1h + 2h",
+        "9h @ 17h30 - 30m",
+        "(1h + 30m) * 2 / 3",
+        "1e-3 * 2h",
+        "2.5 * 3",
+        "3 @ 4 + 1",
+        " 1h30m15s ",
+        "1_0 * 1h",
+    ],
+)
+def test_valid(expr):
+    assert validate(expr) is None
+    compute_chunks([expr])
+
+
+@pytest.mark.parametrize(
+    "expr, diagnostic",
+    [
+        ("", Diagnostic(ErrorCode.EMPTY, 0)),
+        ("1h +", Diagnostic(ErrorCode.MISSING_OPERAND, 4)),
+        ("+ 1h", Diagnostic(ErrorCode.MISSING_OPERAND, 0, "+")),
+        ("1h 2h", Diagnostic(ErrorCode.MISSING_OPERATOR, 3, "2h")),
+        ("(1h)(2h)", Diagnostic(ErrorCode.MISSING_OPERATOR, 4, "(")),
+        ("1h + (2h", Diagnostic(ErrorCode.UNMATCHED_OPENING, 5, "(")),
+        ("1h + 2h)", Diagnostic(ErrorCode.UNMATCHED_CLOSING, 7, ")")),
+        ("1h + ()", Diagnostic(ErrorCode.MISSING_OPERAND, 6, ")")),
+        ("1h * 2h", Diagnostic(ErrorCode.TYPE_MISMATCH, 3, "*")),
+        ("2 / 1h", Diagnostic(ErrorCode.TYPE_MISMATCH, 2, "/")),
+        ("1h @ 2", Diagnostic(ErrorCode.TYPE_MISMATCH, 3, "@")),
+        ("1h + 2", Diagnostic(ErrorCode.TYPE_MISMATCH, 3, "+")),
+        ("1h / 0.0", Diagnostic(ErrorCode.DIVISION_BY_ZERO, 3, "/")),
+        ("2e*3", Diagnostic(ErrorCode.INVALID_EXPONENT, 2, "*")),
+        ("1h + 2h #", Diagnostic(ErrorCode.INVALID_CHARACTER, 8, "#")),
+        ("1h2h3", Diagnostic(ErrorCode.INVALID_TOKEN, 0, "1h2h3")),
+        ("1.2.3 * 1h", Diagnostic(ErrorCode.INVALID_TOKEN, 0, "1.2.3")),
+        ("hours * 2", Diagnostic(ErrorCode.UNKNOWN_NAME, 0, "hours")),
+        ("1h - $1", Diagnostic(ErrorCode.UNKNOWN_NAME, 5, "$1")),
+    ],
+)
+def test_invalid(expr, diagnostic):
+    assert validate(expr) == diagnostic
+
+
+def test_names_are_of_any_type():
+    assert validate("rate * 2h + _", names={"rate", "_"}) is None
+    assert validate("rate * 2h + _", names={"rate"}) == Diagnostic(ErrorCode.UNKNOWN_NAME, 12, "_")
+
+
+def test_custom_separator():
+    with use_settings(Settings(hour_sep=":")):
+        assert validate("1:30 + 2h") is None
+        assert validate("1:30:2") == Diagnostic(ErrorCode.INVALID_TOKEN, 0, "1:30:2")
+
+
+def test_valid_expressions_compute():
+    rng = random.Random(48)
+    atoms = ["1h", "30m", "2", "1.5", "2e-1", "(", ")", "+", "-", "*", "/", "@", " ", "1h2", "3e", "#"]
+    exprs = ["".join(rng.choice(atoms) for _ in range(rng.randrange(1, 8))) for _ in range(3000)]
+    diagnostics = validate_many(exprs)
+    assert 0 < diagnostics.count(None) < len(exprs)
+    for expr, diagnostic in zip(exprs, diagnostics):
+        if diagnostic is None:
+            try:
+                compute_chunks([expr])
+            except ArithmeticError:
+                # Errors that depend on values, like dividing by `1.5 @ 1.5`, are only found by evaluating
+                pass
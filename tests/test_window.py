@@ -0,0 +1,134 @@
+#   calct: Easily do calculations on hours and minutes using the command line
+#   Copyright (C) 2022  Philippe Warren
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import io
+import random
+from array import array
+
+import pytest
+
+from calct.duration import Duration
+from calct.window import (
+    CsvLayout,
+    RollingWindow,
+    Window,
+    parse_timestamp,
+    rolling,
+    rolling_max_minutes,
+    rolling_min_minutes,
+    rolling_sum_minutes,
+    window_csv,
+)
+
+CSV = """employee,date,hours
+ann,2024-01-01,10h
+bob,2024-01-01T09:00,8h
+ann,2024-01-02,9h
+ann,2024-01-05,1h + 12h
+bob,2024-01-09,8h
+ann,2024-01-08,1h
+"""
+
+
+def random_rows(rng, count):
+    times = []
+    time = 0
+    for _ in range(count):
+        time += rng.choice([0, 30, 60, 24 * 60, 3 * 24 * 60])
+        times.append(time)
+    return times, [rng.randrange(-60, 12 * 60) for _ in range(count)]
+
+
+def naive(times, values, width, aggregate):
+    return [
+        aggregate(value for other, value in zip(times[: row + 1], values) if other > time - width)
+        for row, time in enumerate(times)
+    ]
+
+
+@pytest.mark.parametrize("width", [1, 60, 24 * 60, 7 * 24 * 60])
+def test_kernels_match_naive(width):
+    rng = random.Random(46)
+    times, values = random_rows(rng, 400)
+    times, values = array("q", times), array("q", values)
+    assert rolling_sum_minutes(times, values, width) == naive(times, values, width, sum)
+    assert rolling_max_minutes(times, values, width) == naive(times, values, width, max)
+    assert rolling_min_minutes(times, values, width) == naive(times, values, width, min)
+
+    window = RollingWindow(width)
+    streamed = []
+    for time, value in zip(times, values):
+        window.push(time, value)
+        streamed.append((window.value(Window.SUM), window.value(Window.MAX), window.value(Window.MIN)))
+    assert streamed == list(
+        zip(
+            naive(times, values, width, sum),
+            naive(times, values, width, max),
+            naive(times, values, width, min),
+        )
+    )
+
+
+def test_rolling_durations():
+    times = [Duration(0), Duration(24), Duration(48), Duration(7 * 24)]
+    durations = [Duration(10), Duration(9), Duration(13), Duration(1)]
+    assert rolling(times, durations, Duration(7 * 24)) == [Duration(10), Duration(19), Duration(32), Duration(23)]
+    assert rolling(times, durations, Duration(24), Window.MAX) == [Duration(10), Duration(9), Duration(13), Duration(1)]
+
+
+def test_unsorted_and_invalid_width():
+    with pytest.raises(ValueError, match="sorted"):
+        rolling_sum_minutes([0, 10, 5], [1, 1, 1], 60)
+    with pytest.raises(ValueError, match="sorted"):
+        window = RollingWindow(60)
+        window.push(10, 1)
+        window.push(5, 1)
+    with pytest.raises(ValueError, match="positive"):
+        rolling_max_minutes([0], [1], 0)
+
+
+def test_parse_timestamp():
+    assert parse_timestamp("1970-01-02") == 24 * 60
+    assert parse_timestamp("1970-01-01T01:30+01:00") == 30
+    assert parse_timestamp("36h") == 36 * 60
+
+
+def test_window_csv():
+    layout = CsvLayout("date", "hours", ["employee"])
+    header, rows = window_csv(io.StringIO(CSV), layout, 7 * 24 * 60, [Window.SUM, Window.MAX])
+    assert header == ["employee", "date", "hours"]
+    assert [(row[0], values) for row, values in rows] == [
+        ("ann", [600, 600]),
+        ("bob", [480, 480]),
+        ("ann", [1140, 600]),
+        ("ann", [1920, 780]),
+        ("bob", [480, 480]),
+        ("ann", [1380, 780]),
+    ]
+
+
+def test_window_csv_reports_row():
+    layout = CsvLayout(0, 1, has_header=False)
+    _, rows = window_csv(io.StringIO("0h,1h\n2h,1h\n1h,1h\n"), layout, 60, [Window.SUM])
+    with pytest.raises(ValueError, match="row 3"):
+        list(rows)
+
+
+def test_window_csv_short_row():
+    _, rows = window_csv(io.StringIO(CSV + "2024-01-02\n"), CsvLayout("date", "hours", ["employee"]), 60, [Window.SUM])
+    with pytest.raises(ValueError, match="Invalid row 7: expected at least 3 columns, got 1"):
+        list(rows)